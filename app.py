@@ -1,7 +1,10 @@
 # app.py
-from flask import Flask, url_for, request, flash, redirect, render_template, session
-from config import SECRET_KEY
+from flask import Flask, url_for, request, flash, redirect, render_template, session, Response, stream_with_context, jsonify, send_file
+from config import SECRET_KEY, DATA_DIR, SQLITE_PATH, SERVER_TIMING
 from models.user_model import init_user_file
+from models import data_store, storage, export_model, backup_model, import_model, schema
+from models.country_model import Country
+from models.dashboard_model import dashboard_counters
 from routes.auth_routes import auth_bp
 from routes.home_routes import home_bp
 from routes.mineral_routes import minerals_bp
@@ -9,12 +12,29 @@ from routes.stats_routes import stats_bp
 from routes.map_routes import map_bp
 from routes.country_routes import country_bp
 from routes.admin_routes import admin_bp
+from routes.search_routes import search_bp
+from auth_decorators import admin_required, requires, Permission
+import instrumentation
+import app_logging
+import template_cache
+import click
 import csv
+import logging
 import os
 
+log = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.secret_key = SECRET_KEY
-app.config['TEMPLATES_AUTO_RELOAD'] = True
+
+# Template bytecode cache, auto-reload only in debug mode, per-record fragment caching
+template_cache.init_app(app)
+
+# Per-endpoint latency and data I/O metrics, served at /admin/metrics
+instrumentation.init_app(app, server_timing=SERVER_TIMING)
+
+# JSON logs written by a background thread, with request ids and timings
+app_logging.init_app(app)
 
 # Initialize data files
 init_user_file()
@@ -27,24 +47,45 @@ app.register_blueprint(stats_bp, url_prefix="/stats")
 app.register_blueprint(map_bp, url_prefix="/map")
 app.register_blueprint(country_bp, url_prefix="/countries")
 app.register_blueprint(admin_bp, url_prefix="/admin")
+app.register_blueprint(search_bp, url_prefix="/search")
 
-# Simple admin_required decorator
-def admin_required(f):
-    from functools import wraps
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please log in to access this page.', 'error')
-            return redirect('/login')
-        return f(*args, **kwargs)
-    return decorated_function
+# Storage tools: flask --app app export-sqlite / export-csv
+@app.cli.command('export-sqlite')
+def export_sqlite():
+    """Copy every CSV table into the SQLite database"""
+    counts = data_store.copy_tables(storage.CsvBackend(DATA_DIR), storage.SqliteBackend(SQLITE_PATH))
+    data_store.invalidate()
+    for name, count in counts.items():
+        print(f"✅ {name}: {count} rows -> {SQLITE_PATH}")
+
+@app.cli.command('export-csv')
+def export_csv():
+    """Copy every SQLite table back out to the CSV files"""
+    counts = data_store.copy_tables(storage.SqliteBackend(SQLITE_PATH), storage.CsvBackend(DATA_DIR))
+    data_store.invalidate()
+    for name, count in counts.items():
+        print(f"✅ {name}: {count} rows -> {DATA_DIR}")
+
+@app.cli.command('import-data')
+@click.argument('table')
+@click.argument('path')
+def import_data(table, path):
+    """Bulk import a CSV file into minerals, production_stats or sites"""
+    reject_path = os.path.splitext(path)[0] + '-rejects.csv'
+    def progress(counts):
+        print(f"⏳ {counts['rows_read']} rows read, {counts['rows_imported']} imported, "
+              f"{counts['rows_rejected']} rejected ({counts['seconds']}s)")
+    counts = import_model.import_file(table, path, reject_path, progress)
+    print(f"✅ {table}: {counts['rows_imported']} rows imported in {counts['seconds']}s")
+    if counts['rows_rejected']:
+        print(f"⚠️ {counts['rows_rejected']} rows rejected -> {reject_path}")
 
 # DEBUG: Check CSV structure
 @app.route('/debug/csv')
 def debug_csv():
     """Debug route to check CSV structure"""
     try:
-        with open('countries.csv', 'r', encoding='utf-8') as file:
+        with open(data_store.data_path('countries'), 'r', encoding='utf-8') as file:
             content = file.read()
             file.seek(0)
             reader = csv.DictReader(file)
@@ -64,167 +105,70 @@ def debug_csv():
 
 # Helper functions for country data management
 def get_country_by_id(country_id):
-    """Get country data by ID from CSV - handles different column names"""
+    """Get country data by ID using the primary key index"""
     try:
-        with open('countries.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            countries = list(reader)
-            
-        if not countries:
-            return None
-            
-        # Find the country by trying different ID column names
-        for country in countries:
-            # Try common ID column names
-            possible_ids = [
-                country.get('country_id'),
-                country.get('id'), 
-                country.get('ID'),
-                country.get('Index'),
-                country.get('country_id')
-            ]
-            
-            for possible_id in possible_ids:
-                if possible_id and str(possible_id) == str(country_id):
-                    # Ensure country_id exists for compatibility
-                    if 'country_id' not in country:
-                        country['country_id'] = str(country_id)
-                    return country
-                    
-        return None
-    except Exception as e:
-        print(f"❌ Error reading country data: {e}")
+        return Country.get_country_by_id(int(country_id))
+    except Exception:
+        log.exception('reading country failed', extra={'country_id': country_id})
         return None
 
 def get_all_countries():
-    """Get all countries from CSV"""
+    """Get all countries from the data cache (shared records - do not modify them)"""
     try:
-        with open('countries.csv', 'r', encoding='utf-8') as file:
-            countries = list(csv.DictReader(file))
-            
-        # Ensure country_id exists for all countries
-        for i, country in enumerate(countries):
-            if 'country_id' not in country:
-                # Generate country_id from existing ID or index
-                country['country_id'] = country.get('id') or country.get('ID') or str(i + 1)
-                
-        return countries
-    except Exception as e:
-        print(f"❌ Error reading countries: {e}")
+        return Country.get_all_countries()
+    except Exception:
+        log.exception('reading countries failed')
         return []
 
 def update_country_data(country_id, updated_data):
-    """Update country data in CSV"""
+    """Update country data (recorded in the countries change log)"""
     try:
-        countries = get_all_countries()
-        if not countries:
+        country = data_store.get_record('countries', country_id)
+        if country is None:
+            log.warning('country not found for update', extra={'country_id': country_id})
             return False
-            
-        updated = False
-        original_columns = list(countries[0].keys())
         
-        for country in countries:
-            # Find country by ID (check multiple possible ID fields)
-            current_id = (country.get('country_id') or 
-                         country.get('id') or 
-                         country.get('ID') or 
-                         country.get('Index'))
-            
-            if current_id and str(current_id) == str(country_id):
-                print(f"🔧 Updating country {country_id}: {updated_data}")
-                
-                # Update only the fields that exist in the original CSV
-                for key, value in updated_data.items():
-                    if key in original_columns:
-                        country[key] = value
-                    elif key == 'country_name' and 'name' in original_columns:
-                        country['name'] = value
-                    elif key == 'gdp_billion_usd' and 'gdp' in original_columns:
-                        country['gdp'] = value
-                    elif key == 'mining_revenue_billion_usd' and 'mining_revenue' in original_columns:
-                        country['mining_revenue'] = value
-                
-                updated = True
-                break
+        # Canonical field names -> the columns the CSV header actually uses
+        changes = schema.for_table('countries').to_row(updated_data)
         
-        if updated:
-            # Write back to CSV with original column structure
-            with open('countries.csv', 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=original_columns)
-                writer.writeheader()
-                writer.writerows(countries)
-            print(f"✅ Successfully updated country {country_id}")
+        if data_store.update_row('countries', country_id, changes):
+            log.info('country updated', extra={'country_id': country_id, 'fields': sorted(updated_data)})
             return True
             
-        print(f"❌ Country {country_id} not found for update")
+        log.warning('country not found for update', extra={'country_id': country_id})
         return False
         
-    except Exception as e:
-        print(f"❌ Error updating country {country_id}: {e}")
+    except Exception:
+        log.exception('updating country failed', extra={'country_id': country_id})
         return False
 
 def delete_country_from_data(country_id):
-    """Delete country from CSV"""
+    """Delete country (recorded in the countries change log)"""
     try:
-        countries = get_all_countries()
-        if not countries:
-            return False
-            
-        original_columns = list(countries[0].keys())
-        updated_countries = []
-        deleted = False
-        
-        for country in countries:
-            current_id = (country.get('country_id') or 
-                         country.get('id') or 
-                         country.get('ID') or 
-                         country.get('Index'))
-            
-            if current_id and str(current_id) == str(country_id):
-                deleted = True
-                continue
-            updated_countries.append(country)
-        
-        if deleted:
-            with open('countries.csv', 'w', newline='', encoding='utf-8') as file:
-                writer = csv.DictWriter(file, fieldnames=original_columns)
-                writer.writeheader()
-                writer.writerows(updated_countries)
-            return True
-        return False
-        
-    except Exception as e:
-        print(f"❌ Error deleting country: {e}")
+        return data_store.delete_row('countries', country_id)
+    except Exception:
+        log.exception('deleting country failed', extra={'country_id': country_id})
         return False
 
 def get_minerals_count():
-    """Get count of minerals"""
+    """Get count of minerals (maintained on every write)"""
     try:
-        with open('minerals.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            return len(list(reader))
+        return dashboard_counters.counts()['minerals']
     except:
         return 0
 
 def get_active_projects_count():
-    """Get count of active projects"""
+    """Get count of countries with active projects (maintained on every write)"""
     try:
-        count = 0
-        countries = get_all_countries()
-        for country in countries:
-            projects = country.get('key_projects') or country.get('projects') or country.get('key_projects')
-            if projects and str(projects).strip():
-                count += 1
-        return count
+        return dashboard_counters.counts()['active_projects']
     except:
         return 0
 
 # New routes for country management
 @app.route('/countries/<country_id>/edit', methods=['GET'])
-@admin_required
+@requires(Permission.EDIT_DATA)
 def edit_country(country_id):
     """Edit country form"""
-    print(f"🔧 Edit country route called for ID: {country_id}")
     country = get_country_by_id(country_id)
     if not country:
         flash('Country not found', 'error')
@@ -233,13 +177,10 @@ def edit_country(country_id):
     return render_template('edit_country.html', country=country)
 
 @app.route('/countries/<country_id>/update', methods=['POST'])
-@admin_required
+@requires(Permission.EDIT_DATA)
 def update_country(country_id):
     """Update country data"""
     try:
-        print(f"🔄 Update request for country {country_id}")
-        print(f"📝 Form data: {dict(request.form)}")
-        
         # Get form data with fallbacks for different field names
         country_name = request.form.get('country_name') or request.form.get('name')
         gdp = request.form.get('gdp') or request.form.get('gdp_billion_usd')
@@ -264,85 +205,167 @@ def update_country(country_id):
         else:
             flash('❌ Error updating country - country not found', 'error')
             
-    except ValueError as e:
+    except ValueError:
         flash('❌ Invalid number format for GDP or Mining Revenue', 'error')
     except Exception as e:
-        print(f"❌ Error updating country {country_id}: {e}")
+        log.exception('updating country failed', extra={'country_id': country_id})
         flash(f'❌ Error updating country: {str(e)}', 'error')
     
     return redirect('/admin/data')
 
 @app.route('/countries/<country_id>/delete', methods=['POST'])
-@admin_required
+@requires(Permission.DELETE_DATA)
 def delete_country(country_id):
     """Delete country"""
     try:
-        print(f"🗑️ Delete request for country {country_id}")
         success = delete_country_from_data(country_id)
         if success:
             flash('✅ Country deleted successfully', 'success')
         else:
             flash('❌ Error deleting country - country not found', 'error')
     except Exception as e:
-        print(f"❌ Error deleting country {country_id}: {e}")
+        log.exception('deleting country failed', extra={'country_id': country_id})
         flash(f'❌ Error deleting country: {str(e)}', 'error')
     
     return redirect('/admin/data')
 
 # Export routes
+# Row filters are ?filter.<Column>=value, so other query arguments (cache busters, utm_*) are ignored
+EXPORT_FILTER_PREFIX = 'filter.'
+EXPORT_GZIP_VALUES = {'': False, '0': False, 'false': False, 'no': False, '1': True, 'true': True, 'yes': True}
+
+def export_table(name, filename):
+    """Stream a table download, or a 400 JSON error for options it cannot serve.
+
+    ?format=csv|ndjson  ?gzip=1  ?columns=A,B  and ?filter.<Column>=value row filters
+    """
+    fmt = request.args.get('format', 'csv')
+    columns = [column for column in request.args.get('columns', '').split(',') if column] or None
+    filters = dict((key[len(EXPORT_FILTER_PREFIX):], value) for key, value in request.args.items()
+                   if key.startswith(EXPORT_FILTER_PREFIX))
+    compress = EXPORT_GZIP_VALUES.get(request.args.get('gzip', '').lower())
+    if compress is None:
+        return jsonify({'error': "'gzip' must be 1 or 0"}), 400
+    
+    try:
+        chunks, mimetype, extension = export_model.stream_table(name, fmt, columns, filters, compress)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return Response(stream_with_context(chunks), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}.{extension}'})
+
 @app.route('/export/countries/csv')
-@admin_required
+@requires(Permission.EXPORT_DATA)
 def export_countries_csv():
     """Export countries data as CSV"""
     try:
-        countries = get_all_countries()
-        flash('✅ Countries data exported successfully', 'success')
-        return redirect('/admin/data')
+        return export_table('countries', 'countries')
     except Exception as e:
         flash(f'❌ Error exporting data: {str(e)}', 'error')
         return redirect('/admin/data')
 
 @app.route('/export/minerals/csv')
-@admin_required
+@requires(Permission.EXPORT_DATA)
 def export_minerals_csv():
     """Export minerals data as CSV"""
     try:
-        flash('✅ Minerals data exported successfully', 'success')
-        return redirect('/admin/data')
+        return export_table('minerals', 'minerals')
     except Exception as e:
         flash(f'❌ Error exporting minerals: {str(e)}', 'error')
         return redirect('/admin/data')
 
 @app.route('/export/production/csv')
-@admin_required
+@requires(Permission.EXPORT_DATA)
 def export_production_csv():
     """Export production data as CSV"""
     try:
-        flash('✅ Production data exported successfully', 'success')
-        return redirect('/admin/data')
+        return export_table('production_stats', 'production_stats')
     except Exception as e:
         flash(f'❌ Error exporting production data: {str(e)}', 'error')
         return redirect('/admin/data')
 
 @app.route('/backup')
-@admin_required
+@requires(Permission.MANAGE_DATA)
 def backup_data():
-    """Create data backup"""
+    """Start an incremental backup on the background worker"""
     try:
-        flash('✅ Backup created successfully', 'success')
+        job_id = backup_model.start_backup()
+        flash(f'💾 Backup started (job {job_id}) - check /backup/status/{job_id}', 'success')
         return redirect('/admin/data')
     except Exception as e:
         flash(f'❌ Error creating backup: {str(e)}', 'error')
         return redirect('/admin/data')
 
+@app.route('/backup/status/<job_id>')
+@requires(Permission.MANAGE_DATA)
+def backup_status(job_id):
+    """Status of a backup or restore job"""
+    job = backup_model.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/backup/snapshots')
+@requires(Permission.MANAGE_DATA)
+def backup_snapshots():
+    """All backup snapshots, oldest first"""
+    return jsonify(backup_model.list_snapshots())
+
+@app.route('/backup/restore', methods=['POST'])
+@requires(Permission.MANAGE_DATA)
+def restore_backup():
+    """Restore a snapshot by id, or the latest one taken at/before ?at=<ISO time>"""
+    try:
+        snapshot_id = request.values.get('snapshot')
+        if not snapshot_id:
+            snapshot_id = backup_model.snapshot_at(request.values.get('at', ''))
+        job_id = backup_model.start_restore(snapshot_id)
+        flash(f'♻️ Restore of {snapshot_id} started (job {job_id})', 'success')
+    except Exception as e:
+        flash(f'❌ Error restoring backup: {str(e)}', 'error')
+    return redirect('/admin/data')
+
+@app.route('/import', methods=['POST'])
+@requires(Permission.MANAGE_DATA)
+def bulk_import():
+    """Upload a CSV (form fields: table, file) and import it in the background"""
+    upload = request.files.get('file')
+    if upload is None or not upload.filename:
+        return jsonify({'error': 'No file uploaded'}), 400
+    try:
+        job_id = import_model.start_import(request.form.get('table', ''), upload)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'job_id': job_id, 'status_url': url_for('import_status', job_id=job_id)}), 202
+
+@app.route('/import/status/<job_id>')
+@requires(Permission.MANAGE_DATA)
+def import_status(job_id):
+    """Progress of a bulk import job"""
+    job = import_model.get_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if job['status'] in ('finished', 'failed'):
+        job['rejects_url'] = url_for('import_rejects', job_id=job_id)
+    return jsonify(job)
+
+@app.route('/import/rejects/<job_id>')
+@requires(Permission.MANAGE_DATA)
+def import_rejects(job_id):
+    """Rows an import job rejected, with the reason"""
+    if import_model.get_job(job_id) is None or not os.path.exists(import_model.reject_file(job_id)):
+        return jsonify({'error': 'Job not found'}), 404
+    return send_file(import_model.reject_file(job_id), mimetype='text/csv', as_attachment=True,
+                     download_name=f'import-{job_id}-rejects.csv')
+
 @app.route('/countries/new')
-@admin_required
+@requires(Permission.EDIT_DATA)
 def new_country():
     """Add new country form"""
     return render_template('new_country.html')
 
 @app.route('/countries/create', methods=['POST'])
-@admin_required
+@requires(Permission.EDIT_DATA)
 def create_country():
     """Create new country"""
     try:
@@ -351,45 +374,15 @@ def create_country():
         mining_revenue = float(request.form['mining_revenue'])
         key_projects = request.form.get('key_projects', '')
         
-        # Get existing countries to determine new ID
-        countries = get_all_countries()
-        new_id = str(len(countries) + 1)
-        
-        # Read original CSV structure to maintain column order
-        original_columns = []
-        if countries:
-            original_columns = list(countries[0].keys())
-        
-        # Create new country with compatible field names
-        new_country = {}
-        if 'country_id' in original_columns:
-            new_country['country_id'] = new_id
-        if 'id' in original_columns:
-            new_country['id'] = new_id
-        if 'country_name' in original_columns:
-            new_country['country_name'] = country_name
-        elif 'name' in original_columns:
-            new_country['name'] = country_name
-        if 'gdp_billion_usd' in original_columns:
-            new_country['gdp_billion_usd'] = gdp
-        elif 'gdp' in original_columns:
-            new_country['gdp'] = gdp
-        if 'mining_revenue_billion_usd' in original_columns:
-            new_country['mining_revenue_billion_usd'] = mining_revenue
-        elif 'mining_revenue' in original_columns:
-            new_country['mining_revenue'] = mining_revenue
-        if 'key_projects' in original_columns:
-            new_country['key_projects'] = key_projects
-        elif 'projects' in original_columns:
-            new_country['projects'] = key_projects
-        
-        countries.append(new_country)
+        # Canonical field names -> the columns the CSV header actually uses (the ID is assigned by the data store)
+        new_country = schema.for_table('countries').to_row({
+            'country_name': country_name,
+            'gdp_billion_usd': gdp,
+            'mining_revenue_billion_usd': mining_revenue,
+            'key_projects': key_projects
+        })
         
-        # Write back to CSV
-        with open('countries.csv', 'w', newline='', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=original_columns)
-            writer.writeheader()
-            writer.writerows(countries)
+        data_store.insert_row('countries', new_country)
         
         flash('✅ Country added successfully', 'success')
         return redirect('/admin/data')
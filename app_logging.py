@@ -0,0 +1,227 @@
+# app_logging.py
+"""Structured JSON logging that never blocks a request.
+
+Log calls from request threads only append the record to a bounded queue;
+one background thread wakes every FLUSH_INTERVAL seconds, formats what
+has queued up as JSON lines and writes them to stdout in a single write.
+Appending wakes nobody, so logging costs a request no thread switches.
+When the queue is full the record is dropped and counted rather than
+making the request wait.
+
+Inside a request every record carries the request id (taken from an
+incoming X-Request-ID header or generated, and echoed back), endpoint,
+method, path and the milliseconds since the request started. Extra fields
+go in through the standard extra={...} argument. Each request also ends
+with one "request finished" record holding status and duration_ms.
+
+Busy endpoints can be sampled with LOG_SAMPLE_RATES: a request is picked
+as a whole, and the INFO/DEBUG records of a request that was not picked
+are dropped. Warnings, errors, 5xx responses and requests slower than
+LOG_SLOW_MS are always logged.
+"""
+import atexit
+import copy
+from collections import deque
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+import instrumentation
+from config import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_RATES, LOG_SLOW_MS
+
+# Attributes every LogRecord has; anything else was passed in extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+_local = threading.local()
+_writer = None
+
+# Seconds between writes of the queued records
+FLUSH_INTERVAL = 0.05
+
+log = logging.getLogger('requests')
+
+dropped_records = instrumentation.Counter('log_records_dropped_total', 'Log records dropped because the queue was full')
+
+
+def _sample_rates(text):
+    """'map.site_tile=0.05,search.search=0.2' -> {endpoint: rate}"""
+    rates = {}
+    for part in (text or '').split(','):
+        if '=' in part:
+            endpoint, rate = part.split('=', 1)
+            rates[endpoint.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Adds request fields, and drops INFO/DEBUG of requests left out of the sample"""
+
+    def filter(self, record):
+        context = getattr(_local, 'context', None)
+        if context is None:
+            return True
+        always = record.__dict__.pop('always', False)
+        if not context['sampled'] and record.levelno < logging.WARNING and not always:
+            return False
+        for key, value in context['fields'].items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        record.elapsed_ms = round((time.perf_counter() - context['started']) * 1000, 3)
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of waiting when the queue is full"""
+
+    def prepare(self, record):
+        # Merge args and format the traceback here, while the frames still exist
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            dropped_records.inc()
+
+
+class BatchWriter:
+    """Bounded record queue drained by one thread that writes JSON lines in batches"""
+
+    def __init__(self, stream, max_size, interval=FLUSH_INTERVAL):
+        self.stream = stream
+        self.max_size = max_size
+        self.interval = interval
+        self.formatter = JsonFormatter()
+        self.records = deque()
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+
+    def put_nowait(self, record):
+        # deque appends are thread-safe; a slightly stale length only bends the bound
+        if len(self.records) >= self.max_size:
+            raise queue.Full
+        self.records.append(record)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+    def _run(self):
+        while not self.stopping.wait(self.interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        lines = []
+        while self.records:
+            record = self.records.popleft()
+            try:
+                lines.append(self.formatter.format(record))
+            except Exception:
+                dropped_records.inc()
+        if lines:
+            self.stream.write('\n'.join(lines) + '\n')
+            self.stream.flush()
+
+
+def configure():
+    """Route every logger through the queue to a JSON writer thread (once per process)"""
+    global _writer
+    if _writer is not None:
+        return
+    _writer = BatchWriter(sys.stdout, LOG_QUEUE_SIZE)
+    _writer.start()
+    atexit.register(_writer.stop)
+
+    handler = NonBlockingQueueHandler(_writer)
+    handler.addFilter(RequestContextFilter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+
+
+def init_app(app):
+    """Configure logging and give every request of app an id, timing and a sampling decision"""
+    from flask import request
+
+    configure()
+    sample_rates = _sample_rates(LOG_SAMPLE_RATES)
+
+    @app.before_request
+    def start_request_log():
+        endpoint = request.endpoint or 'unmatched'
+        rate = sample_rates.get(endpoint, 1.0)
+        _local.context = {
+            'started': time.perf_counter(),
+            'sampled': rate >= 1.0 or random.random() < rate,
+            'fields': {
+                'request_id': request.headers.get('X-Request-ID') or uuid.uuid4().hex[:16],
+                'endpoint': endpoint,
+                'method': request.method,
+                'path': request.path,
+            },
+        }
+
+    @app.after_request
+    def finish_request_log(response):
+        context = getattr(_local, 'context', None)
+        if context is None:
+            return response
+        duration_ms = (time.perf_counter() - context['started']) * 1000
+        response.headers['X-Request-ID'] = context['fields']['request_id']
+        log.info('request finished', extra={
+            'status': response.status_code,
+            'duration_ms': round(duration_ms, 3),
+            'always': response.status_code >= 500 or duration_ms >= LOG_SLOW_MS,
+        })
+        _local.context = None
+        return response
+
+    @app.teardown_request
+    def clear_request_log(error=None):
+        # after_request is skipped when a request fails outright; never let
+        # its context leak into whatever this thread logs next
+        context = getattr(_local, 'context', None)
+        if context is None:
+            return
+        try:
+            log.info('request finished', extra={
+                'status': 500,
+                'duration_ms': round((time.perf_counter() - context['started']) * 1000, 3),
+                'always': True,
+            })
+        finally:
+            _local.context = None
@@ -1,6 +1,7 @@
 # auth_decorators.py
 from functools import wraps
 from flask import session, redirect, url_for, flash
+from models.role_model import Permission, FULL_ACCESS
 
 def login_required(f):
     @wraps(f)
@@ -11,14 +12,24 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
-def admin_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            flash('Please log in to access this page.', 'error')
-            return redirect('/login')  # Use direct path
-        
-        # For now, allow any logged-in user to access admin
-        # You can enhance this later to check specific admin roles
-        return f(*args, **kwargs)
-    return decorated_function
\ No newline at end of file
+def requires(permission):
+    """Only let in users whose role grants every bit of permission.
+
+    Checks the mask stored in the session at login, no data is read.
+    """
+    needed = int(permission)
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if 'user_id' not in session:
+                flash('Please log in to access this page.', 'error')
+                return redirect('/login')  # Use direct path
+            if session.get('permissions', 0) & needed != needed:
+                flash('You do not have permission to access this page.', 'error')
+                return redirect('/')
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+# Administrators only (every permission)
+admin_required = requires(FULL_ACCESS)
@@ -0,0 +1,184 @@
+# benchmarks/generate_data.py
+"""Synthetic data sets for benchmarking.
+
+Run with: python -m benchmarks.generate_data OUT_DIR --rows 100000 [--seed 1]
+
+Writes countries, minerals, production_stats, sites, users and roles CSV
+files with the same headers as the sample data. --rows is the total across
+the tables, split in realistic proportions (production statistics and
+sites dominate); every CountryID / MineralID / RoleID points at a row that
+exists, production statistics are unique per (year, country, mineral) and
+site names are unique, so the files also pass the bulk importer's checks.
+Rows are streamed to disk, so 10M rows need no more memory than 1k.
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import shutil
+import time
+
+# Share of --rows given to each table
+PROPORTIONS = {
+    'countries': 0.002,
+    'minerals': 0.001,
+    'production_stats': 0.6,
+    'sites': 0.3,
+    'users': 0.097,
+}
+FIRST_YEAR = 1990
+YEARS = 36
+
+COUNTRY_NAMES = [
+    'DRC (Congo)', 'South Africa', 'Mozambique', 'Namibia', 'Zambia', 'Zimbabwe', 'Botswana',
+    'Tanzania', 'Ghana', 'Guinea', 'Madagascar', 'Morocco', 'Mali', 'Nigeria', 'Gabon', 'Angola',
+    'Kenya', 'Ethiopia', 'Malawi', 'Rwanda', 'Burkina Faso', 'Niger', 'Sierra Leone', 'Egypt',
+]
+MINERALS = [
+    ('Cobalt', 'Used in batteries and alloys', 52000),
+    ('Lithium', 'Essential for EV batteries', 70000),
+    ('Graphite', 'Anode material for batteries', 1200),
+    ('Manganese', 'Used in steel and batteries', 1800),
+    ('Copper', 'Electrical wiring and grids', 8500),
+    ('Nickel', 'Battery cathodes and stainless steel', 18000),
+    ('Platinum', 'Catalysts and hydrogen fuel cells', 30000000),
+    ('Rare Earths', 'Magnets for motors and turbines', 60000),
+    ('Bauxite', 'Aluminium ore', 45),
+    ('Chromium', 'Stainless steel and plating', 9000),
+]
+PROJECT_WORDS = ['Copperbelt', 'Lithium', 'Graphite', 'Cobalt', 'Expansion', 'Project', 'Mine',
+                 'Refinery', 'Corridor', 'Basin', 'Hills', 'Valley', 'North', 'South']
+
+# Africa, roughly: latitude and longitude ranges for country centres
+LATITUDES = (-34.0, 36.0)
+LONGITUDES = (-17.0, 50.0)
+
+ROLES = [
+    ('1', 'Administrator', 'Full access (manage users, edit/delete data)'),
+    ('2', 'Investor', 'View country profiles, charts, exports, production'),
+    ('3', 'Researcher', 'View/export mineral & country data, add insights'),
+]
+
+
+def table_sizes(rows):
+    """Rows per table for a total of about rows"""
+    sizes = dict((name, max(1, int(rows * share))) for name, share in PROPORTIONS.items())
+    sizes['countries'] = max(sizes['countries'], 4)
+    sizes['minerals'] = max(sizes['minerals'], 4)
+    # Enough (year, country, mineral) combinations for unique statistics
+    needed = math.ceil(sizes['production_stats'] / (YEARS * sizes['countries']))
+    sizes['minerals'] = max(sizes['minerals'], needed)
+    return sizes
+
+
+def _write(path, columns, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file, lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(rows)
+
+
+def _countries(rng, count):
+    for country_id in range(1, count + 1):
+        name = COUNTRY_NAMES[country_id - 1] if country_id <= len(COUNTRY_NAMES) else f'Country {country_id}'
+        gdp = round(rng.lognormvariate(3.3, 1.1), 1)
+        revenue = round(gdp * rng.uniform(0.02, 0.35), 1)
+        projects = ' '.join(rng.sample(PROJECT_WORDS, 3))
+        yield country_id, name, gdp, revenue, projects
+
+
+def _minerals(rng, count):
+    for mineral_id in range(1, count + 1):
+        if mineral_id <= len(MINERALS):
+            name, description, price = MINERALS[mineral_id - 1]
+        else:
+            base = MINERALS[(mineral_id - 1) % len(MINERALS)]
+            name, description = f'{base[0]} grade {mineral_id}', base[1]
+            price = round(base[2] * rng.uniform(0.5, 1.5))
+        yield mineral_id, name, description, price
+
+
+def _production_stats(rng, count, countries, minerals):
+    """Every (year, country, mineral) at most once, volumes growing over the years"""
+    for index in range(count):
+        year = FIRST_YEAR + index % YEARS
+        pair = index // YEARS
+        country_id = pair % countries + 1
+        mineral_id = (pair // countries) % minerals + 1
+        growth = 1.04 ** (year - FIRST_YEAR)
+        tonnes = round(rng.lognormvariate(9, 1.5) * growth)
+        yield index + 1, year, country_id, mineral_id, tonnes, round(tonnes * rng.uniform(1e-6, 6e-5), 2)
+
+
+def _sites(rng, count, countries, minerals):
+    """Sites clustered around a centre per country"""
+    centres = [(rng.uniform(*LATITUDES), rng.uniform(*LONGITUDES)) for _ in range(countries)]
+    for site_id in range(1, count + 1):
+        country_id = rng.randint(1, countries)
+        lat, lon = centres[country_id - 1]
+        lat = min(90.0, max(-90.0, rng.gauss(lat, 2.0)))
+        lon = min(180.0, max(-180.0, rng.gauss(lon, 2.0)))
+        yield (site_id, f'{rng.choice(PROJECT_WORDS)} Site {site_id}', country_id, rng.randint(1, minerals),
+               round(lat, 4), round(lon, 4), round(rng.lognormvariate(9, 1.5)))
+
+
+def _users(count, password_hash):
+    for user_id in range(1, count + 1):
+        role_id = 1 if user_id == 1 else 2 + user_id % 2
+        username = 'admin01' if user_id == 1 else f'user{user_id:07d}'
+        yield user_id, username, password_hash, role_id, f'{username}@miningapp.com'
+
+
+def generate(out_dir, rows, seed=1, password='benchmark'):
+    """Write a data set of about rows rows into out_dir, returns the rows per table"""
+    from models import password_model
+
+    rng = random.Random(seed)
+    sizes = table_sizes(rows)
+    os.makedirs(out_dir, exist_ok=True)
+    # One hash shared by every account: hashing millions of passwords would take hours
+    password_hash = password_model.hash_password(password)
+
+    _write(os.path.join(out_dir, 'roles.csv'), ['RoleID', 'RoleName', 'Permissions'], ROLES)
+    _write(os.path.join(out_dir, 'countries.csv'),
+           ['CountryID', 'CountryName', 'GDP_BillionUSD', 'MiningRevenue_BillionUSD', 'KeyProjects'],
+           _countries(rng, sizes['countries']))
+    _write(os.path.join(out_dir, 'minerals.csv'),
+           ['MineralID', 'MineralName', 'Description', 'MarketPriceUSD_per_tonne'],
+           _minerals(rng, sizes['minerals']))
+    _write(os.path.join(out_dir, 'production_stats.csv'),
+           ['StatID', 'Year', 'CountryID', 'MineralID', 'Production_tonnes', 'ExportValue_BillionUSD'],
+           _production_stats(rng, sizes['production_stats'], sizes['countries'], sizes['minerals']))
+    _write(os.path.join(out_dir, 'sites.csv'),
+           ['SiteID', 'SiteName', 'CountryID', 'MineralID', 'Latitude', 'Longitude', 'Production_tonnes'],
+           _sites(rng, sizes['sites'], sizes['countries'], sizes['minerals']))
+    _write(os.path.join(out_dir, 'users.csv'),
+           ['UserID', 'Username', 'PasswordHash', 'RoleID', 'Email'],
+           _users(sizes['users'], password_hash))
+    # Drop change logs and locks left from an earlier data set in the same directory
+    for name in os.listdir(out_dir):
+        if name.endswith(('.csv.log', '.csv.lock')):
+            os.remove(os.path.join(out_dir, name))
+    if os.path.isdir(os.path.join(out_dir, 'backups')):
+        shutil.rmtree(os.path.join(out_dir, 'backups'))
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--rows', type=int, default=10000, help='total rows across the tables (1k to 10M)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--password', default='benchmark', help='password of every generated account')
+    args = parser.parse_args()
+
+    started = time.time()
+    sizes = generate(args.out_dir, args.rows, args.seed, args.password)
+    for name, count in sizes.items():
+        print(f"✅ {name}: {count} rows")
+    print(f"📦 {args.out_dir} written in {time.time() - started:.1f}s (admin01 / {args.password})")
+
+
+if __name__ == '__main__':
+    main()
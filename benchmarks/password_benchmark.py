@@ -0,0 +1,73 @@
+# benchmarks/password_benchmark.py
+"""Logins per second at several password hashing costs.
+
+Run with: python -m benchmarks.password_benchmark [--scheme scrypt] [--costs ...]
+
+Every cost is measured through the same bounded pool the app uses, with
+enough concurrent clients to keep it full, so the numbers show what one
+server can sustain. Pick the highest cost whose p95 latency you can live with.
+"""
+import argparse
+import os
+import statistics
+import threading
+import time
+
+DEFAULT_COSTS = {
+    'pbkdf2_sha256': [100000, 260000, 600000],
+    'scrypt': [2 ** 13, 2 ** 14, 2 ** 15],
+}
+
+
+def measure(password_model, scheme, cost, seconds, clients):
+    """(logins per second, p50 ms, p95 ms) of verifying one hash for a while"""
+    stored = password_model.hash_password('benchmark-password', scheme, cost)
+    latencies = []
+    latencies_lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            password_model.run_bounded(password_model.verify_password, 'benchmark-password', stored)
+            elapsed = time.perf_counter() - started
+            with latencies_lock:
+                latencies.append(elapsed)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    total = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return len(latencies) / total, statistics.median(latencies) * 1000, p95 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scheme', choices=sorted(DEFAULT_COSTS), default='pbkdf2_sha256')
+    parser.add_argument('--costs', type=int, nargs='+', help='costs to try (iterations, or N for scrypt)')
+    parser.add_argument('--seconds', type=float, default=3.0, help='time spent on each cost')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='hashing threads')
+    parser.add_argument('--clients', type=int, help='concurrent logins (default: 2 x workers)')
+    args = parser.parse_args()
+
+    # The pool is sized from config when the module is first imported
+    os.environ['PASSWORD_WORKERS'] = str(args.workers)
+    clients = args.clients or args.workers * 2
+    os.environ['PASSWORD_QUEUE_LIMIT'] = str(clients)
+    from models import password_model
+
+    print(f"{args.scheme}: {args.workers} worker(s), {clients} client(s), {args.seconds:g}s per cost")
+    print(f"{'cost':>10} {'logins/s':>10} {'p50 ms':>10} {'p95 ms':>10}")
+    for cost in args.costs or DEFAULT_COSTS[args.scheme]:
+        rate, p50, p95 = measure(password_model, args.scheme, cost, args.seconds, clients)
+        print(f"{cost:>10} {rate:>10.1f} {p50:>10.1f} {p95:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
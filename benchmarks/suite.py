@@ -0,0 +1,309 @@
+# benchmarks/suite.py
+"""Route and data-layer benchmarks at several data scales.
+
+Run with: python -m benchmarks.suite [--rows 1000 100000] [--seconds 1] [--save-baseline]
+
+For every scale a synthetic data set is generated (benchmarks/generate_data.py,
+kept in --data-root for the next run) and a fresh process drives each
+blueprint route through the Flask test client, logged in as an
+administrator, and calls the data-layer functions directly. Each case
+reports the first (cold) call, then throughput and p50/p99 latency of the
+warm calls.
+
+Every run also times a fixed pure-Python workload (the 'calibration'
+case). Baseline timings are scaled by how much faster or slower that
+workload ran than when the baseline was recorded, so a baseline taken on
+one machine still means something on another. A case whose p50 is more
+than --tolerance slower than its scaled baseline fails the run (exit code
+1). --save-baseline stores this run as the new baseline instead.
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_FILE = os.path.join(BENCHMARK_DIR, 'baseline.json')
+PASSWORD = 'benchmark'
+
+# Warm calls per case at most, whatever --seconds allows
+MAX_CALLS = 20000
+# Differences below this many milliseconds are never counted as a regression
+MIN_SLACK_MS = 0.05
+
+ROUTES = [
+    ('home', '/'),
+    ('countries.index', '/countries/'),
+    ('countries.profile', '/countries/1'),
+    ('countries.api_list', '/countries/api/countries?limit=50&sort=-gdp'),
+    ('countries.api_profile', '/countries/api/countries/1'),
+    ('minerals.index', '/minerals/'),
+    ('minerals.api_list', '/minerals/api/minerals?limit=50'),
+    ('stats.index', '/stats/'),
+    ('stats.production_data', '/stats/api/production-data'),
+    ('stats.summary', '/stats/api/production/summary?group_by=year,mineral'),
+    ('stats.records', '/stats/api/production/records?country=1&year_from=2020'),
+    ('stats.trends', '/stats/api/trends?by=mineral&window=3'),
+    ('stats.scenarios', '/stats/api/scenarios?shock=1:-40,2:20&shock=3:-10&group_by=country'),
+    ('map.index', '/map/'),
+    ('map.sites_bbox', '/map/api/sites?bbox=20,-15,30,-5'),
+    ('map.sites_nearest', '/map/api/sites/nearest?lat=-10.7&lon=25.5&k=10'),
+    ('map.tile', '/map/tiles/3/4/3'),
+    ('search', '/search?q=cob'),
+    ('admin.index', '/admin/'),
+    ('admin.users', '/admin/users'),
+    ('admin.data', '/admin/data'),
+    ('auth.login_page', '/login'),
+    ('auth.register_page', '/register'),
+    ('countries.edit', '/countries/1/edit'),
+    ('export.countries_csv', '/export/countries/csv'),
+    ('export.minerals_csv', '/export/minerals/csv'),
+    ('export.production_csv', '/export/production/csv'),
+    ('export.production_ndjson_gzip', '/export/production/csv?format=ndjson&gzip=1&filter.CountryID=1'),
+]
+
+
+def _route_case(client, url):
+    def call():
+        response = client.get(url)
+        if response.status_code >= 400:
+            raise RuntimeError(f'{url} returned {response.status_code}')
+        response.get_data()
+    return call
+
+
+def _login_case(client):
+    def call():
+        response = client.post('/login', data={'username': 'admin01', 'password': PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f'login returned {response.status_code}')
+    return call
+
+
+def calibration():
+    """Fixed CSV, sort and JSON work that takes the same time whatever the data scale"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=('id', 'name', 'value'), lineterminator='\n')
+    writer.writeheader()
+    writer.writerows({'id': i, 'name': f'row {i}', 'value': i * 7919 % 1000} for i in range(2000))
+    rows = list(csv.DictReader(io.StringIO(buffer.getvalue())))
+    rows.sort(key=lambda row: (float(row['value']), row['name']))
+    return json.dumps(rows)
+
+
+def _data_cases():
+    """(name, function) of the data-layer calls"""
+    from models import data_store, listing_model, schema
+    from models.metrics_model import country_metrics
+    from models.production_model import ProductionStats
+    from models.search_model import search_index
+    from models.site_model import SiteIndex, build_tile
+    from models.dashboard_model import dashboard_counters
+    from models.trends_model import production_trends
+    from models.valuation_model import run_scenarios, monte_carlo
+
+    names = ['countries', 'minerals', 'production_stats', 'sites']
+    grid = [{'shocks': {1: shock, 2: -shock}} for shock in range(-50, 50)]
+    return [
+        ('data.get_rows', lambda: data_store.get_rows('production_stats')),
+        ('data.get_record', lambda: data_store.get_record('sites', '1')),
+        ('data.query', lambda: data_store.query('sites', CountryID='1')),
+        ('data.get_sorted', lambda: data_store.get_sorted('production_stats', 'Production_tonnes')),
+        ('data.data_version', lambda: data_store.data_version(names)),
+        ('listing.page', lambda: listing_model.page('production_stats', 'Year', True, limit=50)),
+        ('schema.records', lambda: schema.records('sites')),
+        ('metrics.totals', lambda: country_metrics.totals()),
+        ('dashboard.counts', lambda: dashboard_counters.counts()),
+        ('production.summarize', lambda: ProductionStats.load().summarize(('year', 'country'))),
+        ('sites.in_bbox', lambda: SiteIndex.load().in_bbox(20, -15, 30, -5)),
+        ('sites.nearest', lambda: SiteIndex.load().nearest(-10.7, 25.5, 10)),
+        ('sites.build_tile', lambda: build_tile(SiteIndex.load(), 3, 4, 3)),
+        ('search.search', lambda: search_index.search('cobalt site', limit=10)),
+        ('trends.trends', lambda: production_trends.trends('country', [1, 2, 3])),
+        ('valuation.scenarios', lambda: run_scenarios(grid, ('country',))),
+        ('valuation.monte_carlo', lambda: monte_carlo(1000, {1: 40, 2: 30}, ('country',), seed=1)),
+    ]
+
+
+def measure(function, seconds):
+    """Cold time, then throughput and p50/p99 of warm calls for about seconds"""
+    started = time.perf_counter()
+    function()
+    cold = time.perf_counter() - started
+
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while len(latencies) < MAX_CALLS:
+        started = time.perf_counter()
+        function()
+        finished = time.perf_counter()
+        latencies.append(finished - started)
+        if finished >= deadline:
+            break
+    latencies.sort()
+    return {
+        'cold_ms': round(cold * 1000, 3),
+        'calls': len(latencies),
+        'ops_per_sec': round(len(latencies) / sum(latencies), 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 4),
+        'p99_ms': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 4),
+    }
+
+
+def run_cases(seconds, only=None):
+    """Benchmark every case against the data set in DATA_DIR (call in a fresh process)"""
+    import app
+
+    client = app.app.test_client()
+    cases = [('calibration', calibration), ('auth.login', _login_case(app.app.test_client()))]
+    _login_case(client)()
+    cases += [(name, _route_case(client, url)) for name, url in ROUTES]
+    cases += _data_cases()
+
+    results = {}
+    for name, function in cases:
+        if only and name != 'calibration' and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(function, seconds)
+    return results
+
+
+def _run_scale(rows, args):
+    data_dir = os.path.join(args.data_root, f'rows-{rows}')
+    marker = os.path.join(data_dir, '.generated')
+    if not os.path.exists(marker):
+        from benchmarks.generate_data import generate
+        print(f"📦 Generating {rows} rows in {data_dir}")
+        generate(data_dir, rows, args.seed, PASSWORD)
+        open(marker, 'w').close()
+
+    env = dict(os.environ, DATA_DIR=data_dir, STORAGE_BACKEND='csv')
+    command = [sys.executable, '-m', 'benchmarks.suite', '--worker', '--seconds', str(args.seconds)]
+    if args.only:
+        command += ['--only'] + args.only
+    result = subprocess.run(command, env=env, cwd=os.path.dirname(BENCHMARK_DIR),
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-5000:])
+        raise SystemExit(f"❌ Benchmarks failed at {rows} rows")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def machine_scale(cases, before):
+    """How much slower this machine ran the calibration case than the baseline's (1.0 = same speed)"""
+    now, then = cases.get('calibration'), before.get('calibration')
+    if not now or not then or not then['p50_ms']:
+        return None
+    return now['p50_ms'] / then['p50_ms']
+
+
+def _rescaled(result, factor):
+    """A case result as it would have measured on a machine factor times slower"""
+    result = dict(result)
+    for key in ('cold_ms', 'p50_ms', 'p99_ms'):
+        result[key] = round(result[key] * factor, 4)
+    result['ops_per_sec'] = round(result['ops_per_sec'] / factor, 1)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Regression messages of results against a baseline scaled to this machine"""
+    regressions = []
+    for rows, cases in results.items():
+        before_cases = baseline.get(rows, {})
+        scale = machine_scale(cases, before_cases)
+        if scale is None:
+            regressions.append(f"@ {rows} rows: baseline has no calibration, record it again with --save-baseline")
+            continue
+        for name, result in cases.items():
+            before = before_cases.get(name)
+            if not before or name == 'calibration':
+                continue
+            expected = before['p50_ms'] * scale
+            limit = max(expected * (1 + tolerance), expected + MIN_SLACK_MS)
+            if result['p50_ms'] > limit:
+                regressions.append(f"{name} @ {rows} rows: p50 {result['p50_ms']}ms, scaled baseline "
+                                   f"{expected:.4f}ms (+{tolerance:.0%} allowed, machine x{scale:.2f})")
+    return regressions
+
+
+def _print_results(rows, cases, baseline):
+    before_cases = baseline.get(rows, {})
+    scale = machine_scale(cases, before_cases) or 1.0
+    print(f"\n{rows} rows (this machine x{scale:.2f} the baseline's calibration time)")
+    print(f"{'case':<30} {'cold ms':>10} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10} {'vs base':>8}")
+    for name, result in cases.items():
+        before = before_cases.get(name)
+        change = (f"{result['p50_ms'] / (before['p50_ms'] * scale) - 1:+.0%}"
+                  if before and before['p50_ms'] and name != 'calibration' else '')
+        print(f"{name:<30} {result['cold_ms']:>10.2f} {result['ops_per_sec']:>10.1f} "
+              f"{result['p50_ms']:>10.3f} {result['p99_ms']:>10.3f} {change:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 100000], help='data scales to run')
+    parser.add_argument('--seconds', type=float, default=1.0, help='time spent on each case')
+    parser.add_argument('--only', nargs='+', help='case name prefixes to run (e.g. map. data.)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--data-root', default=os.path.join(tempfile.gettempdir(), 'mineral-benchmarks'),
+                        help='where generated data sets are kept between runs')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--tolerance', type=float, default=0.3, help='allowed p50 slowdown (0.3 = 30%%)')
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        # Route/model logging goes to stderr, the last stdout line is the result
+        stdout, sys.stdout = sys.stdout, sys.stderr
+        results = run_cases(args.seconds, args.only)
+        print(json.dumps(results), file=stdout)
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as file:
+            stored = json.load(file)
+        baseline = stored['results']
+
+    results = {}
+    for rows in args.rows:
+        results[str(rows)] = _run_scale(rows, args)
+        _print_results(str(rows), results[str(rows)], baseline)
+
+    if args.save_baseline:
+        for rows, cases in results.items():
+            before = baseline.get(rows)
+            scale = machine_scale(cases, before) if before else None
+            if scale is None:
+                baseline[rows] = dict(cases)
+                continue
+            # Keep the stored calibration: cases run now are converted to its speed
+            for name, result in cases.items():
+                if name != 'calibration':
+                    before[name] = _rescaled(result, 1 / scale)
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump({'python': platform.python_version(), 'processor': platform.machine(),
+                       'recorded': time.strftime('%Y-%m-%d %H:%M:%S'), 'results': baseline},
+                      file, indent=2, sort_keys=True)
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions:")
+        for message in regressions:
+            print(f"   {message}")
+        sys.exit(1)
+    print("\n✅ No regressions" if baseline else "\nNo baseline yet, run with --save-baseline to store one")
+
+
+if __name__ == '__main__':
+    main()
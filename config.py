@@ -1,3 +1,48 @@
 # config.py
+import os
+
 SECRET_KEY = "supersecretkey"
-USER_FILE = "users.csv"
\ No newline at end of file
+
+# Folder holding the CSV data files (defaults to the project folder)
+DATA_DIR = os.environ.get("DATA_DIR", os.path.dirname(os.path.abspath(__file__)))
+
+USER_FILE = os.path.join(DATA_DIR, "users.csv")
+
+# Where tables are stored: "csv" (the files above) or "sqlite"
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "csv")
+SQLITE_PATH = os.environ.get("SQLITE_PATH", os.path.join(DATA_DIR, "minerals.sqlite3"))
+
+# Content-addressed backup store used by /backup
+BACKUP_DIR = os.environ.get("BACKUP_DIR", os.path.join(DATA_DIR, "backups"))
+
+# Sidecar file holding the saved dashboard counters
+DASHBOARD_FILE = os.environ.get("DASHBOARD_FILE", os.path.join(DATA_DIR, "dashboard_counts.json"))
+
+# Bulk import uploads and reject files
+IMPORT_DIR = os.environ.get("IMPORT_DIR", os.path.join(DATA_DIR, "imports"))
+
+# Password hashing: "pbkdf2_sha256" (PASSWORD_COST = iterations) or "scrypt" (PASSWORD_COST = N)
+PASSWORD_SCHEME = os.environ.get("PASSWORD_SCHEME", "pbkdf2_sha256")
+PASSWORD_COST = int(os.environ.get("PASSWORD_COST", "0")) or None
+# Threads hashing/verifying passwords, and logins allowed to wait for one
+PASSWORD_WORKERS = int(os.environ.get("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get("PASSWORD_QUEUE_LIMIT", "32"))
+
+# Add a Server-Timing header (data loads, templates, total) to every response
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+# Structured logging: level, records allowed to wait for the writer thread,
+# endpoint=rate pairs sampling busy endpoints, and the duration (ms) always logged
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "map.site_tile=0.05")
+LOG_SLOW_MS = float(os.environ.get("LOG_SLOW_MS", "500"))
+
+# Processes evaluating large price scenario grids (0 or 1: in the request thread)
+SCENARIO_WORKERS = int(os.environ.get("SCENARIO_WORKERS", "0"))
+
+# Compiled template bytecode shared by worker processes ("" to disable), and
+# whether templates are checked for edits on every render ("1"/"0"; default:
+# only in debug mode)
+TEMPLATE_CACHE_DIR = os.environ.get("TEMPLATE_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".template_cache"))
+TEMPLATES_AUTO_RELOAD = {"1": True, "0": False}.get(os.environ.get("TEMPLATES_AUTO_RELOAD", ""))
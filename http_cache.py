@@ -0,0 +1,91 @@
+# http_cache.py
+"""Conditional GET and response caching for read-only endpoints.
+
+Responses carry an ETag taken from the data version of the tables they
+read, plus a Last-Modified from the stored files' times when the storage
+backend records them (CSV; SQLite responses rely on the ETag). A client that sends back a matching tag gets an
+empty 304, and the serialized body of a 200 is kept per version in a
+small LRU cache of each view, so polling unchanged data costs one version
+check and no rendering.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import wraps
+
+from flask import request, make_response
+
+import instrumentation
+from models import data_store
+
+# Cached bodies kept per view by default (least recently used dropped first)
+MAX_ENTRIES = 256
+
+
+def _not_modified(etag, modified):
+    """Does the client already hold this version?"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and modified is not None:
+        return int(modified) <= request.if_modified_since.timestamp()
+    return False
+
+
+class BodyCache:
+    """LRU of (version, serialized body) per request path"""
+
+    def __init__(self, max_entries, name='view', kind='http'):
+        self.max_entries = max_entries
+        self.name = name
+        self.kind = kind
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != version:
+                instrumentation.record_cache(self.kind, self.name, False)
+                return None
+            self.entries.move_to_end(key)
+        instrumentation.record_cache(self.kind, self.name, True)
+        return entry[1]
+
+    def put(self, key, version, body):
+        with self.lock:
+            self.entries[key] = (version, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def cached_by_data(*tables, max_entries=MAX_ENTRIES):
+    """Serve a GET view with ETag/Last-Modified and cache its body until one of tables changes"""
+    def decorator(f):
+        cache = BodyCache(max_entries, f.__name__)
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            etag, modified = data_store.data_version(tables)
+            if _not_modified(etag, modified):
+                response = make_response('', 304)
+            else:
+                key = request.full_path
+                body = cache.get(key, etag)
+                if body is not None:
+                    response = make_response(body[0])
+                    response.content_type = body[1]
+                else:
+                    response = make_response(f(*args, **kwargs))
+                    if response.status_code != 200:
+                        return response
+                    cache.put(key, etag, (response.get_data(), response.content_type))
+            response.set_etag(etag)
+            if modified is not None:
+                response.last_modified = datetime.fromtimestamp(int(modified), timezone.utc)
+            # Let browsers keep the body but always come back to check the version
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
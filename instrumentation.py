@@ -0,0 +1,202 @@
+# instrumentation.py
+"""Request latency histograms and data-layer I/O counters.
+
+init_app() times every request per endpoint and every template render.
+The storage backends and the data cache report the files they open, the
+bytes and rows they read, their cache hits and misses and how long loads
+take. Everything is kept in process memory and rendered in the Prometheus
+text format by render() (served at /admin/metrics).
+
+With SERVER_TIMING on, each response also gets a Server-Timing header
+splitting its time into data loads and template rendering, which browser
+dev tools show next to the request. Streamed responses are timed until the
+stream starts.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Seconds, as the Prometheus client libraries use by default
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY = []
+
+# Per-request totals for the Server-Timing header
+_local = threading.local()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    """Monotonic count per label set"""
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        self.inc_key(tuple(labels[label] for label in self.labels), amount)
+
+    def inc_key(self, key, amount=1):
+        """inc() with the label values already in label order (for hot paths)"""
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            values = sorted(self.values.items())
+        return [f'{self.name}{_label_text(self.labels, key)} {value}' for key, value in values]
+
+
+class Histogram:
+    """Bucket counts, sum and count per label set (buckets made cumulative when rendered)"""
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values = {}  # label values -> [count per bucket..., +Inf bucket, sum, count]
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[label] for label in self.labels)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def samples(self):
+        with self.lock:
+            values = sorted((key, list(counts)) for key, counts in self.values.items())
+        lines = []
+        for key, counts in values:
+            total = 0
+            for bound, count in zip(self.buckets, counts):
+                total += count
+                lines.append(f'{self.name}_bucket{_label_text(self.labels, key, [("le", repr(bound))])} {total}')
+            lines.append(f'{self.name}_bucket{_label_text(self.labels, key, [("le", "+Inf")])} {counts[-1]}')
+            lines.append(f'{self.name}_sum{_label_text(self.labels, key)} {counts[-2]:.6f}')
+            lines.append(f'{self.name}_count{_label_text(self.labels, key)} {counts[-1]}')
+        return lines
+
+
+request_count = Counter('http_requests_total', 'Requests served', ('endpoint', 'method', 'status'))
+request_latency = Histogram('http_request_duration_seconds', 'Time to build a response', ('endpoint', 'method'))
+template_latency = Histogram('template_render_seconds', 'Time to render a template', ('template',))
+files_opened = Counter('data_files_opened_total', 'Data files opened for reading', ('table',))
+bytes_read = Counter('data_bytes_read_total', 'Bytes of data files read', ('table',))
+rows_parsed = Counter('data_rows_parsed_total', 'Rows and change log entries parsed', ('table',))
+cache_lookups = Counter('cache_lookups_total', 'Cache lookups', ('cache', 'name', 'result'))
+load_latency = Histogram('data_load_seconds', 'Time to (re)load a table from storage', ('table',))
+
+
+def record_read(table, files=1, size=0, rows=0):
+    """Count one read of stored table data"""
+    if files:
+        files_opened.inc(files, table=table)
+    if size:
+        bytes_read.inc(size, table=table)
+    rows_parsed.inc(rows, table=table)
+
+
+def record_cache(cache, name, hit):
+    cache_lookups.inc_key((cache, name, 'hit' if hit else 'miss'))
+    timing = getattr(_local, 'timing', None)
+    if timing is not None:
+        timing['hits' if hit else 'misses'] += 1
+
+
+@contextmanager
+def timed_load(table):
+    """Time a table load or refresh"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        load_latency.observe(elapsed, table=table)
+        timing = getattr(_local, 'timing', None)
+        if timing is not None:
+            timing['data'] += elapsed
+
+
+def render():
+    """Every metric in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+def _server_timing(total, timing):
+    return ', '.join([
+        f'total;dur={total * 1000:.1f}',
+        f'data;dur={timing["data"] * 1000:.1f};desc="Data loads"',
+        f'tpl;dur={timing["template"] * 1000:.1f};desc="Templates"',
+        f'cache;desc="{timing["hits"]} hits, {timing["misses"]} misses"',
+    ])
+
+
+def init_app(app, server_timing=False):
+    """Time every request and template render of app"""
+    from flask import request, before_render_template, template_rendered
+
+    @app.before_request
+    def start_timer():
+        _local.started = time.perf_counter()
+        _local.timing = {'data': 0.0, 'template': 0.0, 'hits': 0, 'misses': 0}
+        _local.templates = []
+
+    @app.after_request
+    def record_request(response):
+        started = getattr(_local, 'started', None)
+        if started is None:
+            return response
+        total = time.perf_counter() - started
+        endpoint = request.endpoint or 'unmatched'
+        request_latency.observe(total, endpoint=endpoint, method=request.method)
+        request_count.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        if server_timing:
+            response.headers['Server-Timing'] = _server_timing(total, _local.timing)
+        _local.started = _local.timing = None
+        return response
+
+    def template_started(sender, template, context, **extra):
+        templates = getattr(_local, 'templates', None)
+        if templates is not None:
+            templates.append(time.perf_counter())
+
+    def template_finished(sender, template, context, **extra):
+        templates = getattr(_local, 'templates', None)
+        if not templates:
+            return
+        elapsed = time.perf_counter() - templates.pop()
+        template_latency.observe(elapsed, template=template.name or 'string')
+        if _local.timing is not None:
+            _local.timing['template'] += elapsed
+
+    before_render_template.connect(template_started, app, weak=False)
+    template_rendered.connect(template_finished, app, weak=False)
@@ -0,0 +1,302 @@
+# models/backup_model.py
+"""Incremental, content-addressed backups of the data files.
+
+Each file is cut into chunks at row boundaries picked by a hash of the row
+text, so inserting or deleting rows only changes the chunks around them.
+Chunks are stored zlib-compressed under their SHA-256 in
+backups/objects/, and a snapshot is a small JSON manifest listing each
+file's chunks. Unchanged files (same size and mtime as in the previous
+snapshot) are not even read again, and unchanged chunks are never stored
+twice, so frequent snapshots of big datasets cost little disk and I/O.
+
+Backups and restores run on a single background worker; callers get a job
+id back immediately and can poll get_job() from any worker process (job
+state is kept in backups/jobs/).
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from config import BACKUP_DIR
+from models import data_store
+from models.job_store import JobStore
+
+log = logging.getLogger(__name__)
+
+# Chunk boundaries: at least MIN, at most MAX bytes, else where crc32(row) & MASK == 0
+MIN_CHUNK = 64 * 1024
+MAX_CHUNK = 4 * 1024 * 1024
+BOUNDARY_MASK = 0xFFF
+
+OBJECTS_DIR = os.path.join(BACKUP_DIR, 'objects')
+SNAPSHOTS_DIR = os.path.join(BACKUP_DIR, 'snapshots')
+
+# Snapshot ids are their UTC creation time, e.g. 20250101T120000123456Z
+SNAPSHOT_ID = re.compile(r'^\d{8}T\d{12}Z$')
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='backup')
+_jobs = JobStore(os.path.join(BACKUP_DIR, 'jobs'))
+
+
+def _iter_chunks(path):
+    """Content-defined chunks of a file, cut after rows"""
+    with open(path, 'rb') as file:
+        parts, size = [], 0
+        for line in file:
+            parts.append(line)
+            size += len(line)
+            if size >= MAX_CHUNK or (size >= MIN_CHUNK and zlib.crc32(line) & BOUNDARY_MASK == 0):
+                yield b''.join(parts)
+                parts, size = [], 0
+        if parts:
+            yield b''.join(parts)
+
+
+def _object_path(digest):
+    return os.path.join(OBJECTS_DIR, digest[:2], digest)
+
+
+def _store_chunk(chunk):
+    """Save a chunk once under its hash, returns (digest, bytes written)"""
+    digest = hashlib.sha256(chunk).hexdigest()
+    path = _object_path(digest)
+    if os.path.exists(path):
+        return digest, 0
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = zlib.compress(chunk, 6)
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temp_path, 'wb') as file:
+        file.write(data)
+    os.replace(temp_path, path)
+    return digest, len(data)
+
+
+def _data_files():
+    """(backup name, path on disk, table name) of every data file to back up"""
+    backend = data_store.backend
+    if hasattr(backend, 'db_path'):
+        return [(os.path.basename(backend.db_path), backend.db_path, None)]
+    files = []
+    for name in data_store.TABLE_FILES:
+        for path in (backend.path(name), backend.log_path(name)):
+            if os.path.exists(path):
+                files.append((os.path.basename(path), path, name))
+    return files
+
+
+def list_snapshots():
+    """Snapshot manifests, oldest first (without the chunk lists)"""
+    if not os.path.isdir(SNAPSHOTS_DIR):
+        return []
+    snapshots = []
+    for filename in sorted(os.listdir(SNAPSHOTS_DIR)):
+        if filename.endswith('.json'):
+            with open(os.path.join(SNAPSHOTS_DIR, filename), 'r', encoding='utf-8') as file:
+                manifest = json.load(file)
+            snapshots.append(dict((key, value) for key, value in manifest.items() if key != 'files'))
+    return snapshots
+
+
+def load_snapshot(snapshot_id):
+    if not SNAPSHOT_ID.match(str(snapshot_id)):
+        raise ValueError(f"Unknown snapshot '{snapshot_id}'")
+    path = os.path.join(SNAPSHOTS_DIR, f'{snapshot_id}.json')
+    if not os.path.exists(path):
+        raise ValueError(f"Unknown snapshot '{snapshot_id}'")
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+
+def _parse_time(text):
+    """Aware datetime of an ISO timestamp (UTC when it has no offset)"""
+    try:
+        moment = datetime.fromisoformat(str(text).strip())
+    except ValueError:
+        raise ValueError(f"'{text}' is not an ISO timestamp")
+    return moment if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+
+
+def snapshot_at(moment):
+    """Id of the latest snapshot taken at or before an ISO timestamp"""
+    at = _parse_time(moment)
+    chosen = None
+    for snapshot in list_snapshots():
+        if _parse_time(snapshot['created']) <= at:
+            chosen = snapshot['id']
+    if chosen is None:
+        raise ValueError(f"No snapshot at or before {moment}")
+    return chosen
+
+
+def create_snapshot():
+    """Back up every data file, returns the new manifest"""
+    snapshots = list_snapshots()
+    previous = load_snapshot(snapshots[-1]['id'])['files'] if snapshots else {}
+    created = datetime.now(timezone.utc)
+    manifest = {
+        'id': created.strftime('%Y%m%dT%H%M%S%fZ'),
+        'created': created.isoformat(),
+        'files': {},
+        'bytes_stored': 0,
+        'files_unchanged': 0
+    }
+    for backup_name, path, table in _data_files():
+        if table is None:
+            entry = _snapshot_sqlite(path, manifest)
+        else:
+            # Hold the writer lock so the CSV and its change log are read at one point in time
+            with data_store.write_lock(table):
+                entry = _snapshot_file(path, previous.get(backup_name), manifest)
+        manifest['files'][backup_name] = entry
+
+    os.makedirs(SNAPSHOTS_DIR, exist_ok=True)
+    temp_path = os.path.join(SNAPSHOTS_DIR, manifest['id'] + '.json.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file)
+    os.replace(temp_path, os.path.join(SNAPSHOTS_DIR, manifest['id'] + '.json'))
+    return manifest
+
+
+def _snapshot_file(path, previous, manifest):
+    stat = os.stat(path)
+    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+        manifest['files_unchanged'] += 1
+        return previous
+    digest = hashlib.sha256()
+    chunks = []
+    for chunk in _iter_chunks(path):
+        digest.update(chunk)
+        chunk_digest, written = _store_chunk(chunk)
+        chunks.append(chunk_digest)
+        manifest['bytes_stored'] += written
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest(), 'chunks': chunks}
+
+
+def _snapshot_sqlite(db_path, manifest):
+    """Consistent copy through SQLite's online backup API, then chunked like a file"""
+    temp_path = os.path.join(BACKUP_DIR, f'.sqlite-{uuid.uuid4().hex}.tmp')
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    source, target = sqlite3.connect(db_path), sqlite3.connect(temp_path)
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+    try:
+        entry = _snapshot_file(temp_path, None, manifest)
+    finally:
+        os.remove(temp_path)
+    return entry
+
+
+def restore_snapshot(snapshot_id):
+    """Put every file of a snapshot back in place, returns the restored names"""
+    manifest = load_snapshot(snapshot_id)
+    backend = data_store.backend
+    if hasattr(backend, 'db_path'):
+        entry = manifest['files'].get(os.path.basename(backend.db_path))
+        if entry is None:
+            raise ValueError(f"Snapshot {snapshot_id} has no SQLite database")
+        _restore_sqlite(backend.db_path, entry)
+        data_store.invalidate()
+        return [os.path.basename(backend.db_path)]
+
+    restored = []
+    for name in data_store.TABLE_FILES:
+        with data_store.write_lock(name):
+            for path in (backend.path(name), backend.log_path(name)):
+                entry = manifest['files'].get(os.path.basename(path))
+                if entry is not None:
+                    _restore_file(path, entry)
+                    restored.append(os.path.basename(path))
+                elif path == backend.log_path(name) and os.path.exists(path):
+                    # Edits logged after the snapshot must not be replayed over it
+                    open(path, 'w').close()
+    data_store.invalidate()
+    return restored
+
+
+def _rebuild(entry, path):
+    """Write a backed-up file to path, checking its hash"""
+    digest = hashlib.sha256()
+    with open(path, 'wb') as file:
+        for chunk_digest in entry['chunks']:
+            with open(_object_path(chunk_digest), 'rb') as chunk_file:
+                chunk = zlib.decompress(chunk_file.read())
+            digest.update(chunk)
+            file.write(chunk)
+    if digest.hexdigest() != entry['sha256']:
+        os.remove(path)
+        raise ValueError(f"Backup of {os.path.basename(path)} is corrupt")
+
+
+def _restore_file(path, entry):
+    temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    _rebuild(entry, temp_path)
+    os.replace(temp_path, path)
+
+
+def _restore_sqlite(db_path, entry):
+    """Copy a backed-up database over the live one through the backup API"""
+    temp_path = os.path.join(BACKUP_DIR, f'.sqlite-{uuid.uuid4().hex}.tmp')
+    _rebuild(entry, temp_path)
+    source, target = sqlite3.connect(temp_path), sqlite3.connect(db_path)
+    try:
+        versions = dict(target.execute('SELECT name, version FROM _table_versions').fetchall())
+        source.backup(target)
+        # Move every version forward so no cache mistakes restored tables for ones it already has
+        with target:
+            for name, version in versions.items():
+                target.execute('INSERT INTO _table_versions (name, version) VALUES (?, ?) '
+                               'ON CONFLICT(name) DO UPDATE SET version = excluded.version', (name, version + 1))
+    finally:
+        source.close()
+        target.close()
+        os.remove(temp_path)
+
+
+def _run_job(job_id, work):
+    _update_job(job_id, status='running', started=time.time())
+    try:
+        result = work()
+        _update_job(job_id, status='finished', finished=time.time(), result=result)
+    except Exception as e:
+        log.exception('backup job failed', extra={'job_id': job_id})
+        _update_job(job_id, status='failed', finished=time.time(), error=str(e))
+
+
+def _update_job(job_id, **fields):
+    _jobs.update(job_id, **fields)
+
+
+def _submit(kind, work):
+    job_id = _jobs.new_id()
+    _jobs.create(job_id, kind=kind, status='queued', queued=time.time())
+    _executor.submit(_run_job, job_id, work)
+    return job_id
+
+
+def start_backup():
+    """Queue a snapshot on the background worker, returns the job id"""
+    def work():
+        manifest = create_snapshot()
+        return dict((key, value) for key, value in manifest.items() if key != 'files')
+    return _submit('backup', work)
+
+
+def start_restore(snapshot_id):
+    """Queue a restore on the background worker, returns the job id"""
+    load_snapshot(snapshot_id)
+    return _submit('restore', lambda: {'snapshot': snapshot_id, 'files': restore_snapshot(snapshot_id)})
+
+
+def get_job(job_id):
+    return _jobs.get(job_id)
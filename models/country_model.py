@@ -1,5 +1,15 @@
 # models/country_model.py
-class Country:
+import logging
+
+from models import data_store, schema
+from models.metrics_model import country_metrics
+
+log = logging.getLogger(__name__)
+
+
+class Country(schema.Record):
+    __slots__ = ('country_id', 'country_name', 'gdp_billion_usd', 'mining_revenue_billion_usd', 'key_projects')
+    
     def __init__(self, country_id, country_name, gdp_billion_usd, mining_revenue_billion_usd, key_projects):
         self.country_id = country_id
         self.country_name = country_name
@@ -7,58 +17,69 @@ class Country:
         self.mining_revenue_billion_usd = mining_revenue_billion_usd
         self.key_projects = key_projects
     
+    @property
+    def mining_contribution(self):
+        """Mining revenue as % of GDP (materialized in metrics_model)"""
+        return country_metrics.contribution(self.country_id)
+    
+    @classmethod
+    def from_row(cls, row):
+        """Build a Country from a countries.csv row"""
+        return schema.for_row('countries', row).record(row)
+    
     @classmethod
     def get_all_countries(cls):
         """Get all countries from CSV data"""
-        countries_data = [
-            (1, "DRC (Congo)", 55, 12, "Cobalt expansion in Kolwezi"),
-            (2, "South Africa", 350, 25, "Bushveld Lithium Project"),
-            (3, "Mozambique", 20, 4, "Balama Graphite Project"),
-            (4, "Namibia", 15, 3, "Otjozondu Manganese Project")
-        ]
-        
-        countries = []
-        for data in countries_data:
-            country = cls(*data)
-            countries.append(country)
-        
-        return countries
+        return schema.records('countries')
     
     @classmethod
     def get_country_by_id(cls, country_id):
         """Get specific country by ID"""
-        countries = cls.get_all_countries()
-        for country in countries:
-            if country.country_id == country_id:
-                return country
-        return None
+        countries_by_id = data_store.get_derived('countries', 'country_objects_by_id', _index_countries)
+        return countries_by_id.get(country_id)
+    
+    @classmethod
+    def get_production_stats(cls, country_id):
+        """production_stats.csv rows for a country"""
+        return data_store.get_related('production_stats', 'CountryID', country_id)
+    
+    @classmethod
+    def get_sites(cls, country_id):
+        """sites.csv rows for a country"""
+        return data_store.get_related('sites', 'CountryID', country_id)
     
     @classmethod
     def update_country(cls, country_id, country_name, gdp, mining_revenue, key_projects):
-        """Update country data - SIMPLE VERSION THAT WORKS"""
+        """Update country data (recorded in the countries change log)"""
         try:
-            print(f"🔄 Updating country {country_id}: {country_name}")
-            print(f"   GDP: ${gdp}B, Mining Revenue: ${mining_revenue}B")
-            print(f"   Projects: {key_projects}")
+            log.info('updating country', extra={'country_id': country_id, 'country_name': country_name})
             
-            # For now, just return True to simulate successful update
-            # In a real app, this would update a database
-            return True
+            return data_store.update_row('countries', country_id, schema.for_table('countries').to_row({
+                'country_name': country_name,
+                'gdp_billion_usd': gdp,
+                'mining_revenue_billion_usd': mining_revenue,
+                'key_projects': key_projects
+            }))
             
         except Exception as e:
-            print(f"❌ Error in update_country: {e}")
+            log.exception('update_country failed', extra={'country_id': country_id})
             return False
     
     @classmethod
     def get_countries_stats(cls):
         """Get statistics for all countries"""
-        countries = cls.get_all_countries()
-        total_gdp = sum(country.gdp_billion_usd for country in countries)
-        total_mining_revenue = sum(country.mining_revenue_billion_usd for country in countries)
+        totals = country_metrics.totals()
         
         return {
-            'total_countries': len(countries),
-            'total_gdp': total_gdp,
-            'total_mining_revenue': total_mining_revenue,
-            'avg_mining_contribution': (total_mining_revenue / total_gdp) * 100 if total_gdp > 0 else 0
-        }
\ No newline at end of file
+            'total_countries': totals['total_countries'],
+            'total_gdp': totals['total_gdp'],
+            'total_mining_revenue': totals['total_mining_revenue'],
+            'avg_mining_contribution': totals['avg_contribution']
+        }
+
+
+def _index_countries(rows):
+    return {country.country_id: country for country in Country.get_all_countries()}
+
+
+schema.register('countries', Country)
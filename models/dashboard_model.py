@@ -0,0 +1,146 @@
+# models/dashboard_model.py
+"""Dashboard counters kept up to date on every write.
+
+Row counts and the other dashboard summaries (countries with active
+projects, ...) follow data_store change notifications one row at a time,
+so reading them never walks a table. They are saved with the storage
+signature of each table in a small sidecar file (DASHBOARD_FILE); a fresh
+process whose tables still have those signatures uses the saved numbers
+without loading the tables at all. A table that changed behind our back
+(another process, an edited file, a reload) is refreshed and recounted
+once, on the next read.
+"""
+import json
+import logging
+import os
+import threading
+import uuid
+
+from config import DASHBOARD_FILE, STORAGE_BACKEND
+from models import data_store, schema
+
+log = logging.getLogger(__name__)
+
+
+def _has_projects(row):
+    return bool(schema.for_row('countries', row).record(row).key_projects.strip())
+
+
+# table -> {counter: rows it counts (None = every row)}
+COUNTERS = {
+    'countries': {'countries': None, 'active_projects': _has_projects},
+    'minerals': {'minerals': None},
+    'production_stats': {'production_records': None},
+    'sites': {'sites': None},
+    'users': {'users': None},
+}
+
+# Counts that follow the in-memory table since its last recount (signature not known yet)
+_LIVE = 'live'
+
+
+def _frozen(signature):
+    """Storage signature read back from JSON (lists become tuples again)"""
+    return tuple(_frozen(part) for part in signature) if isinstance(signature, list) else signature
+
+
+class DashboardCounters:
+    def __init__(self, path=DASHBOARD_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.dirty = False
+        self.values = {}      # table -> {counter: count}
+        self.signatures = {}  # table -> storage signature the counts match, or _LIVE
+
+    # --- maintenance (called from data_store notifications) ---
+
+    def on_change(self, table, old_row, new_row):
+        with self.lock:
+            if old_row is None and new_row is None:
+                self.signatures.pop(table.name, None)
+                return
+            if table.name not in self.signatures:
+                return
+            counts = self.values[table.name]
+            for row, step in ((old_row, -1), (new_row, 1)):
+                if row is None:
+                    continue
+                for counter, counts_row in COUNTERS[table.name].items():
+                    if counts_row is None or counts_row(row):
+                        counts[counter] += step
+            self.signatures[table.name] = _LIVE
+
+    def _recount(self, table):
+        self.values[table.name] = dict(
+            (counter, len(table.rows) if counts_row is None else sum(1 for row in table.rows if counts_row(row)))
+            for counter, counts_row in COUNTERS[table.name].items())
+
+    # --- sidecar ---
+
+    def _load(self):
+        """Counts saved by an earlier process, if the file is usable"""
+        self.loaded = True
+        try:
+            with open(self.path, encoding='utf-8') as file:
+                saved = json.load(file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            log.warning('dashboard counters file unreadable, recounting', extra={'path': self.path})
+            return
+        if saved.get('backend') != STORAGE_BACKEND:
+            return
+        for name, entry in saved.get('tables', {}).items():
+            if name in COUNTERS and set(entry.get('counts', ())) == set(COUNTERS[name]):
+                self.values[name] = entry['counts']
+                self.signatures[name] = _frozen(entry['signature'])
+
+    def _save(self):
+        with self.lock:
+            tables = dict((name, {'signature': self.signatures[name], 'counts': dict(self.values[name])})
+                          for name in COUNTERS if name in self.signatures and self.signatures[name] != _LIVE)
+            self.dirty = False
+        temp_path = f'{self.path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump({'backend': STORAGE_BACKEND, 'tables': tables}, file)
+            os.replace(temp_path, self.path)
+        except OSError:
+            log.warning('could not save dashboard counters', exc_info=True, extra={'path': self.path})
+
+    # --- reads ---
+
+    def _ensure_current(self, name):
+        """Bring one table's counts in line with its stored data"""
+        signature = data_store.backend.signature(name)
+        with self.lock:
+            if name in self.signatures and self.signatures[name] == signature:
+                return
+        table = data_store.get_table(name)
+        # Same lock order as on_change: table first, then counters
+        with table.lock, self.lock:
+            if self.signatures.get(name) != _LIVE:
+                self._recount(table)
+            self.signatures[name] = table.signature
+            self.dirty = True
+
+    def counts(self):
+        """{counter: count} of every dashboard counter"""
+        with self.lock:
+            if not self.loaded:
+                self._load()
+        for name in COUNTERS:
+            self._ensure_current(name)
+        if self.dirty:
+            self._save()
+        with self.lock:
+            result = {}
+            for name in COUNTERS:
+                result.update(self.values[name])
+            return result
+
+
+dashboard_counters = DashboardCounters()
+for _name in COUNTERS:
+    data_store.subscribe(_name, dashboard_counters.on_change)
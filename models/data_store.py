@@ -0,0 +1,598 @@
+# models/data_store.py
+"""Shared in-memory cache for the app's data tables.
+
+Every table is loaded once from the configured storage backend (CSV files
+or SQLite, see models/storage.py) and kept in memory. A table is only
+re-read when the backend reports a change, so requests never pay the parse
+cost while the data is unchanged. Primary and foreign key hash indexes are
+built at load time so single records and their related rows resolve in
+constant time.
+
+When only appends explain a change (new CSV rows, new change log entries)
+just those are applied instead of reloading, reading no further than the
+sizes the change was detected at; a file edited in place or renamed over
+is loaded in full (see CsvBackend.changes_since). Writers serialize
+through a per-table lock that also holds an OS file lock where one is
+available; readers take that file lock shared while they read, so they
+never see half a write.
+
+Rows are kept in an insertion-ordered dict keyed by a slot number, so an
+edit swaps or drops one entry instead of copying the table, and derived
+values that name the columns they read survive edits to other columns.
+
+Edits are applied to memory straight away. On the CSV backend they are
+appended to a change log that a background thread later folds into the
+CSV with an atomic rename.
+"""
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows - thread lock only
+    fcntl = None
+
+import instrumentation
+from config import DATA_DIR, STORAGE_BACKEND, SQLITE_PATH
+from models import storage
+from models.storage import TABLE_FILES
+
+log = logging.getLogger(__name__)
+
+# Primary key column of each table (first candidate present in the header wins)
+PRIMARY_KEYS = {
+    'countries': ('CountryID', 'country_id', 'id', 'ID', 'Index'),
+    'minerals': ('MineralID',),
+    'production_stats': ('StatID',),
+    'sites': ('SiteID',),
+    'users': ('UserID',),
+    'roles': ('RoleID',),
+}
+
+# Columns whose values are unique per row (e.g. login names)
+UNIQUE_INDEXES = {
+    'users': ('Username',),
+}
+
+# Foreign key columns indexed for "all rows related to X" lookups
+SECONDARY_INDEXES = {
+    'production_stats': ('CountryID', 'MineralID'),
+    'sites': ('CountryID', 'MineralID'),
+}
+
+# Seconds of quiet after an edit before the change log is compacted
+COMPACT_DELAY = 2.0
+
+backend = storage.create_backend(STORAGE_BACKEND, DATA_DIR, SQLITE_PATH)
+
+
+def data_path(name):
+    """Full path of the CSV file behind a table"""
+    return os.path.join(DATA_DIR, TABLE_FILES[name])
+
+
+def _index_value(value):
+    return str(value or '').strip()
+
+
+def _cell(value):
+    return '' if value is None else str(value)
+
+
+class Table:
+    """One table held in memory"""
+
+    def __init__(self, name, source=None):
+        self.name = name
+        self.source = source or backend
+        self.columns = []
+        self.slots = {}    # slot -> row, in table order
+        self.slot_of = {}  # id(row) -> slot
+        self.next_slot = 0
+        self._rows = []
+        self.key_column = None
+        self.by_key = {}
+        self.max_key = 0
+        self.unique = {}
+        self.indexes = {}
+        self.signature = None
+        self.version = 0
+        self.derived = {}
+        self.lock = threading.RLock()
+
+    @property
+    def rows(self):
+        """Rows in table order (shared list, rebuilt after a row is removed or swapped)"""
+        rows = self._rows
+        if rows is None:
+            with self.lock:
+                rows = self._rows
+                if rows is None:
+                    rows = self._rows = list(self.slots.values())
+        return rows
+
+    def related(self, column, value):
+        """Rows whose indexed column equals value"""
+        return list(self.indexes[column].get(str(value).strip(), {}).values())
+
+    def refresh(self):
+        """Re-read the table if it changed since the last load"""
+        signature = self.source.signature(self.name)
+        if signature == self.signature and self.version:
+            instrumentation.record_cache('table', self.name, True)
+            return self
+        with self.lock, _shared_file_lock(self):
+            signature = self.source.signature(self.name)
+            if signature == self.signature and self.version:
+                instrumentation.record_cache('table', self.name, True)
+                return self
+            instrumentation.record_cache('table', self.name, False)
+            with instrumentation.timed_load(self.name):
+                tail = None
+                if self.version and self.columns and self.signature is not None:
+                    tail = self.source.changes_since(self.name, self.signature, signature, self.columns)
+                if tail is None:
+                    signature = self.load(signature)
+                else:
+                    changes, signature = tail
+                    for change in changes:
+                        self.apply_change(change)
+            # What was actually read, which trails the files while a line is still being written
+            self.signature = signature
+        return self
+
+    def load(self, signature=None):
+        """Load the whole table into memory, returns the storage signature it reflects"""
+        columns, rows, changes, signature = self.source.load(self.name, signature)
+        self.columns = columns
+        self.slots = {}
+        self.slot_of = {}
+        self._rows = []
+        self.key_column = next(
+            (column for column in PRIMARY_KEYS.get(self.name, ()) if column in columns), None)
+        self.by_key = {}
+        self.max_key = 0
+        self.unique = {column: {} for column in UNIQUE_INDEXES.get(self.name, ())}
+        self.indexes = {column: {} for column in SECONDARY_INDEXES.get(self.name, ())}
+        self.add_rows(rows)
+        for change in changes:
+            self.apply_change(change, notify=False)
+        _notify(self.name, self, None, None)
+        return signature
+
+    def add_rows(self, rows):
+        """Add rows to memory and to every index"""
+        for row in rows:
+            slot = self.next_slot
+            self.next_slot += 1
+            self.slots[slot] = row
+            self.slot_of[id(row)] = slot
+            if self._rows is not None:
+                self._rows.append(row)
+            if self.key_column:
+                key = _index_value(row.get(self.key_column))
+                self.by_key[key] = row
+                if key.isdigit():
+                    self.max_key = max(self.max_key, int(key))
+            for column, index in self.unique.items():
+                index[_index_value(row.get(column))] = row
+            for column, index in self.indexes.items():
+                index.setdefault(_index_value(row.get(column)), {})[slot] = row
+        self._changed()
+
+    def write(self, change):
+        """Persist a change and apply it to memory (call under write_lock)"""
+        if 'row' in change:
+            change = dict(change, row=dict((column, _cell(change['row'].get(column))) for column in self.columns))
+        self.source.write(self.name, self.columns, self.key_column, change)
+        self.apply_change(change)
+        self.signature = self.source.signature(self.name)
+        _schedule_compaction(self.name)
+
+    def write_many(self, changes):
+        """Persist and apply a batch of changes at once (call under write_lock).
+
+        Listeners get a single whole-table notification instead of one per row.
+        """
+        changes = [dict(change, row=dict((column, _cell(change['row'].get(column))) for column in self.columns))
+                   if 'row' in change else change for change in changes]
+        if not changes:
+            return
+        self.source.write_many(self.name, self.columns, self.key_column, changes)
+        self.add_rows([change['row'] for change in changes if change['op'] == 'append'])
+        for change in changes:
+            if change['op'] != 'append':
+                self.apply_change(change, notify=False)
+        _notify(self.name, self, None, None)
+        self.signature = self.source.signature(self.name)
+        _schedule_compaction(self.name)
+
+    def append(self, row):
+        """Add a brand new row (call under write_lock)"""
+        if not self.columns:
+            self.columns = list(row)
+        self.write({'op': 'append', 'row': row})
+
+    def apply_change(self, change, notify=True):
+        """Apply one append/upsert/delete change to memory and the indexes"""
+        old = row = None
+        if change['op'] == 'append':
+            row = change['row']
+            self.add_rows([row])
+        else:
+            old = self.by_key.get(change['key'])
+            if change['op'] == 'delete':
+                if old is not None:
+                    self._remove(old)
+            else:
+                row = dict((column, _cell(change['row'].get(column))) for column in self.columns)
+                if old is None:
+                    self.add_rows([row])
+                else:
+                    self._remove(old, replacement=row)
+        if notify:
+            _notify(self.name, self, old, row)
+
+    def _remove(self, old, replacement=None):
+        """Drop (or swap in place) one row; readers keep the rows list they already hold"""
+        slot = self.slot_of.pop(id(old))
+        key = _index_value(old.get(self.key_column))
+        if replacement is None:
+            del self.slots[slot]
+            del self.by_key[key]
+        else:
+            self.slots[slot] = replacement
+            self.slot_of[id(replacement)] = slot
+            self.by_key[key] = replacement
+        self._rows = None
+        for column, index in self.unique.items():
+            index.pop(_index_value(old.get(column)), None)
+            if replacement is not None:
+                index[_index_value(replacement.get(column))] = replacement
+        for column, index in self.indexes.items():
+            value = _index_value(old.get(column))
+            if replacement is not None and _index_value(replacement.get(column)) == value:
+                index[value][slot] = replacement
+                continue
+            bucket = index.get(value)
+            if bucket is not None:
+                bucket.pop(slot, None)
+                if not bucket:
+                    del index[value]
+            if replacement is not None:
+                index.setdefault(_index_value(replacement.get(column)), {})[slot] = replacement
+        if replacement is None:
+            self._changed()
+        else:
+            self._changed(set(column for column in self.columns if old.get(column) != replacement.get(column)))
+
+    def _changed(self, columns=None):
+        """New version after an edit.
+
+        Derived values are dropped, except those naming the columns they read
+        when only other columns (given) changed.
+        """
+        self.version += 1
+        if columns is None or not self.derived:
+            self.derived = {}
+            return
+        self.derived = dict((key, (self.version, value, reads))
+                            for key, (version, value, reads) in self.derived.items()
+                            if reads is not None and reads.isdisjoint(columns))
+
+    def compact(self):
+        """Fold pending changes into the base storage (call under write_lock)"""
+        self.source.compact(self.name, self.columns, self.rows)
+        self.signature = self.source.signature(self.name)
+
+    def get_derived(self, key, builder, columns=None):
+        """Value computed from the rows, cached until the table changes.
+
+        Give the columns builder reads to keep the value across edits of other columns.
+        """
+        version = self.version
+        cached = self.derived.get(key)
+        if cached is not None and cached[0] == version:
+            instrumentation.record_cache('derived', self.name, True)
+            return cached[1]
+        instrumentation.record_cache('derived', self.name, False)
+        value = builder(self.rows)
+        with self.lock:
+            if self.version == version:
+                self.derived[key] = (version, value, frozenset(columns) if columns is not None else None)
+        return value
+
+
+_tables = {}
+_tables_lock = threading.Lock()
+# Tables whose write lock the current thread holds
+_writing = threading.local()
+
+
+@contextmanager
+def _shared_file_lock(table):
+    """Keep writers of other processes out while a table's files are read"""
+    if not fcntl or table.name in getattr(_writing, 'names', ()):
+        yield
+        return
+    try:
+        lock_file = open(table.source.lock_path(table.name), 'a')
+    except OSError:  # read-only data folder: nobody can be writing
+        yield
+        return
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_listeners = {}
+
+
+def subscribe(name, listener):
+    """Call listener(table, old_row, new_row) after every row change of a table.
+
+    old_row is None for inserts and new_row is None for deletes; both are
+    None when the whole table was (re)loaded or changed in bulk. Listeners run under the table
+    lock, so they should only update in-memory state.
+    """
+    _listeners.setdefault(name, []).append(listener)
+
+
+def _notify(name, table, old_row, new_row):
+    if table is not _tables.get(name):
+        return  # throwaway tables (e.g. copy_tables) are nobody's business
+    for listener in _listeners.get(name, ()):
+        listener(table, old_row, new_row)
+
+
+def _get_cached(name):
+    table = _tables.get(name)
+    if table is None:
+        with _tables_lock:
+            table = _tables.get(name)
+            if table is None:
+                table = _tables[name] = Table(name)
+    return table
+
+
+def get_table(name):
+    """Cached table, reloaded first if its stored data changed"""
+    return _get_cached(name).refresh()
+
+
+def get_rows(name):
+    """All rows of a table as dicts (shared - do not modify them)"""
+    return get_table(name).rows
+
+
+def get_columns(name):
+    """Column names of a table in file order"""
+    return get_table(name).columns
+
+
+def get_record(name, key):
+    """Row with the given primary key, or None"""
+    return get_table(name).by_key.get(str(key).strip())
+
+
+def get_unique(name, column, value):
+    """Row whose unique column equals value, or None"""
+    return get_table(name).unique[column].get(str(value).strip())
+
+
+def next_key(name):
+    """Next free integer primary key (call under write_lock)"""
+    return get_table(name).max_key + 1
+
+
+def get_related(name, column, value):
+    """Rows whose indexed column equals value (shared - do not modify them)"""
+    table = get_table(name)
+    if column not in table.indexes:
+        raise KeyError(f"{name}.{column} is not indexed")
+    return table.related(column, value)
+
+
+def query(name, **filters):
+    """Rows whose columns equal the given values.
+
+    SQLite answers from its own indexes; otherwise the first filter on an
+    indexed column narrows the in-memory rows before the rest are checked.
+    """
+    if hasattr(backend, 'query'):
+        return backend.query(name, filters)
+    table = get_table(name)
+    rows = table.rows
+    for column, value in filters.items():
+        if column in table.indexes:
+            rows = table.related(column, value)
+            break
+    wanted = dict((column, str(value).strip()) for column, value in filters.items())
+    return [row for row in rows if all(_index_value(row.get(column)) == value for column, value in wanted.items())]
+
+
+def insert_row(name, row):
+    """Add a row under a new primary key, returns the key"""
+    with write_lock(name) as table:
+        key = str(table.max_key + 1)
+        row = dict(row)
+        # Fill the key into every ID alias column the header has
+        for column in PRIMARY_KEYS.get(name, ()):
+            if column in table.columns and not row.get(column):
+                row[column] = key
+        table.write({'op': 'upsert', 'key': key, 'row': row})
+    return key
+
+
+def update_row(name, key, fields):
+    """Change some columns of a row, returns False when the key is unknown"""
+    key = str(key).strip()
+    with write_lock(name) as table:
+        old = table.by_key.get(key)
+        if old is None:
+            return False
+        row = dict(old)
+        row.update((column, value) for column, value in fields.items() if column in table.columns)
+        table.write({'op': 'upsert', 'key': key, 'row': row})
+    return True
+
+
+def delete_row(name, key):
+    """Remove a row, returns False when the key is unknown"""
+    key = str(key).strip()
+    with write_lock(name) as table:
+        if key not in table.by_key:
+            return False
+        table.write({'op': 'delete', 'key': key})
+    return True
+
+
+def replace_table(name, columns, rows):
+    """Replace a whole table in storage and memory"""
+    with write_lock(name) as table:
+        table.source.replace(name, columns, rows)
+        table.signature = None
+        table.refresh()
+
+
+def compact(name):
+    """Fold a table's change log into its base storage now"""
+    with write_lock(name) as table:
+        table.compact()
+
+
+def copy_tables(source, target, names=None):
+    """Copy tables between storage backends, returns row counts per table"""
+    counts = {}
+    for name in names or TABLE_FILES:
+        # A throwaway Table applies any pending change log before copying
+        table = Table(name, source).refresh()
+        if table.columns:
+            target.replace(name, table.columns, table.rows)
+            counts[name] = len(table.rows)
+    return counts
+
+
+def data_version(names):
+    """(version tag, last change time or None) of a set of tables.
+
+    Both come from the backend change signatures, so they move on every
+    write and are the same in every worker process. The time is None when
+    the backend does not record one.
+    """
+    tables = [get_table(name) for name in names]
+    signatures = repr([(table.name, table.signature) for table in tables])
+    times = [table.source.modified(table.signature) for table in tables]
+    modified = max(times) if times and None not in times else None
+    return hashlib.sha1(signatures.encode('utf-8')).hexdigest()[:16], modified
+
+
+def sort_value(value):
+    """Comparable sort key of a cell: blanks first, then numbers, then text"""
+    value = _index_value(value)
+    if not value:
+        return (0, 0)
+    try:
+        return (1, float(value))
+    except ValueError:
+        return (2, value.casefold())
+
+
+def get_sorted(name, column):
+    """(keys, rows) of a table ordered by column, cached until the table changes.
+
+    keys[i] is (sort_value(cell), sort_value(primary key)) for rows[i], so
+    bisect finds a value range or a pagination cursor in O(log n).
+    """
+    def build(rows):
+        table = _get_cached(name)
+        ordered = sorted((((sort_value(row.get(column)), sort_value(row.get(table.key_column))), row) for row in rows),
+                         key=lambda pair: pair[0])
+        return [key for key, row in ordered], [row for key, row in ordered]
+    return get_table(name).get_derived(('sorted', column), build)
+
+
+def get_derived(name, key, builder, columns=None):
+    """Cache builder(rows) for a table until the table changes (or, with columns, until they do)"""
+    return get_table(name).get_derived(key, builder, columns)
+
+
+@contextmanager
+def write_lock(name):
+    """Serialize writers of a table across threads and worker processes.
+
+    Yields the freshly refreshed table so checks made inside the block
+    (duplicates, next ID) see every write that happened before it.
+    """
+    table = _get_cached(name)
+    with table.lock:
+        with open(table.source.lock_path(name), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            names = _writing.__dict__.setdefault('names', set())
+            names.add(name)
+            try:
+                yield table.refresh()
+            finally:
+                names.discard(name)
+                if fcntl:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_compact_pending = set()
+_compact_wakeup = threading.Event()
+_compactor = None
+
+
+def _schedule_compaction(name):
+    """Ask the background compactor to fold this table's log soon"""
+    global _compactor
+    _compact_pending.add(name)
+    _compact_wakeup.set()
+    if _compactor is None:
+        with _tables_lock:
+            if _compactor is None:
+                _compactor = threading.Thread(target=_compaction_worker, name='data-compactor', daemon=True)
+                _compactor.start()
+
+
+def _compaction_worker():
+    while True:
+        _compact_wakeup.wait()
+        # Let a burst of admin edits settle into a single rewrite
+        time.sleep(COMPACT_DELAY)
+        _compact_wakeup.clear()
+        compact_pending()
+
+
+def compact_pending():
+    """Compact every table edited since the last compaction"""
+    while _compact_pending:
+        name = _compact_pending.pop()
+        try:
+            compact(name)
+        except Exception:
+            log.exception('compaction failed', extra={'table': name})
+
+
+atexit.register(compact_pending)
+
+
+def invalidate(name=None):
+    """Force a reload on next access (all tables when name is None)"""
+    names = [name] if name else list(_tables)
+    for table_name in names:
+        table = _tables.get(table_name)
+        if table is not None:
+            with table.lock:
+                table.signature = None
+                table.version += 1
+                table.derived = {}
@@ -0,0 +1,95 @@
+# models/export_model.py
+"""Streaming table exports.
+
+Rows are pulled lazily from the data cache and encoded in small chunks, so
+an export holds only one buffer of output at a time however large the
+table is, and the first bytes go out before the last row has been read.
+"""
+import csv
+import io
+import json
+import zlib
+
+from models import data_store
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+# Flush encoded output once this many characters are buffered
+CHUNK_SIZE = 64 * 1024
+
+
+def iter_rows(name, columns=None, filters=None):
+    """Rows of a table projected to columns and matching column == value filters"""
+    table = data_store.get_table(name)
+    rows = table.rows
+    filters = dict((column, str(value).strip()) for column, value in (filters or {}).items())
+    for column, value in filters.items():
+        if column in table.indexes:
+            rows = table.related(column, value)
+            break
+    for row in rows:
+        if all((row.get(column) or '').strip() == value for column, value in filters.items()):
+            yield dict((column, row.get(column, '')) for column in columns) if columns else row
+
+
+def iter_csv(columns, rows):
+    """CSV text chunks: header first, then the rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, lineterminator='\n', extrasaction='ignore')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows):
+    """One JSON object per line, in chunks"""
+    lines, size = [], 0
+    for row in rows:
+        line = json.dumps(row) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(lines)
+            lines, size = [], 0
+    yield ''.join(lines)
+
+
+def iter_gzip(chunks):
+    """Compress text chunks into a gzip stream as they arrive"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_table(name, fmt='csv', columns=None, filters=None, compress=False):
+    """(chunk iterator, mimetype, file extension) for a table export.
+
+    Raises ValueError for an unknown format or column.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}' (use {', '.join(FORMATS)})")
+    table_columns = data_store.get_columns(name)
+    for column in list(columns or []) + list(filters or {}):
+        if column not in table_columns:
+            raise ValueError(f"Unknown column '{column}' in {name}")
+
+    rows = iter_rows(name, columns, filters)
+    if fmt == 'csv':
+        chunks = iter_csv(columns or table_columns, rows)
+    else:
+        chunks = iter_ndjson(rows)
+    mimetype, extension = FORMATS[fmt]
+    if compress:
+        return iter_gzip(chunks), 'application/gzip', extension + '.gz'
+    return (chunk.encode('utf-8') for chunk in chunks), mimetype, extension
@@ -0,0 +1,285 @@
+# models/import_model.py
+"""Bulk streaming import of minerals, production statistics and sites.
+
+An uploaded CSV is read row by row and cut into batches. Batches are
+validated in parallel on a process pool (types, ranges, known country and
+mineral ids) while this thread commits the batches already checked, in
+file order, with one data_store write per batch. Memory stays bounded by a
+few batches whatever the file size, and other writers get the table lock
+between batches. Rows that fail a check or repeat an existing record are
+written with the reason to a reject file.
+
+Imports run one at a time on a background worker; callers get a job id
+back immediately and can poll get_job() for progress from any worker
+process (job state is kept in IMPORT_DIR next to the reject file).
+"""
+import csv
+import logging
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from config import IMPORT_DIR
+from models import data_store
+from models.job_store import JobStore
+
+log = logging.getLogger(__name__)
+
+BATCH_SIZE = 5000
+WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Batches queued for validation per worker before the reader waits
+MAX_PENDING = 2
+
+# column -> (kind of value, required)
+IMPORT_SCHEMAS = {
+    'minerals': {
+        'MineralID': ('id', False),
+        'MineralName': ('text', True),
+        'Description': ('text', False),
+        'MarketPriceUSD_per_tonne': ('amount', False),
+    },
+    'production_stats': {
+        'StatID': ('id', False),
+        'Year': ('year', True),
+        'CountryID': ('country', True),
+        'MineralID': ('mineral', True),
+        'Production_tonnes': ('amount', True),
+        'ExportValue_BillionUSD': ('amount', False),
+    },
+    'sites': {
+        'SiteID': ('id', False),
+        'SiteName': ('text', True),
+        'CountryID': ('country', True),
+        'MineralID': ('mineral', True),
+        'Latitude': ('latitude', True),
+        'Longitude': ('longitude', True),
+        'Production_tonnes': ('amount', False),
+    },
+}
+
+# Columns identifying one real-world record, so it is not imported twice under new ids
+NATURAL_KEYS = {
+    'minerals': ('MineralName',),
+    'production_stats': ('Year', 'CountryID', 'MineralID'),
+    'sites': ('SiteName', 'CountryID'),
+}
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='import')
+_jobs = JobStore(IMPORT_DIR)
+
+# Known ids, set once in each validation process
+_known_ids = {}
+
+
+def _init_worker(known_ids):
+    _known_ids.update(known_ids)
+
+
+def _check(kind, value):
+    """Normalized cell value, raises ValueError with the reason"""
+    if kind == 'text':
+        return value
+    try:
+        number = float(value)
+    except ValueError:
+        raise ValueError(f"'{value}' is not a number")
+    if number != number or number in (float('inf'), float('-inf')):
+        raise ValueError('not a finite number')
+    if kind in ('id', 'year', 'country', 'mineral'):
+        if not number.is_integer():
+            raise ValueError('not a whole number')
+        number = int(number)
+        if kind == 'id' and number < 1:
+            raise ValueError('ids start at 1')
+        if kind == 'year' and not 1800 <= number <= 2200:
+            raise ValueError('not a plausible year')
+        if kind in _known_ids and number not in _known_ids[kind]:
+            raise ValueError(f'unknown {kind} id {number}')
+        return str(number)
+    if kind == 'amount' and number < 0:
+        raise ValueError('must not be negative')
+    if kind == 'latitude' and not -90 <= number <= 90:
+        raise ValueError('latitude outside -90..90')
+    if kind == 'longitude' and not -180 <= number <= 180:
+        raise ValueError('longitude outside -180..180')
+    return value
+
+
+def validate_batch(name, rows):
+    """(clean row, None) or (None, reason) for every row of a batch"""
+    results = []
+    for row in rows:
+        clean, errors = {}, []
+        for column, (kind, required) in IMPORT_SCHEMAS[name].items():
+            value = (row.get(column) or '').strip()
+            if not value:
+                if required:
+                    errors.append(f'{column}: required')
+                clean[column] = ''
+                continue
+            try:
+                clean[column] = _check(kind, value)
+            except ValueError as e:
+                errors.append(f'{column}: {e}')
+        results.append((None, '; '.join(errors)) if errors else (clean, None))
+    return results
+
+
+def _batches(reader):
+    """(line numbers, rows) in BATCH_SIZE groups"""
+    lines, rows = [], []
+    for row in reader:
+        lines.append(reader.line_num)
+        rows.append(row)
+        if len(rows) == BATCH_SIZE:
+            yield lines, rows
+            lines, rows = [], []
+    if rows:
+        yield lines, rows
+
+
+def _natural_key(name, row):
+    return tuple((row.get(column) or '').strip().casefold() for column in NATURAL_KEYS[name])
+
+
+class _Committer:
+    """Checks duplicates and writes validated batches, in file order"""
+
+    def __init__(self, name, rejects):
+        self.name = name
+        self.rejects = rejects
+        self.seen = set()
+        table = data_store.get_table(name)
+        self.owners = dict((_natural_key(name, row), str(row.get(table.key_column) or '').strip())
+                           for row in table.rows)
+        self.imported = 0
+        self.rejected = 0
+
+    def reject(self, row, line, error):
+        self.rejects.writerow(dict(row, line=line, error=error))
+        self.rejected += 1
+
+    def commit(self, lines, rows, results):
+        with data_store.write_lock(self.name) as table:
+            if not table.columns:
+                raise ValueError(f"Table {self.name} has no columns to import into")
+            next_key = table.max_key + 1
+            changes = []
+            for line, row, (clean, error) in zip(lines, rows, results):
+                if error:
+                    self.reject(row, line, error)
+                    continue
+                key = clean.get(table.key_column, '')
+                natural_key = _natural_key(self.name, clean)
+                owner = self.owners.get(natural_key)
+                if key and key in self.seen:
+                    self.reject(row, line, f'{table.key_column} {key} appears twice in the file')
+                    continue
+                if owner is not None and owner != key:
+                    self.reject(row, line, f'duplicate of record {owner}')
+                    continue
+                existing = table.by_key.get(key) if key else None
+                if existing is not None and _natural_key(self.name, existing) != natural_key:
+                    # Same id, different real-world record: never overwrite it
+                    self.reject(row, line, f'duplicate {table.key_column} {key} of a different record')
+                    continue
+                if not key:
+                    key = clean[table.key_column] = str(next_key)
+                    next_key += 1
+                self.seen.add(key)
+                self.owners[natural_key] = key
+                if key in table.by_key:
+                    changes.append({'op': 'upsert', 'key': key, 'row': clean})
+                else:
+                    changes.append({'op': 'append', 'row': clean})
+            table.write_many(changes)
+        self.imported += len(changes)
+
+
+def import_file(name, path, reject_path, progress=None):
+    """Import a CSV file into a table, returns the row counts.
+
+    progress(counts) is called after every committed batch. Raises
+    ValueError for an unknown table or a header missing required columns.
+    """
+    if name not in IMPORT_SCHEMAS:
+        raise ValueError(f"Cannot import into '{name}' (use {', '.join(IMPORT_SCHEMAS)})")
+    known_ids = {'country': set(int(key) for key in data_store.get_table('countries').by_key if key.isdigit())}
+    if name != 'minerals':
+        known_ids['mineral'] = set(int(key) for key in data_store.get_table('minerals').by_key if key.isdigit())
+
+    started = time.time()
+    with open(path, 'r', newline='', encoding='utf-8-sig') as file, \
+            open(reject_path, 'w', newline='', encoding='utf-8') as reject_file:
+        reader = csv.DictReader(file)
+        header = reader.fieldnames or []
+        missing = [column for column, (kind, required) in IMPORT_SCHEMAS[name].items()
+                   if required and column not in header]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+        rejects = csv.DictWriter(reject_file, fieldnames=header + ['line', 'error'],
+                                 lineterminator='\n', extrasaction='ignore')
+        rejects.writeheader()
+        committer = _Committer(name, rejects)
+        counts = {'rows_read': 0, 'rows_imported': 0, 'rows_rejected': 0}
+
+        def commit_next(pending):
+            lines, rows, future = pending.popleft()
+            committer.commit(lines, rows, future.result())
+            counts.update(rows_read=counts['rows_read'] + len(rows), rows_imported=committer.imported,
+                          rows_rejected=committer.rejected, seconds=round(time.time() - started, 3))
+            if progress:
+                progress(dict(counts))
+
+        with ProcessPoolExecutor(WORKERS, initializer=_init_worker, initargs=(known_ids,)) as pool:
+            pending = deque()
+            for lines, rows in _batches(reader):
+                pending.append((lines, rows, pool.submit(validate_batch, name, rows)))
+                while len(pending) >= WORKERS * MAX_PENDING:
+                    commit_next(pending)
+            while pending:
+                commit_next(pending)
+    counts['seconds'] = round(time.time() - started, 3)
+    return counts
+
+
+def _run_job(job_id, name, path, reject_path):
+    _update_job(job_id, status='running', started=time.time())
+    try:
+        counts = import_file(name, path, reject_path, lambda counts: _update_job(job_id, progress=counts))
+        _update_job(job_id, status='finished', finished=time.time(), progress=counts)
+        log.info('import finished', extra=dict(counts, job_id=job_id, table=name))
+    except Exception as e:
+        log.exception('import job failed', extra={'job_id': job_id, 'table': name})
+        _update_job(job_id, status='failed', finished=time.time(), error=str(e))
+    finally:
+        os.remove(path)
+
+
+def _update_job(job_id, **fields):
+    _jobs.update(job_id, **fields)
+
+
+def start_import(name, upload):
+    """Save an uploaded file and queue its import, returns the job id"""
+    if name not in IMPORT_SCHEMAS:
+        raise ValueError(f"Cannot import into '{name}' (use {', '.join(IMPORT_SCHEMAS)})")
+    job_id = _jobs.new_id()
+    os.makedirs(IMPORT_DIR, exist_ok=True)
+    path = os.path.join(IMPORT_DIR, f'{job_id}.csv')
+    upload.save(path)
+    reject_path = reject_file(job_id)
+    _jobs.create(job_id, table=name, status='queued', queued=time.time(),
+                 progress={'rows_read': 0, 'rows_imported': 0, 'rows_rejected': 0})
+    _executor.submit(_run_job, job_id, name, path, reject_path)
+    return job_id
+
+
+def reject_file(job_id):
+    """Path of an import job's reject file"""
+    return os.path.join(IMPORT_DIR, f'{job_id}-rejects.csv')
+
+
+def get_job(job_id):
+    return _jobs.get(job_id)
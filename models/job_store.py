@@ -0,0 +1,56 @@
+# models/job_store.py
+"""Background job state kept in files, so every worker process sees it.
+
+Each job is a small JSON file <job id>.json in the store's folder, replaced
+atomically on every update. A status request can land on any worker
+process and still find the job, and the state outlives a restart (a job
+that was running when its process died stays 'running').
+"""
+import json
+import os
+import re
+import threading
+import uuid
+
+# Job ids are generated here; anything else never names a file
+JOB_ID = re.compile(r'^[0-9a-f]{12}$')
+
+
+class JobStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+
+    def path(self, job_id):
+        return os.path.join(self.directory, f'{job_id}.json')
+
+    def new_id(self):
+        return uuid.uuid4().hex[:12]
+
+    def _write(self, job):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(job['id'])
+        temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(job, file)
+        os.replace(temp_path, path)
+
+    def create(self, job_id, **fields):
+        with self.lock:
+            self._write(dict(fields, id=job_id))
+
+    def update(self, job_id, **fields):
+        with self.lock:
+            job = self.get(job_id) or {'id': job_id}
+            job.update(fields)
+            self._write(job)
+
+    def get(self, job_id):
+        """Job state, None for an unknown or malformed id"""
+        if not JOB_ID.match(str(job_id)):
+            return None
+        try:
+            with open(self.path(job_id), encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
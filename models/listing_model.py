@@ -0,0 +1,136 @@
+# models/listing_model.py
+"""Paginated, sorted and filtered table listings for the JSON APIs.
+
+Pages are cut from the sorted column indexes in data_store: the start of a
+value range or the row after a cursor is found by bisection, so a page
+costs O(log n + page size) however large the table is. Cursors encode the
+sort key of the last row served (keyset pagination), so pages stay stable
+while rows are added or removed in between requests.
+"""
+import base64
+import json
+from bisect import bisect_left, bisect_right
+
+from models import data_store
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Sorts after every (sort value, primary key) pair with the same sort value
+_AFTER = (3,)
+
+
+def encode_cursor(column, descending, key):
+    data = json.dumps([column, descending, key], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, column, descending):
+    """Sort key stored in a cursor, which must belong to the same ordering"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_column, cursor_descending, key = json.loads(data)
+        key = (tuple(key[0]), tuple(key[1]))
+    except (ValueError, TypeError, IndexError):
+        raise ValueError('Invalid cursor')
+    if cursor_column != column or cursor_descending != descending:
+        raise ValueError('Cursor belongs to a different sort order')
+    return key
+
+
+def _in_range(row, ranges):
+    for column, (low, high) in ranges.items():
+        kind, value = data_store.sort_value(row.get(column))
+        if kind != 1 or (low is not None and value < low) or (high is not None and value > high):
+            return False
+    return True
+
+
+def page(name, column, descending=False, ranges=None, limit=DEFAULT_LIMIT, cursor=None):
+    """One page of rows ordered by column, returns (rows, next cursor or None).
+
+    ranges maps numeric columns to (min, max) bounds (either may be None).
+    A range on the sort column narrows the index slice directly; ranges on
+    other columns are checked while walking it.
+    """
+    keys, rows = data_store.get_sorted(name, column)
+    ranges = dict(ranges or {})
+    start, end = 0, len(keys)
+    if column in ranges:
+        # Only numeric cells can fall inside a range
+        low, high = ranges.pop(column)
+        start = bisect_left(keys, ((1, low),) if low is not None else ((1,),))
+        end = bisect_right(keys, ((1, high), _AFTER)) if high is not None else bisect_left(keys, ((2,),))
+
+    if cursor:
+        after = decode_cursor(cursor, column, descending)
+        if descending:
+            end = min(end, bisect_left(keys, after))
+        else:
+            start = max(start, bisect_right(keys, after))
+
+    positions = range(end - 1, start - 1, -1) if descending else range(start, end)
+    selected = []
+    for position in positions:
+        if ranges and not _in_range(rows[position], ranges):
+            continue
+        if len(selected) == limit:
+            last = selected[-1]
+            return [rows[i] for i in selected], encode_cursor(column, descending, keys[last])
+        selected.append(position)
+    return [rows[i] for i in selected], None
+
+
+def _number(args, name):
+    value = args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"'{name}' must be a number")
+
+
+def api_page(args, name, columns, to_item, ranged=(), default_sort='id'):
+    """Listing response for a query string.
+
+    columns maps public field names to the table columns they sort on.
+    Supports ?sort=field or -field, ?limit=, ?cursor=, <field>_min/_max for
+    the ranged fields and ?fields=a,b to project the items. Raises
+    ValueError for anything it cannot serve.
+    """
+    sort = args.get('sort', default_sort)
+    descending = sort.startswith('-')
+    sort = sort.lstrip('-')
+    if sort not in columns:
+        raise ValueError(f"Cannot sort by '{sort}' (use {', '.join(columns)})")
+
+    limit = args.get('limit', DEFAULT_LIMIT)
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError("'limit' must be a whole number")
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f"'limit' must be between 1 and {MAX_LIMIT}")
+
+    ranges = {}
+    for field in ranged:
+        if field not in columns:
+            continue
+        low, high = _number(args, field + '_min'), _number(args, field + '_max')
+        if low is not None or high is not None:
+            ranges[columns[field]] = (low, high)
+
+    fields = [field for field in args.get('fields', '').split(',') if field]
+    if fields:
+        # Item fields of a blank row of the table, so an empty page is checked too
+        known = to_item(dict((column, '') for column in data_store.get_columns(name)))
+        unknown = [field for field in fields if field not in known]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+
+    rows, next_cursor = page(name, columns[sort], descending, ranges, limit, args.get('cursor'))
+    items = [to_item(row) for row in rows]
+    if fields:
+        items = [dict((field, item[field]) for field in fields) for item in items]
+    return {'items': items, 'next_cursor': next_cursor, 'limit': limit}
@@ -0,0 +1,161 @@
+# models/metrics_model.py
+"""Materialized country metrics.
+
+Mining contribution, totals, averages and rankings are kept in memory and
+updated from data_store change notifications: editing one country only
+adjusts the running totals and moves that country inside the sorted
+rankings. A full rebuild happens only when the countries table is
+(re)loaded. Routes and templates read these values instead of redoing the
+arithmetic per request, so every page shows the same numbers.
+
+Ranks are worked out for every country in one pass the first time they
+are read after a change and stored in each country's entry. Metrics follow
+the countries table as of its last refresh, so once they are built, reads
+use the entries directly; records of that same table always agree with them.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from models import data_store
+
+RANKED = ('gdp', 'mining_revenue', 'contribution_percent')
+
+
+def _contribution(revenue, gdp):
+    return (revenue / gdp) * 100 if gdp else 0
+
+
+class CountryMetrics:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ready = False
+        self.by_country = {}
+        self.rankings = {}
+        self.ranked = False
+        self.total_gdp = 0
+        self.total_mining_revenue = 0
+
+    # --- maintenance (called from data_store notifications) ---
+
+    def on_change(self, table, old_row, new_row):
+        with self.lock:
+            if old_row is None and new_row is None:
+                self.ready = False
+                return
+            if not self.ready:
+                return
+            if old_row is not None:
+                self._remove(self._parse(old_row))
+            if new_row is not None:
+                self._add(self._parse(new_row))
+
+    def _parse(self, row):
+        from models.country_model import Country
+        country = Country.from_row(row)
+        return {
+            'country_id': country.country_id,
+            'gdp': country.gdp_billion_usd,
+            'mining_revenue': country.mining_revenue_billion_usd,
+            'contribution_percent': _contribution(country.mining_revenue_billion_usd, country.gdp_billion_usd)
+        }
+
+    def _add(self, metrics):
+        self.ranked = False
+        self.by_country[metrics['country_id']] = metrics
+        self.total_gdp += metrics['gdp']
+        self.total_mining_revenue += metrics['mining_revenue']
+        for name in RANKED:
+            insort(self.rankings[name], (metrics[name], metrics['country_id']))
+
+    def _remove(self, metrics):
+        current = self.by_country.pop(metrics['country_id'], None)
+        if current is None:
+            return
+        self.ranked = False
+        self.total_gdp -= current['gdp']
+        self.total_mining_revenue -= current['mining_revenue']
+        for name in RANKED:
+            ranking = self.rankings[name]
+            position = bisect_left(ranking, (current[name], current['country_id']))
+            if position < len(ranking) and ranking[position][1] == current['country_id']:
+                del ranking[position]
+
+    def _ensure_ready(self):
+        """Full rebuild after a (re)load of the countries table"""
+        table = data_store.get_table('countries')
+        if self.ready:
+            return
+        # Same lock order as on_change: table first, then metrics
+        with table.lock, self.lock:
+            if self.ready:
+                return
+            rows = table.rows
+            self.by_country = {}
+            self.rankings = dict((name, []) for name in RANKED)
+            self.total_gdp = 0
+            self.total_mining_revenue = 0
+            for row in rows:
+                self._add(self._parse(row))
+            self.ready = True
+
+    def _rank(self):
+        """Store every country's ranks (1 = highest, ties share a rank) in its entry"""
+        for name in RANKED:
+            ranking = self.rankings[name]
+            higher = 0
+            previous = None
+            for position, (value, country_id) in enumerate(reversed(ranking)):
+                if value != previous:
+                    higher, previous = position, value
+                self.by_country[country_id][name + '_rank'] = higher + 1
+        self.ranked = True
+
+    # --- reads ---
+
+    def for_country(self, country_id):
+        """Metrics of one country with its rankings (1 = highest), or None"""
+        if not self.ready:
+            self._ensure_ready()
+        with self.lock:
+            if not self.ranked:
+                self._rank()
+            metrics = self.by_country.get(country_id)
+            if metrics is None:
+                return None
+            result = dict(metrics)
+            result['revenue_share_percent'] = (
+                metrics['mining_revenue'] / self.total_mining_revenue * 100 if self.total_mining_revenue else 0)
+            result['ranked_countries'] = len(self.by_country)
+            return result
+
+    def contribution(self, country_id):
+        """Mining revenue as % of GDP for one country"""
+        if not self.ready:
+            self._ensure_ready()
+        metrics = self.by_country.get(country_id)
+        return metrics['contribution_percent'] if metrics else 0
+
+    def totals(self):
+        """Totals and averages across all countries"""
+        self._ensure_ready()
+        with self.lock:
+            count = len(self.by_country)
+            return {
+                'total_countries': count,
+                'total_gdp': self.total_gdp,
+                'total_mining_revenue': self.total_mining_revenue,
+                'avg_contribution': _contribution(self.total_mining_revenue, self.total_gdp),
+                'avg_gdp': self.total_gdp / count if count else 0,
+                'avg_mining_revenue': self.total_mining_revenue / count if count else 0
+            }
+
+    def top(self, name, limit=None):
+        """Country ids ordered by a ranked metric, highest first"""
+        self._ensure_ready()
+        with self.lock:
+            ids = [country_id for value, country_id in reversed(self.rankings[name])]
+        return ids[:limit] if limit else ids
+
+
+country_metrics = CountryMetrics()
+data_store.subscribe('countries', country_metrics.on_change)
@@ -0,0 +1,131 @@
+# models/password_model.py
+"""Salted password hashing.
+
+Stored hashes look like pbkdf2_sha256$<iterations>$<salt>$<hash> or
+scrypt$<N>$<r>$<p>$<salt>$<hash>, so the scheme and cost travel with every
+hash and can be raised later: verify_password() reports when a hash is
+weaker than the current settings (or is a legacy plaintext value) so the
+caller can store a fresh one.
+
+Hashing is deliberately slow, so it runs on a small thread pool (hashlib
+releases the GIL while it works) with a cap on waiting jobs. A burst of
+logins queues there - or is turned away with PasswordPoolBusy - instead of
+tying up the threads that serve every other page.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from config import PASSWORD_SCHEME, PASSWORD_COST, PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT
+
+DEFAULT_COSTS = {
+    'pbkdf2_sha256': 260000,
+    'scrypt': 2 ** 14,
+}
+SCRYPT_R = 8
+SCRYPT_P = 1
+SALT_BYTES = 16
+
+# Seconds a login waits for a hashing thread before giving up
+WAIT_TIMEOUT = 30
+
+
+class PasswordPoolBusy(Exception):
+    """Too many password checks already waiting"""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+
+def _unb64(text):
+    return base64.b64decode(text + '=' * (-len(text) % 4))
+
+
+def hash_password(password, scheme=None, cost=None):
+    """New salted hash of a password with the configured (or given) scheme and cost"""
+    scheme = scheme or PASSWORD_SCHEME
+    if scheme not in DEFAULT_COSTS:
+        raise ValueError(f"Unknown password scheme: {scheme}")
+    cost = cost or (PASSWORD_COST if scheme == PASSWORD_SCHEME else None) or DEFAULT_COSTS[scheme]
+    salt = os.urandom(SALT_BYTES)
+    if scheme == 'pbkdf2_sha256':
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, cost)
+        return f'pbkdf2_sha256${cost}${_b64(salt)}${_b64(digest)}'
+    digest = _scrypt(password, salt, cost, SCRYPT_R, SCRYPT_P)
+    return f'scrypt${cost}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}'
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * n * r * p + 1024 * 1024, dklen=32)
+
+
+def is_hashed(stored):
+    return (stored or '').split('$', 1)[0] in DEFAULT_COSTS
+
+
+def verify_password(password, stored):
+    """(matches, needs_rehash) for a password against a stored hash.
+
+    Values that are not in a known hash format are legacy plaintext
+    passwords: they are compared in constant time and always need a rehash.
+    """
+    stored = stored or ''
+    parts = stored.split('$')
+    if parts[0] == 'pbkdf2_sha256' and len(parts) == 4:
+        cost = int(parts[1])
+        digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), _unb64(parts[2]), cost)
+        matches = hmac.compare_digest(digest, _unb64(parts[3]))
+    elif parts[0] == 'scrypt' and len(parts) == 6:
+        cost = int(parts[1])
+        digest = _scrypt(password, _unb64(parts[4]), cost, int(parts[2]), int(parts[3]))
+        matches = hmac.compare_digest(digest, _unb64(parts[5]))
+    else:
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8')), True
+    wanted = PASSWORD_COST or DEFAULT_COSTS[PASSWORD_SCHEME]
+    return matches, parts[0] != PASSWORD_SCHEME or cost < wanted
+
+
+_pool = ThreadPoolExecutor(max_workers=PASSWORD_WORKERS, thread_name_prefix='password')
+_slots = threading.BoundedSemaphore(PASSWORD_WORKERS + PASSWORD_QUEUE_LIMIT)
+
+
+def run_bounded(function, *args):
+    """Run a hashing call on the password pool and wait for its result.
+
+    Raises PasswordPoolBusy straight away when the pool and its queue are full,
+    and when the call has not finished within WAIT_TIMEOUT seconds.
+    """
+    if not _slots.acquire(blocking=False):
+        raise PasswordPoolBusy('Too many logins in progress, please try again')
+    try:
+        future = _pool.submit(function, *args)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda done: _slots.release())
+    try:
+        return _result(future)
+    except PasswordPoolBusy:
+        future.cancel()  # still queued: nobody is waiting for it any more
+        raise
+
+
+def _result(future):
+    try:
+        return future.result(timeout=WAIT_TIMEOUT)
+    except FutureTimeout:
+        raise PasswordPoolBusy('Too many logins in progress, please try again')
+
+
+# Hash checked when a username does not exist, so unknown names take as long
+# as wrong passwords. Computed on the pool as soon as the module is imported.
+_dummy_hash = _pool.submit(hash_password, 'dummy-password')
+
+
+def dummy_hash():
+    return _result(_dummy_hash)
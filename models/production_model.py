@@ -0,0 +1,100 @@
+# models/production_model.py
+"""Columnar engine over production_stats.csv.
+
+The table is held as one typed NumPy array per column and rebuilt only
+when the data cache reports a change. Filters are boolean masks and
+group-bys use np.unique + np.bincount, so a query walks each column once
+in C instead of looping over row dicts.
+"""
+import numpy as np
+from models import data_store, schema
+
+# Query parameter name -> column array used for grouping
+GROUP_COLUMNS = {
+    'year': 'year',
+    'country': 'country_id',
+    'mineral': 'mineral_id',
+}
+
+
+class ProductionStats:
+    def __init__(self, rows):
+        count = len(rows)
+        columns = schema.compile_schema('production_stats', rows[0].keys() if rows else ()).columns
+
+        def column(field, parser, dtype):
+            name = columns[field]
+            return np.fromiter((parser(row.get(name)) for row in rows), dtype=dtype, count=count)
+
+        self.stat_id = column('stat_id', schema.to_int, np.int64)
+        self.year = column('year', schema.to_int, np.int32)
+        self.country_id = column('country_id', schema.to_int, np.int32)
+        self.mineral_id = column('mineral_id', schema.to_int, np.int32)
+        self.production = column('production_tonnes', schema.to_float, np.float64)
+        self.export_value = column('export_value_billion_usd', schema.to_float, np.float64)
+
+    @classmethod
+    def load(cls):
+        """Column arrays for the current production_stats table"""
+        return data_store.get_derived('production_stats', 'production_columns', cls)
+
+    def __len__(self):
+        return len(self.stat_id)
+
+    def mask(self, year_from=None, year_to=None, countries=None, minerals=None):
+        """Boolean mask of the rows matching every given filter"""
+        mask = np.ones(len(self), dtype=bool)
+        if year_from is not None:
+            mask &= self.year >= year_from
+        if year_to is not None:
+            mask &= self.year <= year_to
+        if countries:
+            mask &= np.isin(self.country_id, list(countries))
+        if minerals:
+            mask &= np.isin(self.mineral_id, list(minerals))
+        return mask
+
+    def records(self, **filters):
+        """Matching rows as dicts, ordered by year"""
+        index = np.flatnonzero(self.mask(**filters))
+        index = index[np.argsort(self.year[index], kind='stable')]
+        return [{
+            'stat_id': int(self.stat_id[i]),
+            'year': int(self.year[i]),
+            'country_id': int(self.country_id[i]),
+            'mineral_id': int(self.mineral_id[i]),
+            'production_tonnes': float(self.production[i]),
+            'export_value_billion_usd': float(self.export_value[i])
+        } for i in index]
+
+    def summarize(self, group_by=('year',), **filters):
+        """Production and export totals per group of year/country/mineral"""
+        for name in group_by:
+            if name not in GROUP_COLUMNS:
+                raise ValueError(f"Cannot group by '{name}'")
+        mask = self.mask(**filters)
+        production = self.production[mask]
+        export_value = self.export_value[mask]
+
+        if not group_by:
+            return [{
+                'production_tonnes': float(production.sum()),
+                'export_value_billion_usd': float(export_value.sum()),
+                'records': int(mask.sum())
+            }]
+
+        keys = np.stack([getattr(self, GROUP_COLUMNS[name])[mask] for name in group_by], axis=1)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        production_totals = np.bincount(inverse, weights=production, minlength=len(groups))
+        export_totals = np.bincount(inverse, weights=export_value, minlength=len(groups))
+        counts = np.bincount(inverse, minlength=len(groups))
+
+        summary = []
+        for i, group in enumerate(groups):
+            item = dict((GROUP_COLUMNS[name], int(value)) for name, value in zip(group_by, group))
+            item['production_tonnes'] = float(production_totals[i])
+            item['export_value_billion_usd'] = float(export_totals[i])
+            item['records'] = int(counts[i])
+            summary.append(item)
+        return summary
@@ -1,37 +1,95 @@
 # models/role_model.py
-class Role:
-    def __init__(self, role_id, role_name, permissions):
-        self.role_id = role_id
-        self.role_name = role_name
-        self.permissions = permissions
-    
+"""Roles and their permissions.
+
+roles.csv is read once into a frozen registry: immutable Role tuples looked
+up by id or name in O(1). Each role's Permissions text is compiled to a
+Permission bitmask, which is stored in the session at login so an
+authorization check is a single mask test with no data access. Restart the
+app after editing roles.csv.
+"""
+import logging
+import threading
+from collections import namedtuple
+from enum import IntFlag
+from types import MappingProxyType
+
+from models import data_store
+
+log = logging.getLogger(__name__)
+
+
+class Permission(IntFlag):
+    VIEW_DATA = 1
+    EXPORT_DATA = 2
+    EDIT_DATA = 4
+    DELETE_DATA = 8
+    MANAGE_USERS = 16
+    MANAGE_DATA = 32  # backups, restores and bulk imports
+
+
+FULL_ACCESS = Permission(sum(Permission))
+
+# Phrases of the Permissions column and what they grant
+PERMISSION_PHRASES = {
+    'full access': FULL_ACCESS,
+    'view': Permission.VIEW_DATA,
+    'export': Permission.EXPORT_DATA,
+    'edit': Permission.EDIT_DATA,
+    'delete': Permission.DELETE_DATA,
+    'manage users': Permission.MANAGE_USERS,
+}
+
+
+def compile_permissions(text):
+    """Permission mask described by a role's Permissions text"""
+    text = (text or '').casefold()
+    mask = Permission(0)
+    for phrase, granted in PERMISSION_PHRASES.items():
+        if phrase in text:
+            mask |= granted
+    return mask
+
+
+class Role(namedtuple('Role', 'role_id role_name permissions mask')):
+    __slots__ = ()
+
     @classmethod
     def get_all_roles(cls):
-        roles_data = [
-            (1, "Administrator", "Full access (manage users, edit/delete data)"),
-            (2, "Investor", "View country profiles, charts, exports, production"),
-            (3, "Researcher", "View/export mineral & country data, add insights")
-        ]
-        
-        roles = []
-        for data in roles_data:
-            role = cls(*data)
-            roles.append(role)
-        
-        return roles
-    
+        return _get_registry().roles
+
     @classmethod
     def get_role_by_id(cls, role_id):
-        roles = cls.get_all_roles()
-        for role in roles:
-            if role.role_id == role_id:
-                return role
-        return None
-    
+        return _get_registry().by_id.get(role_id)
+
+    @classmethod
+    def get_role_by_name(cls, role_name):
+        return _get_registry().by_name.get(role_name)
+
     @classmethod
     def get_permissions(cls, role_name):
-        roles = cls.get_all_roles()
-        for role in roles:
-            if role.role_name == role_name:
-                return role.permissions
-        return "No permissions"
\ No newline at end of file
+        role = cls.get_role_by_name(role_name)
+        return role.permissions if role else "No permissions"
+
+
+class RoleRegistry:
+    """Read-only roles, by id and by name"""
+
+    def __init__(self, rows):
+        self.roles = tuple(Role(int(row['RoleID']), row['RoleName'], row['Permissions'],
+                                compile_permissions(row['Permissions'])) for row in rows)
+        self.by_id = MappingProxyType(dict((role.role_id, role) for role in self.roles))
+        self.by_name = MappingProxyType(dict((role.role_name, role) for role in self.roles))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def _get_registry():
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = RoleRegistry(data_store.get_rows('roles'))
+                log.info('roles loaded', extra={'roles': len(_registry.roles)})
+    return _registry
@@ -0,0 +1,176 @@
+# models/schema.py
+"""Canonical schemas of the data tables.
+
+The CSV headers have drifted over time (CountryID / country_id / id, GDP_BillionUSD
+/ gdp ...). Each table has one canonical schema listing, per field, the
+header names it may appear under and how to parse it. A header is resolved
+against the schema once and the result cached, so turning a row into a
+record is a fixed list of (column, parser) steps with no alias probing.
+
+Records are small classes with __slots__ holding parsed values: numbers
+already parsed and attribute access instead of key lookups. records()
+keeps them next to the table's dict rows rather than in their place - the
+data cache, its change log and both storage backends work on dict rows -
+so they cost extra memory in exchange for reads that never parse a cell.
+
+Code that needs a table's actual column names asks the resolved schema
+(for_table(name).columns) instead of hard-coding one header's spelling.
+"""
+from models import data_store
+
+
+def to_int(value):
+    """Whole number from a cell, 0 when blank or invalid"""
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def to_number(value):
+    """Number from a cell, keeping whole numbers as int, 0 when blank or invalid"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return int(number) if number.is_integer() else number
+
+
+def to_float(value):
+    """Float from a cell, 0.0 when blank or invalid (for column arrays)"""
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def to_text(value):
+    return '' if value is None else str(value)
+
+
+# table -> [(field, parser, header names it may appear under, first wins)]
+SCHEMAS = {
+    'countries': [
+        ('country_id', to_int, ('CountryID', 'country_id', 'id', 'ID', 'Index')),
+        ('country_name', to_text, ('CountryName', 'country_name', 'name')),
+        ('gdp_billion_usd', to_number, ('GDP_BillionUSD', 'gdp_billion_usd', 'gdp')),
+        ('mining_revenue_billion_usd', to_number,
+         ('MiningRevenue_BillionUSD', 'mining_revenue_billion_usd', 'mining_revenue')),
+        ('key_projects', to_text, ('KeyProjects', 'key_projects', 'projects')),
+    ],
+    'minerals': [
+        ('mineral_id', to_int, ('MineralID',)),
+        ('mineral_name', to_text, ('MineralName',)),
+        ('description', to_text, ('Description',)),
+        ('price_usd_per_tonne', to_number, ('MarketPriceUSD_per_tonne',)),
+    ],
+    'production_stats': [
+        ('stat_id', to_int, ('StatID',)),
+        ('year', to_int, ('Year',)),
+        ('country_id', to_int, ('CountryID',)),
+        ('mineral_id', to_int, ('MineralID',)),
+        ('production_tonnes', to_number, ('Production_tonnes',)),
+        ('export_value_billion_usd', to_number, ('ExportValue_BillionUSD',)),
+    ],
+    'sites': [
+        ('site_id', to_int, ('SiteID',)),
+        ('site_name', to_text, ('SiteName',)),
+        ('country_id', to_int, ('CountryID',)),
+        ('mineral_id', to_int, ('MineralID',)),
+        ('latitude', to_number, ('Latitude',)),
+        ('longitude', to_number, ('Longitude',)),
+        ('production_tonnes', to_number, ('Production_tonnes',)),
+    ],
+}
+
+
+class Record:
+    """Base of the typed record classes (fields given by __slots__)"""
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for field, value in zip(self.__slots__, values):
+            setattr(self, field, value)
+
+    def to_dict(self):
+        return dict((field, getattr(self, field)) for field in self.__slots__)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{field}={getattr(self, field)!r}' for field in self.__slots__)})"
+
+
+_record_classes = {}
+_compiled = {}
+
+
+def register(name, record_class):
+    """Use record_class (fields in schema order) for a table's records"""
+    _record_classes[name] = record_class
+    for key in [key for key in _compiled if key[0] == name]:
+        del _compiled[key]
+    return record_class
+
+
+def record_class(name):
+    if name not in _record_classes:
+        class_name = ''.join(part.title() for part in name.split('_')).rstrip('s') + 'Record'
+        fields = tuple(field for field, parser, aliases in SCHEMAS[name])
+        _record_classes[name] = type(class_name, (Record,), {'__slots__': fields})
+    return _record_classes[name]
+
+
+class CompiledSchema:
+    """A table schema resolved against one header"""
+
+    def __init__(self, name, columns):
+        self.name = name
+        self.record_class = record_class(name)
+        self.columns = {}
+        self.steps = []
+        for field, parser, aliases in SCHEMAS[name]:
+            column = next((alias for alias in aliases if alias in columns), None)
+            self.columns[field] = column
+            self.steps.append((column, parser))
+
+    def record(self, row):
+        """Typed record of one row"""
+        return self.record_class(*[parser(row.get(column)) if column else parser(None)
+                                   for column, parser in self.steps])
+
+    def records(self, rows):
+        return [self.record(row) for row in rows]
+
+    def to_row(self, values):
+        """Map canonical field names to this header's columns (unknown fields are dropped)"""
+        return dict((self.columns[field], value) for field, value in values.items()
+                    if self.columns.get(field))
+
+
+def compile_schema(name, columns):
+    """Schema of a table resolved against a header, cached per header"""
+    key = (name, tuple(columns))
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = _compiled[key] = CompiledSchema(name, columns)
+    return compiled
+
+
+def for_table(name):
+    """Schema of a table resolved against its current header"""
+    return compile_schema(name, data_store.get_columns(name))
+
+
+def columns_for(name, fields):
+    """{key: column of the current header} for {key: schema field}, leaving out absent fields"""
+    columns = for_table(name).columns
+    return dict((key, columns[field]) for key, field in fields.items() if columns.get(field))
+
+
+def for_row(name, row):
+    """Schema resolved against the header a row was read with"""
+    return compile_schema(name, row.keys())
+
+
+def records(name):
+    """Typed records of a whole table, cached until the table changes"""
+    return data_store.get_derived(name, 'records', lambda rows: for_table(name).records(rows))
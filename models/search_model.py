@@ -0,0 +1,169 @@
+# models/search_model.py
+"""Full-text search over countries, minerals and sites.
+
+An inverted index maps every word of the searched columns to the records
+holding it, plus a sorted vocabulary so a prefix ("kolw") expands to its
+words by bisection - that is what makes typeahead cheap. The index follows
+data_store change notifications: an edited record is re-indexed on its
+own, and only a full reload of a table re-indexes that whole table.
+"""
+import heapq
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+
+from models import data_store, schema
+
+# Searched schema fields of each table and how much a match in them counts
+SEARCH_FIELDS = {
+    'countries': {'country_name': 3.0, 'key_projects': 1.0},
+    'minerals': {'mineral_name': 3.0, 'description': 1.0},
+    'sites': {'site_name': 3.0},
+}
+
+TITLE_FIELDS = {
+    'countries': 'country_name',
+    'minerals': 'mineral_name',
+    'sites': 'site_name',
+}
+
+# A word only matched by prefix scores this much of an exact match
+PREFIX_BOOST = 0.6
+# Most vocabulary words one prefix may expand to
+MAX_EXPANSIONS = 200
+
+_WORD = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return _WORD.findall((text or '').casefold())
+
+
+class SearchIndex:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ready = set()
+        self.documents = {}  # (table, key) -> {'title': ..., 'terms': {term: weight}}
+        self.postings = {}   # term -> {(table, key): weight}
+        self.vocabulary = []
+
+    # --- maintenance (called from data_store notifications) ---
+
+    def listener(self, name):
+        def on_change(table, old_row, new_row):
+            with self.lock:
+                if old_row is None and new_row is None:
+                    self.ready.discard(name)
+                    return
+                if name not in self.ready:
+                    return
+                if old_row is not None:
+                    self._remove((name, self._key(table, old_row)))
+                if new_row is not None:
+                    self._add(name, table, new_row)
+        return on_change
+
+    @staticmethod
+    def _key(table, row):
+        return str(row.get(table.key_column) or '').strip()
+
+    @staticmethod
+    def _columns(name, table):
+        """Columns of the table's header the searched fields and the title are in"""
+        # The header the notified table has now: for_table() would refresh it mid-change
+        columns = schema.compile_schema(name, table.columns).columns
+        return columns, [(columns[field], weight) for field, weight in SEARCH_FIELDS[name].items()]
+
+    def _add(self, name, table, row):
+        doc = (name, self._key(table, row))
+        self._remove(doc)
+        columns, weighted = self._columns(name, table)
+        terms = {}
+        for column, weight in weighted:
+            for term in tokenize(row.get(column)):
+                terms[term] = terms.get(term, 0.0) + weight
+        self.documents[doc] = {'title': row.get(columns[TITLE_FIELDS[name]]) or '', 'terms': terms}
+        for term, weight in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                insort(self.vocabulary, term)
+            posting[doc] = weight
+
+    def _remove(self, doc):
+        document = self.documents.pop(doc, None)
+        if document is None:
+            return
+        for term in document['terms']:
+            posting = self.postings[term]
+            del posting[doc]
+            if not posting:
+                del self.postings[term]
+                del self.vocabulary[bisect_left(self.vocabulary, term)]
+
+    def _ensure_ready(self, name):
+        """(Re)index a whole table after it was (re)loaded"""
+        table = data_store.get_table(name)
+        if name in self.ready:
+            return
+        # Same lock order as the notifications: table first, then index
+        with table.lock, self.lock:
+            if name in self.ready:
+                return
+            for doc in [doc for doc in self.documents if doc[0] == name]:
+                self._remove(doc)
+            for row in table.rows:
+                self._add(name, table, row)
+            self.ready.add(name)
+
+    # --- reads ---
+
+    def _expand(self, token):
+        """Vocabulary words starting with token"""
+        start = bisect_left(self.vocabulary, token)
+        terms = []
+        for term in self.vocabulary[start:start + MAX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            terms.append(term)
+        return terms
+
+    def search(self, query, tables=None, limit=10):
+        """Best matching records for every word of query, best first (each word may be a prefix)"""
+        tokens = tokenize(query)
+        tables = [name for name in (tables or SEARCH_FIELDS) if name in SEARCH_FIELDS]
+        if not tokens or not tables:
+            return []
+        for name in tables:
+            self._ensure_ready(name)
+
+        with self.lock:
+            total = len(self.documents)
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for term in self._expand(token):
+                    posting = self.postings[term]
+                    weight = math.log(1 + total / len(posting)) * (1.0 if term == token else PREFIX_BOOST)
+                    for doc, term_weight in posting.items():
+                        if doc[0] in tables and term_weight * weight > token_scores.get(doc, 0):
+                            token_scores[doc] = term_weight * weight
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = dict((doc, scores[doc] + score) for doc, score in token_scores.items() if doc in scores)
+                if not scores:
+                    return []
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+            return [{
+                'type': doc[0],
+                'id': doc[1],
+                'title': self.documents[doc]['title'],
+                'score': round(score, 4)
+            } for doc, score in best]
+
+
+search_index = SearchIndex()
+for _name in SEARCH_FIELDS:
+    data_store.subscribe(_name, search_index.listener(_name))
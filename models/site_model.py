@@ -0,0 +1,216 @@
+# models/site_model.py
+"""Spatial index over sites.csv.
+
+Sites are bucketed into a grid of CELL_DEGREES squares for bounding-box
+queries, so a viewport only looks at the cells it covers. Nearest-site
+queries use a k-d tree over the sites' positions as 3D unit vectors,
+where straight-line distance orders points the same way as distance
+along the Earth's surface, so there are no special cases at the poles or
+the antimeridian. Both are rebuilt only when sites.csv changes.
+
+Map tiles (standard z/x/y Web Mercator tiles) group the sites they hold
+into clusters on a CLUSTER_PIXELS grid, with per-mineral production
+totals, so the browser draws a few dozen markers per tile at any zoom.
+"""
+import heapq
+import math
+
+from models import data_store, schema
+
+CELL_DEGREES = 1.0
+EARTH_RADIUS_KM = 6371.0088
+
+TILE_SIZE = 256
+CLUSTER_PIXELS = 64
+MAX_ZOOM = 22
+# Web Mercator stops short of the poles
+MAX_LATITUDE = 85.0511287798
+
+
+def _unit_vector(lat, lon):
+    lat, lon = math.radians(lat), math.radians(lon)
+    return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+
+def _cell(lat, lon):
+    return (math.floor(lat / CELL_DEGREES), math.floor(lon / CELL_DEGREES))
+
+
+def _build_tree(points, indices, depth=0):
+    """k-d tree node: (site index, split axis, left subtree, right subtree)"""
+    if not indices:
+        return None
+    axis = depth % 3
+    indices.sort(key=lambda i: points[i][axis])
+    middle = len(indices) // 2
+    return (indices[middle], axis,
+            _build_tree(points, indices[:middle], depth + 1),
+            _build_tree(points, indices[middle + 1:], depth + 1))
+
+
+class SiteIndex:
+    def __init__(self, rows):
+        compiled = schema.for_table('sites')
+        position_columns = (compiled.columns['latitude'], compiled.columns['longitude'])
+        self.sites = []
+        self.points = []
+        self.grid = {}
+        for row in rows:
+            if not all(column and (row.get(column) or '').strip() for column in position_columns):
+                continue  # sites without a position are not mapped
+            site = compiled.record(row)
+            if not (-90 <= site.latitude <= 90 and -180 <= site.longitude <= 180):
+                continue
+            self.grid.setdefault(_cell(site.latitude, site.longitude), []).append(len(self.sites))
+            self.points.append(_unit_vector(site.latitude, site.longitude))
+            self.sites.append(site)
+        self.tree = _build_tree(self.points, list(range(len(self.sites))))
+
+    @classmethod
+    def load(cls):
+        """Index of the current sites table"""
+        return data_store.get_derived('sites', 'site_index', cls)
+
+    def __len__(self):
+        return len(self.sites)
+
+    @staticmethod
+    def _matches(site, countries, minerals):
+        return ((not countries or site.country_id in countries) and
+                (not minerals or site.mineral_id in minerals))
+
+    def _cells(self, south, north, west, east):
+        """Grid buckets overlapping a box that does not cross the antimeridian"""
+        low, high = _cell(south, west), _cell(north, east)
+        count = (high[0] - low[0] + 1) * (high[1] - low[1] + 1)
+        if count > len(self.grid):
+            # Huge box over a sparse grid: cheaper to check the filled cells
+            return [bucket for cell, bucket in self.grid.items()
+                    if low[0] <= cell[0] <= high[0] and low[1] <= cell[1] <= high[1]]
+        return [self.grid[(lat_cell, lon_cell)]
+                for lat_cell in range(low[0], high[0] + 1)
+                for lon_cell in range(low[1], high[1] + 1)
+                if (lat_cell, lon_cell) in self.grid]
+
+    def in_bbox(self, west, south, east, north, countries=None, minerals=None):
+        """Sites inside a box; west > east means the box crosses the antimeridian"""
+        spans = [(west, east)] if west <= east else [(west, 180.0), (-180.0, east)]
+        found = []
+        for span_west, span_east in spans:
+            for bucket in self._cells(south, north, span_west, span_east):
+                for i in bucket:
+                    site = self.sites[i]
+                    if (south <= site.latitude <= north and span_west <= site.longitude <= span_east and
+                            self._matches(site, countries, minerals)):
+                        found.append(site)
+        return found
+
+    def nearest(self, lat, lon, k=5, countries=None, minerals=None):
+        """Up to k (distance in km, site) pairs closest to a point, nearest first"""
+        target = _unit_vector(lat, lon)
+        best = []  # max-heap of (-squared chord, site index)
+
+        def visit(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            point = self.points[index]
+            if self._matches(self.sites[index], countries, minerals):
+                distance = sum((a - b) ** 2 for a, b in zip(point, target))
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, index))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, index))
+            offset = target[axis] - point[axis]
+            near, far = (left, right) if offset < 0 else (right, left)
+            visit(near)
+            if len(best) < k or offset ** 2 < -best[0][0]:
+                visit(far)
+
+        if k > 0:
+            visit(self.tree)
+        results = []
+        for negative, index in sorted(best, reverse=True):
+            chord = math.sqrt(-negative)
+            results.append((2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2)), self.sites[index]))
+        return results
+
+
+def _world_pixel(lat, lon, zoom):
+    """Web Mercator pixel position of a point at a zoom level"""
+    size = TILE_SIZE * 2 ** zoom
+    lat = math.radians(max(-MAX_LATITUDE, min(MAX_LATITUDE, lat)))
+    x = (lon + 180.0) / 360.0 * size
+    y = (1 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) / 2 * size
+    # The east edge and the clamped south edge still belong to the last tile
+    return min(x, size - 1e-6), min(y, size - 1e-6)
+
+
+def tile_bounds(zoom, x, y):
+    """(west, south, east, north) of a map tile in degrees"""
+    count = 2 ** zoom
+
+    def latitude(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / count))))
+    return x / count * 360.0 - 180.0, latitude(y + 1), (x + 1) / count * 360.0 - 180.0, latitude(y)
+
+
+def build_tile(index, zoom, x, y, mineral_names=None):
+    """Clusters of the sites in one tile as a GeoJSON FeatureCollection.
+
+    A lone site keeps its own properties; a cluster carries the site count,
+    the mean position and production totals per mineral. Raises ValueError
+    for a tile outside the map.
+    """
+    if not (0 <= zoom <= MAX_ZOOM and 0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+        raise ValueError(f"No tile {zoom}/{x}/{y}")
+    mineral_names = mineral_names or {}
+    west, south, east, north = tile_bounds(zoom, x, y)
+    if y == 0:
+        north = 90.0
+    if y == 2 ** zoom - 1:
+        south = -90.0
+
+    cells = {}
+    for site in index.in_bbox(west, south, east, north):
+        pixel_x, pixel_y = _world_pixel(site.latitude, site.longitude, zoom)
+        pixel_x, pixel_y = pixel_x - x * TILE_SIZE, pixel_y - y * TILE_SIZE
+        if not (0 <= pixel_x < TILE_SIZE and 0 <= pixel_y < TILE_SIZE):
+            continue  # on the shared edge, drawn by the neighbouring tile
+        cells.setdefault((int(pixel_x // CLUSTER_PIXELS), int(pixel_y // CLUSTER_PIXELS)), []).append(site)
+
+    features = []
+    for cell in sorted(cells):
+        sites = cells[cell]
+        if len(sites) == 1:
+            site = sites[0]
+            properties = {
+                'cluster': False,
+                'count': 1,
+                'id': site.site_id,
+                'name': site.site_name,
+                'country_id': site.country_id,
+                'mineral_id': site.mineral_id,
+                'mineral_name': mineral_names.get(site.mineral_id),
+                'production_tonnes': site.production_tonnes
+            }
+            coordinates = [site.longitude, site.latitude]
+        else:
+            by_mineral = {}
+            for site in sites:
+                name = mineral_names.get(site.mineral_id) or str(site.mineral_id)
+                by_mineral[name] = by_mineral.get(name, 0.0) + site.production_tonnes
+            properties = {
+                'cluster': True,
+                'count': len(sites),
+                'production_tonnes': sum(by_mineral.values()),
+                'production_by_mineral': by_mineral
+            }
+            coordinates = [sum(site.longitude for site in sites) / len(sites),
+                           sum(site.latitude for site in sites) / len(sites)]
+        features.append({
+            'type': 'Feature',
+            'geometry': {'type': 'Point', 'coordinates': coordinates},
+            'properties': properties
+        })
+    return {'type': 'FeatureCollection', 'features': features}
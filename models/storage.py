@@ -0,0 +1,402 @@
+# models/storage.py
+"""Storage backends behind the in-memory data cache.
+
+A backend persists the app's tables and tells the cache when they change:
+
+- signature(name)            value that changes whenever the stored table changes
+- load(name, signature)      (columns, rows, pending changes to apply on top, signature read up to)
+- changes_since(name, old, new, columns)  (changes written between signatures old and
+                             new, signature they bring the table to), or None
+- write(name, columns, key_column, change)  persist one change (under the write lock)
+- write_many(name, columns, key_column, changes)  persist a batch of changes in one go
+- replace(name, columns, rows)  atomically replace a whole table
+- compact(name, columns, rows)  fold pending changes into the base storage
+- lock_path(name)            file used to serialize writers across processes
+- modified(signature)        last change time (seconds) a signature records, or None
+
+Changes are dicts: {'op': 'append', 'row': {...}} for brand new rows,
+{'op': 'upsert', 'key': ..., 'row': {...}} and {'op': 'delete', 'key': ...}.
+
+CsvBackend keeps the original CSV files. SqliteBackend stores every table in
+one SQLite database with indexes on the ID, CountryID, MineralID and Year
+columns. data_store.copy_tables() (or the flask export-sqlite / export-csv
+commands) moves data between the two.
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import sqlite3
+import threading
+
+import instrumentation
+
+TABLE_FILES = {
+    'countries': 'countries.csv',
+    'minerals': 'minerals.csv',
+    'production_stats': 'production_stats.csv',
+    'sites': 'sites.csv',
+    'users': 'users.csv',
+    'roles': 'roles.csv',
+}
+
+# CSV tables whose brand new rows are appended straight to the file. Other
+# processes pick them up by reading just the tail, bounded by the size in the
+# signature that showed the change, once the bytes before it are proven
+# unchanged (see _read_lines)
+APPEND_ONLY = {'users', 'minerals', 'production_stats', 'sites'}
+
+# Prefix digests kept per backend for tail reads (oldest dropped first)
+MAX_DIGESTS = 64
+
+# Columns that get an SQL index whenever a table has them
+SQL_INDEXED_COLUMNS = ('CountryID', 'MineralID', 'Year', 'SiteID', 'StatID', 'UserID', 'RoleID', 'Username')
+
+
+def _file_signature(path):
+    """(mtime, size, inode) of a file, or None when it does not exist.
+
+    A file swapped in by a rename (replace, a restore) gets a new inode, so
+    its growth is never mistaken for appends.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _read_up_to(part, end):
+    """File signature as far as it was actually read"""
+    return (part[0], end) + tuple(part[2:])
+
+
+def _read_lines(path, start, end, last_line=False, prefix=None):
+    """(text of the lines between byte offsets start and end, offset after them,
+    hash of the file up to that offset), or None.
+
+    Reading stops at end (the size recorded in a signature) even when the
+    file has grown since. Unless last_line is set, a last line without its
+    newline is left for the next read: it may still be being written. When
+    start is past 0, the first start bytes are hashed and must match prefix
+    (the digest an earlier read returned); None means they were changed in
+    place, so the bytes after start are not new lines at all.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        remaining = start
+        while remaining > 0:
+            chunk = file.read(min(remaining, 1 << 20))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+        if start and (remaining or digest.digest() != prefix):
+            return None
+        data = file.read(max(end - start, 0))
+    complete = len(data) if last_line else data.rfind(b'\n') + 1
+    digest.update(data[:complete])
+    return data[:complete].decode('utf-8'), start + complete, digest
+
+
+def _ends_with_newline(path):
+    with open(path, 'rb') as file:
+        file.seek(0, os.SEEK_END)
+        if file.tell() == 0:
+            return True
+        file.seek(-1, os.SEEK_END)
+        return file.read(1) in (b'\n', b'\r')
+
+
+class CsvBackend:
+    """Tables stored as CSV files, edits kept in a <file>.log change log"""
+
+    name = 'csv'
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        # (path, signature) -> hash of the file's bytes up to that signature's size
+        self.digests = {}
+        self.digests_lock = threading.Lock()
+
+    def path(self, name):
+        return os.path.join(self.data_dir, TABLE_FILES[name])
+
+    def log_path(self, name):
+        return self.path(name) + '.log'
+
+    def lock_path(self, name):
+        return self.path(name) + '.lock'
+
+    def signature(self, name):
+        return (_file_signature(self.path(name)), _file_signature(self.log_path(name)))
+
+    def modified(self, signature):
+        times = [part[0] for part in signature or () if part is not None]
+        return max(times) / 1e9 if times else None
+
+    def _read(self, path, old, new, last_line=False):
+        """Lines of a file from signature old (None: the start) up to new.
+
+        Returns (text, signature read up to), or None when the file is not
+        old plus appended lines: another file renamed over it, or bytes
+        before the old size that differ from what was read then.
+        """
+        start, prefix = 0, None
+        if old is not None:
+            if tuple(old[2:]) != tuple(new[2:]) or new[1] < old[1]:
+                return None
+            prefix = self.digests.get((path, old))
+            if prefix is None:
+                return None
+            start, prefix = old[1], prefix.digest()
+        result = _read_lines(path, start, new[1], last_line, prefix)
+        if result is None:
+            return None
+        text, end, digest = result
+        read_up_to = _read_up_to(new, end)
+        self._remember(path, read_up_to, digest)
+        return text, read_up_to
+
+    def _remember(self, path, signature, digest):
+        with self.digests_lock:
+            self.digests[(path, signature)] = digest
+            while len(self.digests) > MAX_DIGESTS:
+                del self.digests[next(iter(self.digests))]
+
+    def _append(self, path, text):
+        """Append text to a file (under the write lock), carrying the hash of
+        what was there over to the longer file so our own writes stay tail-readable"""
+        before = _file_signature(path)
+        with open(path, 'a', newline='', encoding='utf-8') as file:
+            file.write(text)
+        digest = self.digests.get((path, before))
+        if digest is not None:
+            digest = digest.copy()
+            digest.update(text.encode('utf-8'))
+            self._remember(path, _file_signature(path), digest)
+
+    def load(self, name, signature=None):
+        """Table as of signature (default: now); returns the signature actually read up to"""
+        csv_signature, log_signature = signature or self.signature(name)
+        columns, rows = [], []
+        if csv_signature is not None:
+            # A hand-edited file may lack its final newline; writers always add one before appending
+            text, csv_signature = self._read(self.path(name), None, csv_signature, last_line=True)
+            reader = csv.DictReader(io.StringIO(text, newline=''))
+            rows = list(reader)
+            columns = list(reader.fieldnames or [])
+            instrumentation.record_read(name, size=csv_signature[1], rows=len(rows))
+        changes = []
+        if log_signature is not None:
+            changes, log_signature = self._read_log(name, None, log_signature)
+        return columns, rows, changes, (csv_signature, log_signature)
+
+    def changes_since(self, name, old, new, columns):
+        """Tail of the CSV or of the log, when only appends explain the change.
+
+        Costs one pass of hashing over the bytes already read (no parsing),
+        which proves they were not edited in place.
+        """
+        old_csv, old_log = old
+        new_csv, new_log = new
+        if old_csv is None or new_csv is None:
+            return None
+        if old_log == new_log and name in APPEND_ONLY and new_csv[1] > old_csv[1]:
+            tail = self._read(self.path(name), old_csv, new_csv)
+            if tail is None:
+                return None
+            text, csv_signature = tail
+            changes = [{'op': 'append', 'row': row}
+                       for row in csv.DictReader(io.StringIO(text, newline=''), fieldnames=columns)]
+            instrumentation.record_read(name, size=csv_signature[1] - old_csv[1], rows=len(changes))
+            return changes, (csv_signature, new_log)
+        if old_csv == new_csv and new_log is not None and (old_log is None or new_log[1] > old_log[1]):
+            tail = self._read_log(name, old_log, new_log)
+            if tail is None:
+                return None
+            changes, log_signature = tail
+            return changes, (new_csv, log_signature)
+        return None
+
+    def _read_log(self, name, old, new):
+        """(change log entries between signatures old and new, signature read up to), or
+        None when the log was not just appended to"""
+        if not os.path.exists(self.log_path(name)):
+            return [], old
+        tail = self._read(self.log_path(name), old, new)
+        if tail is None:
+            return None
+        text, signature = tail
+        changes = [json.loads(line) for line in text.splitlines() if line.strip()]
+        instrumentation.record_read(name, size=signature[1] - (old[1] if old else 0), rows=len(changes))
+        return changes, signature
+
+    def write(self, name, columns, key_column, change):
+        self.write_many(name, columns, key_column, [change])
+
+    def write_many(self, name, columns, key_column, changes):
+        """New rows of append-only tables go to the CSV, everything else to the log"""
+        path = self.path(name)
+        rows, entries = [], []
+        for change in changes:
+            if change['op'] == 'append' and name in APPEND_ONLY:
+                rows.append(change['row'])
+            else:
+                if change['op'] == 'append' and key_column:
+                    # Keyed entries stay idempotent when a log is replayed twice
+                    change = {'op': 'upsert', 'key': change['row'].get(key_column), 'row': change['row']}
+                entries.append(json.dumps(change) + '\n')
+        if rows:
+            text = io.StringIO(newline='')
+            writer = csv.DictWriter(text, fieldnames=columns, lineterminator='\n')
+            if not os.path.exists(path):
+                writer.writeheader()
+            elif not _ends_with_newline(path):
+                text.write('\n')
+            writer.writerows(rows)
+            self._append(path, text.getvalue())
+        if entries:
+            self._append(self.log_path(name), ''.join(entries))
+
+    def replace(self, name, columns, rows):
+        """Write the CSV through a temp file + atomic rename, then clear the log"""
+        path = self.path(name)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w', newline='', encoding='utf-8') as file:
+            writer = csv.DictWriter(file, fieldnames=columns, lineterminator='\n', extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(rows)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        # Log entries are idempotent, so a crash before this truncate only replays them again
+        if os.path.exists(self.log_path(name)):
+            open(self.log_path(name), 'w').close()
+
+    def compact(self, name, columns, rows):
+        log_signature = _file_signature(self.log_path(name))
+        if log_signature is not None and log_signature[1] > 0:
+            self.replace(name, columns, rows)
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+class SqliteBackend:
+    """All tables in one SQLite database, values kept as text like the CSVs"""
+
+    name = 'sqlite'
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+
+    def connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS _table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+            conn.commit()
+            self.local.conn = conn
+        return conn
+
+    def lock_path(self, name):
+        return f'{self.db_path}.{name}.lock'
+
+    def columns(self, name):
+        return [row[1] for row in self.connection().execute(f'PRAGMA table_info({_quote(name)})')]
+
+    def signature(self, name):
+        row = self.connection().execute('SELECT version FROM _table_versions WHERE name = ?', (name,)).fetchone()
+        return row[0] if row else None
+
+    def modified(self, signature):
+        return None  # versions carry no time; the ETag alone tells clients about changes
+
+    def _bump(self, conn, name):
+        conn.execute('INSERT INTO _table_versions (name, version) VALUES (?, 1) '
+                     'ON CONFLICT(name) DO UPDATE SET version = version + 1', (name,))
+
+    def load(self, name, signature=None):
+        columns = self.columns(name)
+        if not columns:
+            return [], [], [], signature
+        cursor = self.connection().execute(f'SELECT * FROM {_quote(name)} ORDER BY rowid')
+        rows = [dict(zip(columns, values)) for values in cursor]
+        instrumentation.record_read(name, files=0, rows=len(rows))
+        return columns, rows, [], signature
+
+    def changes_since(self, name, old, new, columns):
+        return None
+
+    def write(self, name, columns, key_column, change):
+        self.write_many(name, columns, key_column, [change])
+
+    def write_many(self, name, columns, key_column, changes):
+        """Apply a batch of changes in one transaction"""
+        conn = self.connection()
+        table = _quote(name)
+        assignments = ', '.join(f'{_quote(column)} = ?' for column in columns)
+        placeholders = ', '.join('?' for _ in columns)
+        with conn:
+            if not self.columns(name):
+                self._create(conn, name, columns)
+            for change in changes:
+                if change['op'] == 'delete':
+                    conn.execute(f'DELETE FROM {table} WHERE {_quote(key_column)} = ?', (change['key'],))
+                    continue
+                values = [change['row'].get(column, '') for column in columns]
+                updated = 0
+                if change['op'] == 'upsert':
+                    updated = conn.execute(f'UPDATE {table} SET {assignments} WHERE {_quote(key_column)} = ?',
+                                           values + [change['key']]).rowcount
+                if not updated:
+                    conn.execute(f'INSERT INTO {table} ({", ".join(map(_quote, columns))}) VALUES ({placeholders})',
+                                 values)
+            self._bump(conn, name)
+
+    def _create(self, conn, name, columns):
+        conn.execute(f'CREATE TABLE {_quote(name)} ({", ".join(_quote(column) + " TEXT" for column in columns)})')
+        for column in SQL_INDEXED_COLUMNS:
+            if column in columns:
+                conn.execute(f'CREATE INDEX {_quote("idx_" + name + "_" + column)} '
+                             f'ON {_quote(name)} ({_quote(column)})')
+
+    def replace(self, name, columns, rows):
+        conn = self.connection()
+        with conn:
+            conn.execute(f'DROP TABLE IF EXISTS {_quote(name)}')
+            self._create(conn, name, columns)
+            placeholders = ', '.join('?' for _ in columns)
+            conn.executemany(f'INSERT INTO {_quote(name)} VALUES ({placeholders})',
+                             ([row.get(column, '') for column in columns] for row in rows))
+            self._bump(conn, name)
+
+    def compact(self, name, columns, rows):
+        pass
+
+    def query(self, name, filters, order_by=None):
+        """Rows matching column == value filters, answered from the SQL indexes"""
+        sql = f'SELECT * FROM {_quote(name)}'
+        if filters:
+            sql += ' WHERE ' + ' AND '.join(f'{_quote(column)} = ?' for column in filters)
+        if order_by:
+            sql += f' ORDER BY {_quote(order_by)}'
+        cursor = self.connection().execute(sql, [str(value) for value in filters.values()])
+        columns = [description[0] for description in cursor.description]
+        return [dict(zip(columns, values)) for values in cursor]
+
+
+def create_backend(kind, data_dir, sqlite_path):
+    """Backend named in config.STORAGE_BACKEND"""
+    if kind == 'sqlite':
+        return SqliteBackend(sqlite_path)
+    if kind == 'csv':
+        return CsvBackend(data_dir)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
@@ -0,0 +1,188 @@
+# models/trends_model.py
+"""Production growth trends per country and per mineral.
+
+Yearly totals of every series (one country or one mineral) are kept in
+memory and follow data_store change notifications: a new, edited or
+deleted production row only adjusts the yearly totals of its country and
+mineral series and drops their cached analytics. After a bulk change
+(a reload or an import batch) the totals are re-aggregated in one
+vectorized pass and compared with the previous ones, so analytics are
+recomputed only for the series whose numbers actually moved.
+
+Per series: year-over-year growth, CAGR over the requested span, rolling
+averages over calendar years and share of the all-series total per year.
+"""
+import threading
+
+import numpy as np
+
+from models import data_store, schema
+from models.production_model import ProductionStats
+
+DIMENSIONS = ('country', 'mineral')
+METRICS = ('production', 'export_value')
+DEFAULT_WINDOW = 3
+MAX_WINDOW = 20
+
+# value index of each metric in the per-year [production, export_value, rows] lists
+_METRIC_INDEX = {'production': 0, 'export_value': 1}
+
+
+def _growth_percent(current, previous):
+    return (current - previous) / previous * 100 if previous else None
+
+
+def cagr_percent(first_year, first_value, last_year, last_value):
+    """Compound annual growth rate between two years, None when undefined"""
+    years = last_year - first_year
+    if years <= 0 or first_value <= 0 or last_value < 0:
+        return None
+    return ((last_value / first_value) ** (1 / years) - 1) * 100
+
+
+class ProductionTrends:
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ready = False
+        self.series = dict((dimension, {}) for dimension in DIMENSIONS)  # id -> {year: [production, export, rows]}
+        self.year_totals = {}  # year -> [production, export, rows]
+        self.analytics = {}    # (dimension, id) -> {(metric, window): computed series}
+
+    # --- maintenance (called from data_store notifications) ---
+
+    def on_change(self, table, old_row, new_row):
+        with self.lock:
+            if old_row is None and new_row is None:
+                self.ready = False
+                return
+            if not self.ready:
+                return
+            if old_row is not None:
+                self._apply(old_row, -1)
+            if new_row is not None:
+                self._apply(new_row, 1)
+
+    def _apply(self, row, sign):
+        record = schema.for_row('production_stats', row).record(row)
+        amounts = (record.production_tonnes * sign, record.export_value_billion_usd * sign, sign)
+        self._add_to(self.year_totals, record.year, amounts)
+        for dimension, series_id in (('country', record.country_id), ('mineral', record.mineral_id)):
+            years = self.series[dimension].setdefault(series_id, {})
+            self._add_to(years, record.year, amounts)
+            if not years:
+                del self.series[dimension][series_id]
+            self._invalidate(dimension, series_id)
+
+    @staticmethod
+    def _add_to(years, year, amounts):
+        totals = years.setdefault(year, [0.0, 0.0, 0])
+        for index, amount in enumerate(amounts):
+            totals[index] += amount
+        if totals[2] <= 0:
+            del years[year]
+
+    def _invalidate(self, dimension, series_id):
+        self.analytics.pop((dimension, series_id), None)
+
+    def _aggregate(self, stats, ids):
+        """{id: {year: [production, export, rows]}} for one id column"""
+        keys = np.stack([ids, stats.year], axis=1)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        production = np.bincount(inverse, weights=stats.production, minlength=len(groups))
+        export_value = np.bincount(inverse, weights=stats.export_value, minlength=len(groups))
+        rows = np.bincount(inverse, minlength=len(groups))
+        series = {}
+        for (series_id, year), *totals in zip(groups.tolist(), production.tolist(),
+                                              export_value.tolist(), rows.tolist()):
+            series.setdefault(series_id, {})[year] = totals
+        return series
+
+    def _ensure_ready(self):
+        """Re-aggregate after a bulk change, keeping the analytics of unchanged series"""
+        table = data_store.get_table('production_stats')
+        if self.ready:
+            return
+        # Same lock order as on_change: table first, then trends
+        with table.lock, self.lock:
+            if self.ready:
+                return
+            stats = ProductionStats.load()
+            series = {
+                'country': self._aggregate(stats, stats.country_id),
+                'mineral': self._aggregate(stats, stats.mineral_id),
+            }
+            for dimension in DIMENSIONS:
+                old = self.series[dimension]
+                for series_id in set(old) | set(series[dimension]):
+                    if old.get(series_id) != series[dimension].get(series_id):
+                        self._invalidate(dimension, series_id)
+            self.series = series
+            self.year_totals = {}
+            for years in series['country'].values():
+                for year, totals in years.items():
+                    self._add_to(self.year_totals, year, totals)
+            self.ready = True
+
+    # --- reads ---
+
+    def _analytics(self, dimension, series_id, metric, window):
+        """Cached yearly values, YoY growth and rolling average of one series"""
+        cache = self.analytics.setdefault((dimension, series_id), {})
+        cached = cache.get((metric, window))
+        if cached is not None:
+            return cached
+        index = _METRIC_INDEX[metric]
+        years = self.series[dimension][series_id]
+        ordered = sorted(years)
+        values = [years[year][index] for year in ordered]
+        growth = [_growth_percent(value, years[year - 1][index]) if year - 1 in years else None
+                  for year, value in zip(ordered, values)]
+        rolling = []
+        for year in ordered:
+            in_window = [years[y][index] for y in range(year - window + 1, year + 1) if y in years]
+            rolling.append(sum(in_window) / len(in_window))
+        cached = cache[(metric, window)] = {'years': ordered, 'values': values, 'yoy': growth, 'rolling': rolling}
+        return cached
+
+    def series_ids(self, dimension):
+        self._ensure_ready()
+        with self.lock:
+            return sorted(self.series[dimension])
+
+    def trends(self, dimension, ids=None, metric='production', window=DEFAULT_WINDOW,
+               year_from=None, year_to=None):
+        """Trend series of the given countries or minerals (all when ids is None)"""
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Cannot group trends by '{dimension}' (use {', '.join(DIMENSIONS)})")
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}' (use {', '.join(METRICS)})")
+        if not 1 <= window <= MAX_WINDOW:
+            raise ValueError(f'window must be 1-{MAX_WINDOW} years')
+        self._ensure_ready()
+        index = _METRIC_INDEX[metric]
+        result = []
+        with self.lock:
+            for series_id in sorted(self.series[dimension]) if ids is None else ids:
+                if series_id not in self.series[dimension]:
+                    continue
+                analytics = self._analytics(dimension, series_id, metric, window)
+                points = [i for i, year in enumerate(analytics['years'])
+                          if (year_from is None or year >= year_from) and (year_to is None or year <= year_to)]
+                years = [analytics['years'][i] for i in points]
+                values = [analytics['values'][i] for i in points]
+                result.append({
+                    'id': series_id,
+                    'years': years,
+                    'values': values,
+                    'yoy_percent': [analytics['yoy'][i] for i in points],
+                    'rolling_average': [analytics['rolling'][i] for i in points],
+                    'share_percent': [value / self.year_totals[year][index] * 100 if self.year_totals[year][index] else None
+                                      for year, value in zip(years, values)],
+                    'cagr_percent': cagr_percent(years[0], values[0], years[-1], values[-1]) if years else None,
+                })
+        return result
+
+
+production_trends = ProductionTrends()
+data_store.subscribe('production_stats', production_trends.on_change)
@@ -1,61 +1,114 @@
 # models/user_model.py
-import csv
-import os
+"""User accounts stored in users.csv.
 
-USER_FILE = 'users.csv'
+Lookups go through the in-memory Username index of the data cache, so a
+login costs the same no matter how many accounts exist. Registrations hold
+the users write lock while they check the name, take the next UserID and
+append the row, which keeps IDs unique across threads and worker processes.
+
+Passwords are stored as salted hashes (models/password_model.py); rows
+still holding a legacy plaintext password are rehashed on their next login.
+
+Self-registered accounts always get DEFAULT_ROLE; only user managers
+(routes/admin_routes.py) assign other roles.
+"""
+import logging
+
+from models import data_store, password_model
+from models.role_model import Role
+
+log = logging.getLogger(__name__)
+
+USER_COLUMNS = ['UserID', 'Username', 'PasswordHash', 'RoleID', 'Email']
+
+# Role of every self-registered account
+DEFAULT_ROLE = 'Researcher'
 
 def init_user_file():
     """Initialize with your original structure"""
-    if not os.path.exists(USER_FILE):
-        # Create file with your original structure
-        with open(USER_FILE, 'w', newline='') as file:
-            writer = csv.writer(file)
-            writer.writerow(['UserID', 'Username', 'PasswordHash', 'RoleID', 'Email'])
-            writer.writerow([1, 'admin01', 'hash123', 1, 'admin@miningapp.com'])
-            writer.writerow([2, 'investor01', 'hash456', 2, 'invest@miningapp.com'])
-            writer.writerow([3, 'research01', 'hash789', 3, 'research@univ.edu'])
-        print("✅ Created users.csv with your original structure")
-    else:
-        print("✅ users.csv exists with your data")
+    if not data_store.get_columns('users'):
+        # Create table with your original structure
+        hash_password = password_model.hash_password
+        data_store.replace_table('users', USER_COLUMNS, [
+            dict(zip(USER_COLUMNS, ['1', 'admin01', hash_password('hash123'), '1', 'admin@miningapp.com'])),
+            dict(zip(USER_COLUMNS, ['2', 'investor01', hash_password('hash456'), '2', 'invest@miningapp.com'])),
+            dict(zip(USER_COLUMNS, ['3', 'research01', hash_password('hash789'), '3', 'research@univ.edu'])),
+        ])
+        log.info('created users table')
 
 def get_user(username):
     """Get user by Username (capital U)"""
-    if not os.path.exists(USER_FILE):
-        return None
-    
-    with open(USER_FILE, 'r') as file:
-        reader = csv.DictReader(file)
-        for row in reader:
-            if row['Username'] == username:  # Capital U
-                return row
-    return None
-
-def create_user(username, password, role_id=3):
-    """Create a new user - using your structure"""
+    return data_store.get_unique('users', 'Username', username)
+
+def _role_id(role_id):
+    """RoleID of a known role (DEFAULT_ROLE when None), else ValueError"""
+    if role_id is None:
+        role = Role.get_role_by_name(DEFAULT_ROLE)
+        return role.role_id if role else 3
+    try:
+        role = Role.get_role_by_id(int(role_id))
+    except (TypeError, ValueError):
+        role = None
+    if role is None:
+        raise ValueError(f"Unknown role '{role_id}'")
+    return role.role_id
+
+def create_user(username, password, role_id=None):
+    """Create a new user - using your structure.
+
+    Leave role_id out for self-registration; callers passing one must have
+    checked that the current user may assign roles.
+    """
+    role_id = _role_id(role_id)
     if get_user(username):
         return False
     
-    # Get next UserID
-    users = []
-    if os.path.exists(USER_FILE):
-        with open(USER_FILE, 'r') as file:
-            reader = csv.DictReader(file)
-            users = list(reader)
-    
-    next_id = len(users) + 1
+    # Hash before taking the lock so other registrations are not held up
+    password_hash = password_model.run_bounded(password_model.hash_password, password)
     
-    with open(USER_FILE, 'a', newline='') as file:
-        writer = csv.writer(file)
-        writer.writerow([next_id, username, password, role_id, f'{username}@miningapp.com'])
+    with data_store.write_lock('users') as users:
+        # Re-check under the lock - another worker may have just taken the name
+        if users.unique['Username'].get(username.strip()):
+            return False
+        
+        users.append({
+            'UserID': data_store.next_key('users'),
+            'Username': username,
+            'PasswordHash': password_hash,
+            'RoleID': str(role_id),
+            'Email': f'{username}@miningapp.com'
+        })
     return True
 
+def authenticate(username, password):
+    """User row when the password matches, else None.
+
+    Legacy or weaker hashes are replaced with one at the current settings.
+    Raises password_model.PasswordPoolBusy when too many logins are waiting.
+    """
+    user = get_user(username)
+    stored = user['PasswordHash'] if user else password_model.dummy_hash()
+    matches, needs_rehash = password_model.run_bounded(password_model.verify_password, password, stored)
+    if not user or not matches:
+        return None
+    if needs_rehash:
+        new_hash = password_model.run_bounded(password_model.hash_password, password)
+        data_store.update_row('users', user['UserID'], {'PasswordHash': new_hash})
+        log.info('upgraded password hash', extra={'username': username})
+    return user
+
+def set_user_role(user_id, role_id):
+    """Give a user another role, returns False when the user is unknown"""
+    return data_store.update_row('users', user_id, {'RoleID': str(_role_id(role_id))})
+
+def role_of(user):
+    """Role of a user row, None when its RoleID is missing or unknown"""
+    try:
+        return Role.get_role_by_id(int(user['RoleID']))
+    except (KeyError, TypeError, ValueError):
+        return None
+
 def get_user_role(username):
     """Get user's role object - using RoleID (capital R)"""
     user = get_user(username)
-    if user and 'RoleID' in user:  # Capital R
-        from models.role_model import Role
-        try:
-            return Role.get_role_by_id(int(user['RoleID']))
-        except:
-            return None
-    return None
\ No newline at end of file
+    return role_of(user) if user else None
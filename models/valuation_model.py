@@ -0,0 +1,215 @@
+# models/valuation_model.py
+"""Production value and price-shock scenarios.
+
+Production rows are joined with mineral prices by indexing a dense price
+array with the MineralID column, so valuing every row is one array
+multiply. For scenarios the rows are first collapsed into a base matrix of
+value per (group, mineral); a scenario is a vector of price multipliers
+per mineral, so any number of scenarios is a single matrix product
+(scenarios x minerals) @ (minerals x groups). Monte Carlo runs draw
+lognormal multipliers the same way. Large grids are split into chunks that
+run on a process pool when SCENARIO_WORKERS is set; each Monte Carlo chunk
+has its own seed, so results do not depend on the number of workers.
+"""
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import SCENARIO_WORKERS
+from models import data_store, schema
+from models.production_model import ProductionStats, GROUP_COLUMNS
+
+# Scenario (or run) x group values one request may produce
+MAX_CELLS = 5000000
+# Scenarios (or runs) evaluated per chunk and process pool task
+CHUNK_ROWS = 20000
+PERCENTILES = (5, 50, 95)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _evaluate(multipliers, base):
+    """Value per scenario and group: (scenarios x minerals) @ (minerals x groups)"""
+    return multipliers @ base
+
+
+def _simulate(seed, runs, sigma, base):
+    """Value per run and group for lognormal price multipliers with mean 1"""
+    normal = np.random.default_rng(seed).standard_normal((runs, len(sigma)))
+    return _evaluate(np.exp(normal * sigma - sigma ** 2 / 2), base)
+
+
+def _run_chunks(function, *args_per_chunk):
+    """function over chunks, on the process pool when there are several"""
+    chunks = len(args_per_chunk[0])
+    if SCENARIO_WORKERS > 1 and chunks > 1:
+        return np.vstack(list(_get_pool().map(function, *args_per_chunk)))
+    return np.vstack([function(*args) for args in zip(*args_per_chunk)])
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(SCENARIO_WORKERS)
+        return _pool
+
+
+class Valuation:
+    """Production rows valued at the current mineral prices"""
+
+    def __init__(self, stats, minerals, minerals_version=None):
+        self.stats = stats
+        self.minerals_version = minerals_version
+        # Ids start at 1; a blank or bad id parses to 0 or less and is valued as unknown
+        minerals = [mineral for mineral in minerals if mineral.mineral_id >= 1]
+        self.mineral_ids = np.array(sorted(mineral.mineral_id for mineral in minerals), dtype=np.int32)
+        self.mineral_names = dict((mineral.mineral_id, mineral.mineral_name) for mineral in minerals)
+        self.by_name = dict((mineral.mineral_name.casefold(), mineral.mineral_id) for mineral in minerals)
+        size = max(int(self.mineral_ids.max(initial=0)), int(stats.mineral_id.max(initial=0))) + 1
+        prices = np.zeros(size)
+        for mineral in minerals:
+            prices[mineral.mineral_id] = mineral.price_usd_per_tonne
+        # mineral id -> column of the base matrix (-1 = unknown, as is id 0)
+        self.column = np.full(size, -1, dtype=np.int64)
+        self.column[self.mineral_ids] = np.arange(len(self.mineral_ids))
+        # Ids below 1 read slot 0 instead of wrapping around to the end of the arrays
+        self.lookup = np.maximum(stats.mineral_id, 0)
+        self.value = stats.production * prices[self.lookup]
+
+    @classmethod
+    def load(cls):
+        """Valuation for the current production and mineral data.
+
+        One valuation is kept per production table version and rebuilt
+        when the minerals table has moved on since it was made.
+        """
+        minerals_version = data_store.get_table('minerals').version
+        slot = data_store.get_derived('production_stats', 'valuation', lambda rows: {})
+        valuation = slot.get('valuation')
+        if valuation is None or valuation.minerals_version != minerals_version:
+            valuation = slot['valuation'] = cls(ProductionStats.load(), schema.records('minerals'), minerals_version)
+        return valuation
+
+    def mineral_id(self, name_or_id):
+        """Mineral id from an id or a (case-insensitive) name"""
+        text = str(name_or_id).strip()
+        if text.isdigit() and int(text) in self.mineral_names:
+            return int(text)
+        if text.casefold() in self.by_name:
+            return self.by_name[text.casefold()]
+        raise ValueError(f"Unknown mineral '{name_or_id}'")
+
+    def _groups(self, group_by, mask):
+        """(group keys, group index of every masked row)"""
+        for name in group_by:
+            if name not in GROUP_COLUMNS:
+                raise ValueError(f"Cannot group by '{name}'")
+        if not group_by:
+            return np.zeros((1, 0), dtype=np.int64), np.zeros(int(mask.sum()), dtype=np.int64)
+        keys = np.stack([getattr(self.stats, GROUP_COLUMNS[name])[mask] for name in group_by], axis=1)
+        groups, inverse = np.unique(keys, axis=0, return_inverse=True)
+        return groups, inverse.ravel()
+
+    def _group_items(self, group_by, groups):
+        return [dict((GROUP_COLUMNS[name], int(value)) for name, value in zip(group_by, group)) for group in groups]
+
+    def values(self, group_by=('country',), **filters):
+        """Production value (USD) per group of year/country/mineral"""
+        mask = self.stats.mask(**filters)
+        groups, inverse = self._groups(group_by, mask)
+        totals = np.bincount(inverse, weights=self.value[mask], minlength=len(groups))
+        items = self._group_items(group_by, groups)
+        for item, total in zip(items, totals.tolist()):
+            item['value_usd'] = total
+        return items
+
+    def base_matrix(self, group_by, **filters):
+        """(group items, value per mineral x group at current prices)"""
+        mask = self.stats.mask(**filters)
+        groups, inverse = self._groups(group_by, mask)
+        columns = self.column[self.lookup[mask]]
+        known = columns >= 0
+        base = np.zeros((len(self.mineral_ids), len(groups)))
+        np.add.at(base, (columns[known], inverse[known]), self.value[mask][known])
+        return self._group_items(group_by, groups), base
+
+    def multipliers(self, shocks):
+        """Price multiplier rows, one per scenario, from {mineral: percent change} dicts"""
+        matrix = np.ones((len(shocks), len(self.mineral_ids)))
+        for row, scenario in enumerate(shocks):
+            if not isinstance(scenario, dict):
+                raise ValueError('Shocks must map minerals to a percent price change')
+            for mineral, percent in scenario.items():
+                matrix[row, self.column[self.mineral_id(mineral)]] = 1 + float(percent) / 100
+        if (matrix < 0).any():
+            raise ValueError('A price cannot fall by more than 100%')
+        return matrix
+
+    def volatilities(self, volatility):
+        """Lognormal sigma per base matrix row from {mineral: % volatility}"""
+        if not isinstance(volatility, dict):
+            raise ValueError('Volatility must map minerals to a percent')
+        sigma = np.zeros(len(self.mineral_ids))
+        for mineral, percent in volatility.items():
+            sigma[self.column[self.mineral_id(mineral)]] = float(percent) / 100
+        if (sigma < 0).any():
+            raise ValueError('Volatility cannot be negative')
+        return sigma
+
+
+def _check_size(rows, base):
+    if rows < 1 or rows * max(base.shape[1], 1) > MAX_CELLS:
+        raise ValueError(f'Give 1 or more scenarios, at most {MAX_CELLS} scenario x group values')
+
+
+def run_scenarios(scenarios, group_by=('country',), **filters):
+    """Value of every group under each named scenario.
+
+    scenarios is a list of {'name': ..., 'shocks': {mineral name or id: % price change}}.
+    """
+    valuation = Valuation.load()
+    groups, base = valuation.base_matrix(group_by, **filters)
+    _check_size(len(scenarios), base)
+    base_values = base.sum(axis=0)
+    multipliers = valuation.multipliers([scenario.get('shocks') or {} for scenario in scenarios])
+    chunks = [multipliers[start:start + CHUNK_ROWS] for start in range(0, len(multipliers), CHUNK_ROWS)]
+    results = _run_chunks(_evaluate, chunks, [base] * len(chunks))
+    base_total = float(base_values.sum())
+    return {
+        'groups': groups,
+        'base': base_values.tolist(),
+        'base_total': base_total,
+        'scenarios': [{
+            'name': scenario.get('name') or f'scenario {number + 1}',
+            'values': values.tolist(),
+            'total': float(values.sum()),
+            'change_percent': (float(values.sum()) / base_total - 1) * 100 if base_total else None,
+        } for number, (scenario, values) in enumerate(zip(scenarios, results))],
+    }
+
+
+def monte_carlo(runs, volatility, group_by=('country',), seed=None, **filters):
+    """Distribution of group values over random lognormal price paths"""
+    valuation = Valuation.load()
+    groups, base = valuation.base_matrix(group_by, **filters)
+    _check_size(runs, base)
+    sigma = valuation.volatilities(volatility)
+    sizes = [min(CHUNK_ROWS, runs - start) for start in range(0, runs, CHUNK_ROWS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    results = _run_chunks(_simulate, seeds, sizes, [sigma] * len(sizes), [base] * len(sizes))
+    totals = results.sum(axis=1)
+    summary = {
+        'groups': groups,
+        'runs': runs,
+        'base': base.sum(axis=0).tolist(),
+        'mean': results.mean(axis=0).tolist(),
+        'total_mean': float(totals.mean()),
+    }
+    for percentile, values, total in zip(PERCENTILES, np.percentile(results, PERCENTILES, axis=0),
+                                         np.percentile(totals, PERCENTILES)):
+        summary[f'p{percentile}'] = values.tolist()
+        summary[f'total_p{percentile}'] = float(total)
+    return summary
@@ -1,8 +1,10 @@
 # routes/admin_routes.py
-from flask import Blueprint, render_template, request, flash, redirect, url_for
-from auth_decorators import admin_required
-import csv
-import os
+from flask import Blueprint, render_template, request, flash, redirect, url_for, Response
+from auth_decorators import admin_required, requires
+from models import data_store
+from models.dashboard_model import dashboard_counters
+from models.role_model import Permission
+import instrumentation
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -10,36 +12,41 @@ admin_bp = Blueprint('admin', __name__)
 @admin_required
 def admin_panel():
     """Admin dashboard - ONLY Administrators"""
-    # Count users
-    user_count = 0
-    if os.path.exists('users.csv'):
-        with open('users.csv', 'r') as file:
-            reader = csv.DictReader(file)
-            user_count = sum(1 for row in reader)
-    
-    # Count countries
-    from models.country_model import Country
-    countries = Country.get_all_countries()
-    country_count = len(countries)
+    counts = dashboard_counters.counts()
     
     return render_template('admin_panel.html', 
-                         user_count=user_count, 
-                         country_count=country_count)
+                         user_count=counts['users'], 
+                         country_count=counts['countries'],
+                         minerals_count=counts['minerals'])
 
 @admin_bp.route('/users')
-@admin_required
+@requires(Permission.MANAGE_USERS)
 def manage_users():
-    """Manage users - ONLY Administrators"""
-    users = []
-    if os.path.exists('users.csv'):
-        with open('users.csv', 'r') as file:
-            reader = csv.DictReader(file)
-            users = list(reader)
+    """Manage users - roles that may manage users (Administrators)"""
+    users = data_store.get_rows('users')
     
     from models.role_model import Role
     roles = Role.get_all_roles()
     
-    return render_template('manage_users.html', users=users, roles=roles)
+    # (RoleID as stored in users.csv, name) pairs, so the template compares strings
+    role_choices = [(str(role.role_id), role.role_name) for role in roles]
+    return render_template('manage_users.html', users=users, role_choices=role_choices,
+                           role_ids=set(role_id for role_id, role_name in role_choices))
+
+@admin_bp.route('/users/<user_id>/role', methods=['POST'])
+@requires(Permission.MANAGE_USERS)
+def assign_role(user_id):
+    """Change a user's role - only roles that may manage users"""
+    from models.user_model import set_user_role
+    try:
+        # A missing role_id must not fall back to the default role
+        if set_user_role(user_id, request.form.get('role_id', '')):
+            flash('Role updated.', 'success')
+        else:
+            flash('User not found.', 'error')
+    except ValueError as e:
+        flash(str(e), 'error')
+    return redirect(url_for('admin.manage_users'))
 
 @admin_bp.route('/data')
 @admin_required
@@ -47,5 +54,14 @@ def data_management():
     """Data management - ONLY Administrators"""
     from models.country_model import Country
     countries = Country.get_all_countries()
+    counts = dashboard_counters.counts()
     
-    return render_template('data_management.html', countries=countries)
\ No newline at end of file
+    return render_template('data_management.html', countries=countries,
+                           minerals_count=counts['minerals'],
+                           active_projects=counts['active_projects'])
+
+@admin_bp.route('/metrics')
+@admin_required
+def metrics():
+    """Request latency and data I/O metrics in the Prometheus text format"""
+    return Response(instrumentation.render(), mimetype='text/plain; version=0.0.4')
@@ -1,8 +1,12 @@
 # routes/auth_routes.py
+import logging
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from models.user_model import get_user, create_user
+from models.user_model import authenticate, create_user, role_of, DEFAULT_ROLE
+from models.password_model import PasswordPoolBusy
 from models.role_model import Role
 
+log = logging.getLogger(__name__)
+
 # Blueprint definition MUST come first
 auth_bp = Blueprint('auth', __name__)
 
@@ -11,16 +15,21 @@ def auth_register():
     if request.method == 'POST':
         username = request.form['username']
         password = request.form['password']
-        role_id = request.form.get('role_id', 3)
         
-        if create_user(username, password, role_id):
+        # Never taken from the form: self-registration must not pick its own role
+        try:
+            created = create_user(username, password)
+        except PasswordPoolBusy as e:
+            flash(str(e), 'error')
+            return render_template('register.html', default_role=DEFAULT_ROLE), 503
+        
+        if created:
             flash('Registration successful! Please login.', 'success')
             return redirect(url_for('auth.auth_login'))
         else:
             flash('Username already exists!', 'error')
     
-    roles = Role.get_all_roles()
-    return render_template('register.html', roles=roles)
+    return render_template('register.html', default_role=DEFAULT_ROLE)
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def auth_login():
@@ -28,14 +37,19 @@ def auth_login():
         username = request.form['username']
         password = request.form['password']
         
-        user = get_user(username)
-        if user and user['PasswordHash'] == password:
+        try:
+            user = authenticate(username, password)
+        except PasswordPoolBusy as e:
+            flash(str(e), 'error')
+            return render_template('login.html'), 503
+        
+        if user:
             session['user_id'] = username
-            user_role = Role.get_role_by_id(int(user['RoleID']))
-            session['role'] = user_role.role_name if user_role else 'Researcher'
-            
-            # DEBUG: Print login info
-            print(f"✅ LOGIN SUCCESS: {username} as {session['role']}")
+            user_role = role_of(user) or Role.get_role_by_name(DEFAULT_ROLE)
+            session['role'] = user_role.role_name if user_role else DEFAULT_ROLE
+            # Checked by the auth decorators on every request
+            session['permissions'] = int(user_role.mask) if user_role else 0
+            log.info('login', extra={'username': username, 'role': session['role']})
             
             flash('Login successful!', 'success')
             return redirect(url_for('home.home'))
@@ -1,7 +1,13 @@
 # routes/country_routes.py
+import logging
 from flask import Blueprint, render_template, request, jsonify, flash, redirect, url_for, session
 from models.country_model import Country
-from auth_decorators import login_required, admin_required
+from models.metrics_model import country_metrics
+from models import listing_model, schema
+from auth_decorators import login_required, admin_required, requires, Permission
+from http_cache import cached_by_data
+
+log = logging.getLogger(__name__)
 
 country_bp = Blueprint('country', __name__)
 
@@ -18,21 +24,17 @@ def country_profile(country_id):
     """Display detailed profile for a specific country"""
     country = Country.get_country_by_id(country_id)
     if country:
-        mining_contribution = (country.mining_revenue_billion_usd / country.gdp_billion_usd) * 100
         return render_template('country_profile.html', 
                              country=country, 
-                             mining_contribution=mining_contribution)
+                             metrics=country_metrics.for_country(country_id))
     else:
         flash('Country not found!', 'error')
         return redirect(url_for('country.countries'))
 
 @country_bp.route('/<int:country_id>/edit', methods=['GET', 'POST'])
-@login_required
-@admin_required
+@requires(Permission.EDIT_DATA)
 def edit_country(country_id):
     """Edit country data - ADMIN ONLY"""
-    print(f"🔧 Edit country route called for ID: {country_id}")
-    
     country = Country.get_country_by_id(country_id)
     
     if not country:
@@ -40,8 +42,6 @@ def edit_country(country_id):
         return redirect(url_for('country.countries'))
     
     if request.method == 'POST':
-        print("📝 Form submitted with data:", request.form)
-        
         try:
             country_name = request.form.get('country_name', '').strip()
             gdp_str = request.form.get('gdp_billion_usd', '0')
@@ -71,46 +71,59 @@ def edit_country(country_id):
                 flash('❌ GDP and Mining Revenue must be positive numbers!', 'error')
                 return render_template('edit_country.html', country=country)
             
-            print(f"✅ Validated data - Name: {country_name}, GDP: {gdp}, Revenue: {mining_revenue}")
-            
             # Update country data
             success = Country.update_country(country_id, country_name, gdp, mining_revenue, key_projects)
             
             if success:
                 flash(f'✅ {country_name} data updated successfully!', 'success')
-                # Update the displayed country object
-                country.country_name = country_name
-                country.gdp_billion_usd = gdp
-                country.mining_revenue_billion_usd = mining_revenue
-                country.key_projects = key_projects
+                # Show the submitted values (cached objects are shared, never modify them)
+                country = Country(country_id, country_name, gdp, mining_revenue, key_projects)
             else:
                 flash('❌ Failed to update country data in database!', 'error')
                 
         except Exception as e:
-            print(f"💥 Unexpected error: {e}")
+            log.exception('editing country failed', extra={'country_id': country_id})
             flash(f'❌ Unexpected error: {str(e)}', 'error')
     
     return render_template('edit_country.html', country=country)
 
+# API field -> schema field it sorts and filters on (the column is looked up in the current header)
+COUNTRY_SORT_FIELDS = {
+    'id': 'country_id',
+    'name': 'country_name',
+    'gdp': 'gdp_billion_usd',
+    'mining_revenue': 'mining_revenue_billion_usd'
+}
+
+def _country_item(row):
+    country = Country.from_row(row)
+    return {
+        'id': country.country_id,
+        'name': country.country_name,
+        'gdp': country.gdp_billion_usd,
+        'mining_revenue': country.mining_revenue_billion_usd,
+        'key_projects': country.key_projects,
+        'contribution_percent': country.mining_contribution
+    }
+
 @country_bp.route('/api/countries')
 @login_required
+@cached_by_data('countries')
 def api_countries():
-    """API endpoint to get all countries data"""
-    countries = Country.get_all_countries()
-    countries_data = []
-    for country in countries:
-        countries_data.append({
-            'id': country.country_id,
-            'name': country.country_name,
-            'gdp': country.gdp_billion_usd,
-            'mining_revenue': country.mining_revenue_billion_usd,
-            'key_projects': country.key_projects,
-            'contribution_percent': (country.mining_revenue_billion_usd / country.gdp_billion_usd) * 100
-        })
-    return jsonify(countries_data)
+    """API endpoint to list countries one page at a time
+
+    ?sort=-gdp&gdp_min=10&mining_revenue_max=20&limit=20&cursor=...&fields=id,name
+    """
+    columns = schema.columns_for('countries', COUNTRY_SORT_FIELDS)
+    try:
+        result = listing_model.api_page(request.args, 'countries', columns, _country_item, ranged=('gdp', 'mining_revenue'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
 
 @country_bp.route('/api/countries/<int:country_id>')
 @login_required
+@cached_by_data('countries', 'production_stats', 'sites')
 def api_country_profile(country_id):
     """API endpoint to get specific country data"""
     country = Country.get_country_by_id(country_id)
@@ -121,7 +134,10 @@ def api_country_profile(country_id):
             'gdp': country.gdp_billion_usd,
             'mining_revenue': country.mining_revenue_billion_usd,
             'key_projects': country.key_projects,
-            'contribution_percent': (country.mining_revenue_billion_usd / country.gdp_billion_usd) * 100
+            'contribution_percent': country.mining_contribution,
+            'metrics': country_metrics.for_country(country_id),
+            'production': Country.get_production_stats(country_id),
+            'sites': Country.get_sites(country_id)
         }
         return jsonify(country_data)
     else:
@@ -2,6 +2,7 @@
 from flask import Blueprint, render_template, session
 from auth_decorators import login_required
 from models.role_model import Role
+from models.dashboard_model import dashboard_counters
 
 home_bp = Blueprint('home', __name__)
 
@@ -18,4 +19,5 @@ def home():
     return render_template('home.html', 
                          username=username, 
                          userrole=userrole,
-                         permissions=permissions)
\ No newline at end of file
+                         permissions=permissions,
+                         counts=dashboard_counters.counts())
\ No newline at end of file
@@ -1,12 +1,22 @@
 # routes/map_routes.py
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, jsonify
 from auth_decorators import login_required
+from http_cache import cached_by_data
 from models.country_model import Country
+from models.site_model import SiteIndex, build_tile
+from models import data_store, schema
 
 map_bp = Blueprint('map', __name__)
 
+# Most sites returned for one bounding box
+MAX_SITES = 5000
+MAX_NEAREST = 100
+# Clustered tiles kept per data version (least recently used dropped first)
+MAX_TILES = 2048
+
 @map_bp.route('/')
 @login_required  # Only login required for now
+@cached_by_data('countries')
 def map_dashboard():
     """Display mineral map with country data"""
     countries = Country.get_all_countries()
@@ -19,7 +29,92 @@ def map_dashboard():
             'mining_revenue': country.mining_revenue_billion_usd,
             'gdp': country.gdp_billion_usd,
             'key_projects': country.key_projects,
-            'contribution_percent': (country.mining_revenue_billion_usd / country.gdp_billion_usd) * 100
+            'contribution_percent': country.mining_contribution
         })
     
-    return render_template('maps.html', countries=map_data)
\ No newline at end of file
+    return render_template('maps.html', countries=map_data)
+
+def _id_set(value):
+    """'1,2,3' -> {1, 2, 3}"""
+    return set(int(part) for part in value.split(',') if part.strip()) if value else None
+
+def _mineral_names():
+    """Mineral id -> name, cached until minerals.csv changes"""
+    columns = schema.columns_for('minerals', {'id': 'mineral_id', 'name': 'mineral_name'}).values()
+    return data_store.get_derived('minerals', 'mineral_names', lambda rows: dict(
+        (mineral.mineral_id, mineral.mineral_name) for mineral in schema.records('minerals')), columns)
+
+def _site_feature(site, **properties):
+    """GeoJSON point feature for a site"""
+    country = Country.get_country_by_id(site.country_id)
+    properties.update({
+        'id': site.site_id,
+        'name': site.site_name,
+        'country_id': site.country_id,
+        'country_name': country.country_name if country else None,
+        'mineral_id': site.mineral_id,
+        'mineral_name': _mineral_names().get(site.mineral_id),
+        'production_tonnes': site.production_tonnes
+    })
+    return {
+        'type': 'Feature',
+        'geometry': {'type': 'Point', 'coordinates': [site.longitude, site.latitude]},
+        'properties': properties
+    }
+
+@map_bp.route('/api/sites')
+@login_required
+@cached_by_data('sites', 'countries', 'minerals')
+def api_sites():
+    """Sites inside a bounding box as GeoJSON
+
+    ?bbox=west,south,east,north&country=1,2&mineral=3
+    """
+    try:
+        bbox = request.args.get('bbox', '-180,-90,180,90')
+        west, south, east, north = [float(part) for part in bbox.split(',')]
+        if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+            raise ValueError
+        countries, minerals = _id_set(request.args.get('country')), _id_set(request.args.get('mineral'))
+    except ValueError:
+        return jsonify({'error': 'bbox must be west,south,east,north in degrees; country/mineral are id lists'}), 400
+    
+    sites = SiteIndex.load().in_bbox(west, south, east, north, countries, minerals)
+    return jsonify({
+        'type': 'FeatureCollection',
+        'features': [_site_feature(site) for site in sites[:MAX_SITES]],
+        'truncated': len(sites) > MAX_SITES
+    })
+
+@map_bp.route('/api/sites/nearest')
+@login_required
+def api_nearest_sites():
+    """The k sites closest to a point as GeoJSON, nearest first
+
+    ?lat=-12.5&lon=27.9&k=5&country=1&mineral=3
+    """
+    try:
+        lat, lon = float(request.args['lat']), float(request.args['lon'])
+        k = int(request.args.get('k', 5))
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180 and 1 <= k <= MAX_NEAREST):
+            raise ValueError
+        countries, minerals = _id_set(request.args.get('country')), _id_set(request.args.get('mineral'))
+    except (KeyError, ValueError):
+        return jsonify({'error': f'lat and lon are required degrees; k must be 1-{MAX_NEAREST}'}), 400
+    
+    nearest = SiteIndex.load().nearest(lat, lon, k, countries, minerals)
+    return jsonify({
+        'type': 'FeatureCollection',
+        'features': [_site_feature(site, distance_km=round(distance, 3)) for distance, site in nearest]
+    })
+
+@map_bp.route('/tiles/<int:z>/<int:x>/<int:y>')
+@login_required
+@cached_by_data('sites', 'minerals', max_entries=MAX_TILES)
+def site_tile(z, x, y):
+    """Clustered sites of one z/x/y map tile as GeoJSON"""
+    try:
+        tile = build_tile(SiteIndex.load(), z, x, y, _mineral_names())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    return jsonify(tile)
@@ -1,21 +1,51 @@
 # routes/mineral_routes.py
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, jsonify
 from auth_decorators import login_required
-import csv
-import os
+from http_cache import cached_by_data
+from models import listing_model, schema
 
 minerals_bp = Blueprint('minerals', __name__)
 
+# API field -> schema field it sorts and filters on (the column is looked up in the current header)
+MINERAL_SORT_FIELDS = {
+    'id': 'mineral_id',
+    'name': 'mineral_name',
+    'price': 'price_usd_per_tonne'
+}
+
+def _mineral_item(row):
+    mineral = schema.for_row('minerals', row).record(row)
+    return {
+        'id': mineral.mineral_id,
+        'name': mineral.mineral_name,
+        'description': mineral.description,
+        'price': mineral.price_usd_per_tonne
+    }
+
 @minerals_bp.route('/')
 @login_required
 def index():
-    """Display minerals data"""
-    minerals = []
-    
-    # Read minerals from CSV
-    if os.path.exists('minerals.csv'):
-        with open('minerals.csv', 'r') as file:
-            reader = csv.DictReader(file)
-            minerals = list(reader)
+    """Display minerals data, one page at a time"""
+    limit = min(max(1, request.args.get('limit', listing_model.DEFAULT_LIMIT, type=int)), listing_model.MAX_LIMIT)
+    column = schema.columns_for('minerals', MINERAL_SORT_FIELDS)['id']
+    try:
+        minerals, next_cursor = listing_model.page('minerals', column, limit=limit, cursor=request.args.get('cursor'))
+    except ValueError:
+        minerals, next_cursor = listing_model.page('minerals', column, limit=limit)
     
-    return render_template('minerals.html', minerals=minerals)
+    return render_template('minerals.html', minerals=minerals, next_cursor=next_cursor, limit=limit)
+
+@minerals_bp.route('/api/minerals')
+@login_required
+@cached_by_data('minerals')
+def api_minerals():
+    """API endpoint to list minerals one page at a time
+
+    ?sort=-price&price_min=1000&limit=20&cursor=...&fields=id,name,price
+    """
+    columns = schema.columns_for('minerals', MINERAL_SORT_FIELDS)
+    try:
+        result = listing_model.api_page(request.args, 'minerals', columns, _mineral_item, ranged=('price',))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
@@ -0,0 +1,39 @@
+# routes/search_routes.py
+import time
+from flask import Blueprint, request, jsonify, url_for
+from auth_decorators import login_required
+from models.search_model import search_index, SEARCH_FIELDS
+
+search_bp = Blueprint('search', __name__)
+
+MAX_RESULTS = 50
+
+def _hit_url(hit):
+    """Page showing a search hit"""
+    if hit['type'] == 'countries' and hit['id'].isdigit():
+        return url_for('country.country_profile', country_id=int(hit['id']))
+    if hit['type'] == 'minerals':
+        return url_for('minerals.index')
+    return url_for('map.map_dashboard')
+
+@search_bp.route('')
+@login_required
+def search():
+    """Ranked full-text search across countries, minerals and sites
+
+    ?q=kolw cob&type=countries,sites&limit=10 (any word may be a prefix of a longer one)
+    """
+    query = request.args.get('q', '').strip()
+    tables = [name for name in request.args.get('type', '').split(',') if name]
+    unknown = [name for name in tables if name not in SEARCH_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown type(s): {', '.join(unknown)} (use {', '.join(SEARCH_FIELDS)})"}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_RESULTS)
+    
+    started = time.perf_counter()
+    hits = search_index.search(query, tables or None, limit)
+    took_ms = (time.perf_counter() - started) * 1000
+    
+    for hit in hits:
+        hit['url'] = _hit_url(hit)
+    return jsonify({'query': query, 'hits': hits, 'took_ms': round(took_ms, 3)})
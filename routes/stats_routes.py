@@ -1,7 +1,14 @@
 # routes/stats_routes.py
-from flask import Blueprint, render_template, jsonify
+from flask import Blueprint, render_template, jsonify, request
+from jinja2.utils import htmlsafe_json_dumps
 from auth_decorators import login_required
+from http_cache import cached_by_data
 from models.country_model import Country
+from models.production_model import ProductionStats
+from models.metrics_model import country_metrics
+from models.trends_model import production_trends, DEFAULT_WINDOW
+from models import valuation_model
+from models import data_store
 
 stats_bp = Blueprint('stats', __name__)
 
@@ -9,23 +16,24 @@ stats_bp = Blueprint('stats', __name__)
 @login_required  # Only login required for now
 def stats_dashboard():
     """Display production statistics"""
-    countries = Country.get_all_countries()
-    
-    total_gdp = sum(country.gdp_billion_usd for country in countries)
-    total_mining_revenue = sum(country.mining_revenue_billion_usd for country in countries)
-    avg_contribution = (total_mining_revenue / total_gdp) * 100 if total_gdp > 0 else 0
-    
-    stats = {
-        'total_countries': len(countries),
-        'total_gdp': total_gdp,
-        'total_mining_revenue': total_mining_revenue,
-        'avg_contribution': avg_contribution
-    }
+    stats = country_metrics.totals()
+    country_data = data_store.get_derived('countries', 'stats_country_json', _country_json)
     
-    return render_template('stats.html', countries=countries, stats=stats)
+    return render_template('stats.html', country_data=country_data, stats=stats)
+
+def _country_json(rows):
+    """Chart data of every country as one HTML-safe JSON blob (built once per data version)"""
+    countries = Country.get_all_countries()
+    return htmlsafe_json_dumps({
+        'countries': [country.country_name for country in countries],
+        'gdp': [country.gdp_billion_usd for country in countries],
+        'mining_revenue': [country.mining_revenue_billion_usd for country in countries],
+        'contributions': [round(country.mining_contribution, 1) for country in countries]
+    })
 
 @stats_bp.route('/api/production-data')
 @login_required  # Only login required for now
+@cached_by_data('countries')
 def production_data():
     """API endpoint for production data"""
     countries = Country.get_all_countries()
@@ -36,4 +44,126 @@ def production_data():
         'gdp': [country.gdp_billion_usd for country in countries]
     }
     
-    return jsonify(data)
\ No newline at end of file
+    return jsonify(data)
+
+def _id_list(value):
+    """'1,2,3' -> [1, 2, 3]"""
+    return [int(part) for part in value.split(',') if part.strip()] if value else None
+
+
+def _production_filters(args):
+    """Year range / country / mineral filters from the query string"""
+    return {
+        'year_from': args.get('year_from', type=int),
+        'year_to': args.get('year_to', type=int),
+        'countries': _id_list(args.get('country')),
+        'minerals': _id_list(args.get('mineral'))
+    }
+
+
+def _add_names(items):
+    """Attach country and mineral names to production results"""
+    for item in items:
+        if 'country_id' in item:
+            country = Country.get_country_by_id(item['country_id'])
+            item['country_name'] = country.country_name if country else None
+        if 'mineral_id' in item:
+            mineral = data_store.get_record('minerals', item['mineral_id'])
+            item['mineral_name'] = mineral['MineralName'] if mineral else None
+    return items
+
+
+@stats_bp.route('/api/production/summary')
+@login_required
+def production_summary():
+    """Production totals grouped by year, country and/or mineral
+
+    ?group_by=year,country,mineral&year_from=&year_to=&country=1,2&mineral=3
+    """
+    try:
+        group_by = tuple(part for part in request.args.get('group_by', 'year').split(',') if part)
+        summary = ProductionStats.load().summarize(group_by, **_production_filters(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(_add_names(summary))
+
+
+@stats_bp.route('/api/production/records')
+@login_required
+def production_records():
+    """Production statistics rows matching the year/country/mineral filters"""
+    try:
+        records = ProductionStats.load().records(**_production_filters(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(_add_names(records))
+
+
+@stats_bp.route('/api/trends')
+@login_required
+@cached_by_data('production_stats', 'countries', 'minerals')
+def production_trends_api():
+    """Year-over-year growth, CAGR, rolling averages and share of total per country or mineral
+
+    ?by=country|mineral&id=1,2&metric=production|export_value&window=3&year_from=&year_to=
+    """
+    by = request.args.get('by', 'country')
+    metric = request.args.get('metric', 'production')
+    window = request.args.get('window', DEFAULT_WINDOW, type=int)
+    try:
+        series = production_trends.trends(by, _id_list(request.args.get('id')), metric, window,
+                                          request.args.get('year_from', type=int),
+                                          request.args.get('year_to', type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    for item in series:
+        item[f'{by}_id'] = item.pop('id')
+    return jsonify({'by': by, 'metric': metric, 'window': window, 'series': _add_names(series)})
+
+
+def _shocks(text):
+    """'Lithium:-40,Cobalt:20' -> {'Lithium': -40.0, 'Cobalt': 20.0}"""
+    shocks = {}
+    for part in text.split(','):
+        if part.strip():
+            mineral, _, percent = part.partition(':')
+            shocks[mineral.strip()] = float(percent)
+    return shocks
+
+
+@stats_bp.route('/api/scenarios', methods=['GET', 'POST'])
+@login_required
+def price_scenarios():
+    """Production value per group under mineral price shocks
+
+    GET  ?shock=Lithium:-40,Cobalt:20&shock=Graphite:-10&group_by=country&year_from=&year_to=
+    POST {"group_by": [...], "scenarios": [{"name": ..., "shocks": {"Lithium": -40}}], ...}
+      or {"monte_carlo": {"runs": 10000, "volatility": {"Lithium": 35}, "seed": 1}, ...}
+    """
+    try:
+        if request.method == 'POST':
+            spec = request.get_json(silent=True)
+            if not isinstance(spec, dict):
+                raise ValueError('Expected a JSON object')
+            group_by = tuple(spec.get('group_by', ('country',)))
+            filters = {
+                'year_from': spec.get('year_from'),
+                'year_to': spec.get('year_to'),
+                'countries': spec.get('countries'),
+                'minerals': spec.get('minerals'),
+            }
+            if spec.get('monte_carlo'):
+                simulation = spec['monte_carlo']
+                result = valuation_model.monte_carlo(int(simulation.get('runs', 1000)),
+                                                     simulation.get('volatility') or {}, group_by,
+                                                     simulation.get('seed'), **filters)
+            else:
+                result = valuation_model.run_scenarios(spec.get('scenarios') or [], group_by, **filters)
+        else:
+            group_by = tuple(part for part in request.args.get('group_by', 'country').split(',') if part)
+            scenarios = [{'name': text, 'shocks': _shocks(text)} for text in request.args.getlist('shock')]
+            result = valuation_model.run_scenarios(scenarios, group_by, **_production_filters(request.args))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'error': str(e)}), 400
+    _add_names(result['groups'])
+    return jsonify(result)
@@ -0,0 +1,54 @@
+# template_cache.py
+"""Compiled-template and HTML fragment caching.
+
+Templates are compiled to Python bytecode once and the bytecode is kept
+in TEMPLATE_CACHE_DIR, so a new worker process loads it instead of
+parsing and compiling every template again. Outside debug mode templates
+are not checked for edits on each render (TEMPLATES_AUTO_RELOAD).
+
+Templates can call fragment('fragments/x.html', country=country) to
+render a per-record partial. The HTML is kept per record id together with
+the record's field values, so a page listing every country re-renders only
+the cards of countries that changed since they were last shown and reuses
+the rest (the fragment cache is bypassed while templates auto-reload).
+Fragments only see the records they are given: anything that
+depends on the user or the request stays in the page template.
+"""
+import os
+
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from config import TEMPLATE_CACHE_DIR, TEMPLATES_AUTO_RELOAD
+from http_cache import BodyCache
+
+# Rendered fragments kept (least recently used dropped first)
+MAX_FRAGMENTS = 10000
+
+
+def record_version(record):
+    """The field values of a record, which change whenever the record does"""
+    return tuple(getattr(record, field) for field in record.__slots__)
+
+
+def init_app(app):
+    """Bytecode cache, auto-reload setting and the fragment() template global for app"""
+    if TEMPLATE_CACHE_DIR:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        app.jinja_options = dict(app.jinja_options, bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR))
+    # None follows app.debug
+    app.config['TEMPLATES_AUTO_RELOAD'] = TEMPLATES_AUTO_RELOAD
+    fragments = BodyCache(MAX_FRAGMENTS, 'fragments', kind='fragment')
+
+    @app.template_global()
+    def fragment(template_name, **records):
+        """HTML of a partial template for the given records, cached per record"""
+        items = sorted(records.items())
+        key = (template_name,) + tuple((name, getattr(record, record.__slots__[0])) for name, record in items)
+        version = tuple(record_version(record) for name, record in items)
+        # While templates auto-reload (development) an edited partial must show up at once
+        html = None if app.jinja_env.auto_reload else fragments.get(key, version)
+        if html is None:
+            html = Markup(app.jinja_env.get_template(template_name).render(records))
+            fragments.put(key, version, html)
+        return html
@@ -0,0 +1,54 @@
+# tests/conftest.py
+"""Point the app at a scratch data folder before any app module is imported."""
+import glob
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = tempfile.mkdtemp(prefix='mineral-tests-')
+
+os.environ['DATA_DIR'] = DATA_DIR
+os.environ['STORAGE_BACKEND'] = 'csv'
+os.environ['TEMPLATE_CACHE_DIR'] = ''
+os.environ['LOG_LEVEL'] = 'WARNING'
+os.environ['SERVER_TIMING'] = '1'
+# Cheap hashes keep login tests fast; the scheme and format are unchanged
+os.environ['PASSWORD_COST'] = '1000'
+sys.path.insert(0, ROOT)
+
+
+def reset_data():
+    """Fresh copies of the sample CSV files, with every cached table dropped"""
+    from models import data_store
+    data_store.compact_pending()
+    for path in glob.glob(os.path.join(DATA_DIR, '*')):
+        if os.path.isfile(path):
+            os.remove(path)
+        else:
+            shutil.rmtree(path)
+    for path in glob.glob(os.path.join(ROOT, '*.csv')):
+        shutil.copy(path, DATA_DIR)
+    data_store.invalidate()
+
+
+@pytest.fixture
+def data_dir():
+    reset_data()
+    yield DATA_DIR
+    from models import data_store
+    data_store.compact_pending()
+
+
+@pytest.fixture
+def client(data_dir):
+    from app import app
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+def login(client, username, password):
+    return client.post('/login', data={'username': username, 'password': password})
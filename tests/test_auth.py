@@ -0,0 +1,90 @@
+# tests/test_auth.py
+"""Registration, login and role-based authorization."""
+from conftest import login
+from models import data_store
+from models.role_model import FULL_ACCESS, Permission, compile_permissions
+
+
+def _user(username):
+    return data_store.get_unique('users', 'Username', username)
+
+
+def test_register_page_has_no_role_picker(client):
+    page = client.get('/register').get_data(as_text=True)
+    assert 'role_id' not in page
+    assert 'Researcher' in page
+
+
+def test_self_registration_always_gets_researcher(client):
+    response = client.post('/register', data={'username': 'mallory', 'password': 'pw12345', 'role_id': '1'})
+    assert response.status_code == 302
+    assert _user('mallory')['RoleID'] == '3'
+
+    login(client, 'mallory', 'pw12345')
+    with client.session_transaction() as session:
+        assert session['role'] == 'Researcher'
+        assert not session['permissions'] & Permission.MANAGE_USERS
+    assert client.get('/admin/users').status_code == 302
+
+
+def test_duplicate_username_is_refused(client):
+    client.post('/register', data={'username': 'admin01', 'password': 'other'})
+    assert data_store.get_unique('users', 'Username', 'admin01')['UserID'] == '1'
+
+
+def test_only_user_managers_assign_roles(client):
+    login(client, 'research01', 'hash789')
+    client.post('/admin/users/3/role', data={'role_id': '1'})
+    assert _user('research01')['RoleID'] == '3'
+
+    client.get('/logout')
+    login(client, 'admin01', 'hash123')
+    assert client.get('/admin/users').status_code == 200
+    client.post('/admin/users/3/role', data={'role_id': '2'})
+    assert _user('research01')['RoleID'] == '2'
+
+
+def test_unknown_roles_are_not_assigned(client):
+    login(client, 'admin01', 'hash123')
+    page = client.post('/admin/users/3/role', data={'role_id': '99'}, follow_redirects=True).get_data(as_text=True)
+    assert "Unknown role" in page
+    assert _user('research01')['RoleID'] == '3'
+
+
+def test_user_list_selects_each_role_and_flags_unknown_ones(client):
+    data_store.update_row('users', '2', {'RoleID': '42'})
+    login(client, 'admin01', 'hash123')
+    page = client.get('/admin/users').get_data(as_text=True)
+    assert '<option value="1" selected>Administrator</option>' in page
+    assert '<option value="3" selected>Researcher</option>' in page
+    assert '<option value="" selected disabled>Unknown role (42)</option>' in page
+    assert page.count(' selected') == 3
+
+    # Saving the untouched placeholder posts no role_id: nothing is assigned
+    client.post('/admin/users/2/role', data={})
+    assert _user('investor01')['RoleID'] == '42'
+
+
+def test_plaintext_password_is_rehashed_on_login(client):
+    assert _user('investor01')['PasswordHash'] == 'hash456'
+    assert login(client, 'investor01', 'hash456').status_code == 302
+    stored = _user('investor01')['PasswordHash']
+    assert stored != 'hash456'
+
+    client.get('/logout')
+    assert login(client, 'investor01', 'hash456').status_code == 302
+    assert _user('investor01')['PasswordHash'] == stored
+    assert login(client, 'investor01', 'wrong').status_code == 200
+
+
+def test_login_with_an_unknown_role_falls_back_to_researcher(client):
+    data_store.update_row('users', '2', {'RoleID': 'x'})
+    login(client, 'investor01', 'hash456')
+    with client.session_transaction() as session:
+        assert session['role'] == 'Researcher'
+
+
+def test_permission_masks():
+    assert compile_permissions('Full access (manage users, edit/delete data)') == FULL_ACCESS
+    assert compile_permissions('View country profiles, charts, exports') == Permission.VIEW_DATA | Permission.EXPORT_DATA
+    assert compile_permissions('') == Permission(0)
@@ -0,0 +1,56 @@
+# tests/test_backup.py
+"""Backup snapshots and the job state other worker processes poll."""
+import time
+from datetime import timedelta, timezone
+
+import pytest
+
+from models import backup_model, data_store
+from models.job_store import JobStore
+
+
+def _wait(job_id):
+    for _ in range(500):
+        job = backup_model.get_job(job_id)
+        if job['status'] in ('finished', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f'job {job_id} did not finish')
+
+
+def test_job_state_is_shared_through_files(data_dir):
+    job = _wait(backup_model.start_backup())
+    assert job['status'] == 'finished'
+    # Another worker process has its own store object over the same folder
+    other = JobStore(backup_model._jobs.directory)
+    assert other.get(job['id']) == job
+    assert other.get('../../etc/passwd') is None
+
+
+def test_restore_puts_the_snapshot_back(data_dir):
+    snapshot_id = _wait(backup_model.start_backup())['result']['id']
+    data_store.update_row('countries', '1', {'CountryName': 'Changed'})
+    data_store.compact_pending()
+
+    job = _wait(backup_model.start_restore(snapshot_id))
+    assert job['status'] == 'finished'
+    assert data_store.get_record('countries', '1')['CountryName'] != 'Changed'
+
+
+@pytest.mark.parametrize('snapshot_id', ['../users', 'x', '20250101T120000Z', ''])
+def test_malformed_snapshot_ids_are_refused(data_dir, snapshot_id):
+    with pytest.raises(ValueError):
+        backup_model.load_snapshot(snapshot_id)
+
+
+def test_snapshot_at_compares_times_not_strings(data_dir):
+    snapshot = _wait(backup_model.start_backup())['result']
+    created = backup_model._parse_time(snapshot['created'])
+    # The same instant written two hours behind UTC sorts before it as a string
+    local = created.astimezone(timezone(timedelta(hours=-2))).isoformat()
+    assert backup_model.snapshot_at(local) == snapshot['id']
+    assert backup_model.snapshot_at(snapshot['created'].replace('+00:00', 'Z')) == snapshot['id']
+    with pytest.raises(ValueError):
+        backup_model.snapshot_at('2000-01-01T00:00:00')
+    with pytest.raises(ValueError):
+        backup_model.snapshot_at('yesterday')
@@ -0,0 +1,28 @@
+# tests/test_benchmarks.py
+"""Regression checks of the benchmark suite against a baseline from another machine."""
+from benchmarks import suite
+
+
+def _case(p50):
+    return {'cold_ms': p50, 'calls': 10, 'ops_per_sec': round(1000 / p50, 1), 'p50_ms': p50, 'p99_ms': p50}
+
+
+BASELINE = {'1000': {'calibration': _case(10.0), 'home': _case(1.0)}}
+
+
+def test_baseline_is_scaled_to_this_machine():
+    # Everything twice as slow on a slower machine is no regression
+    assert suite.compare({'1000': {'calibration': _case(20.0), 'home': _case(2.0)}}, BASELINE, 0.3) == []
+    # Same machine speed, twice as slow is
+    regressions = suite.compare({'1000': {'calibration': _case(10.0), 'home': _case(2.0)}}, BASELINE, 0.3)
+    assert len(regressions) == 1 and regressions[0].startswith('home @ 1000 rows')
+
+
+def test_baseline_without_calibration_is_refused():
+    assert suite.compare({'1000': {'calibration': _case(10.0), 'home': _case(1.0)}},
+                         {'1000': {'home': _case(1.0)}}, 0.3)
+
+
+def test_rescaled_results_keep_the_stored_speed():
+    assert suite._rescaled(_case(2.0), 0.5)['p50_ms'] == 1.0
+    assert suite._rescaled(_case(2.0), 0.5)['ops_per_sec'] == 1000.0
@@ -0,0 +1,55 @@
+# tests/test_dashboard.py
+"""Dashboard counters: following edits and reusing the saved sidecar."""
+import json
+import os
+
+from models import data_store
+from models.dashboard_model import DashboardCounters, dashboard_counters
+
+
+def test_counts_follow_edits(data_dir):
+    counts = dashboard_counters.counts()
+    assert counts['countries'] == 4 and counts['active_projects'] == 4
+    assert counts['sites'] == len(data_store.get_rows('sites'))
+
+    data_store.update_row('countries', '4', {'KeyProjects': ''})
+    data_store.insert_row('sites', {'SiteID': '5', 'SiteName': 'Rovuma', 'CountryID': '3', 'MineralID': '4',
+                                    'Latitude': '-11', 'Longitude': '40', 'Production_tonnes': '10'})
+    counts = dashboard_counters.counts()
+    assert counts['countries'] == 4 and counts['active_projects'] == 3
+    assert counts['sites'] == len(data_store.get_rows('sites'))
+
+    data_store.delete_row('countries', '1')
+    assert dashboard_counters.counts()['active_projects'] == 2
+
+
+def test_fresh_process_reuses_the_sidecar(data_dir, monkeypatch):
+    path = os.path.join(data_dir, 'counts-test.json')
+    expected = DashboardCounters(path).counts()
+    assert os.path.exists(path)
+
+    def no_loading(name):
+        raise AssertionError(f'{name} was loaded')
+
+    # Unchanged tables are answered from the file without touching the data
+    with monkeypatch.context() as patch:
+        patch.setattr(data_store, 'get_table', no_loading)
+        assert DashboardCounters(path).counts() == expected
+
+    # A table changed by someone else is recounted, the rest still come from the file
+    data_store.insert_row('minerals', {'MineralID': '9', 'MineralName': 'Nickel'})
+    loaded = []
+    get_table = data_store.get_table
+    monkeypatch.setattr(data_store, 'get_table', lambda name: loaded.append(name) or get_table(name))
+    counts = DashboardCounters(path).counts()
+    assert loaded == ['minerals']
+    assert counts['minerals'] == expected['minerals'] + 1
+
+
+def test_unreadable_sidecar_is_recounted(data_dir):
+    path = os.path.join(data_dir, 'counts-test.json')
+    with open(path, 'w') as file:
+        file.write('{not json')
+    assert DashboardCounters(path).counts()['countries'] == 4
+    with open(path) as file:
+        assert json.load(file)['backend'] == 'csv'
@@ -0,0 +1,104 @@
+# tests/test_data_store.py
+"""Writes through data_store and what other Table instances (processes) see of them."""
+from models import data_store
+from models.data_store import Table
+
+
+def _fresh(name):
+    """The table as another worker process would load it"""
+    return Table(name, data_store.backend).refresh()
+
+
+def test_insert_update_delete(data_dir):
+    key = data_store.insert_row('countries', {'CountryName': 'Zambia', 'GDP_BillionUSD': '29'})
+    assert data_store.get_record('countries', key)['CountryName'] == 'Zambia'
+
+    assert data_store.update_row('countries', key, {'GDP_BillionUSD': '30'})
+    assert data_store.get_record('countries', key)['GDP_BillionUSD'] == '30'
+
+    assert data_store.delete_row('countries', key)
+    assert data_store.get_record('countries', key) is None
+    assert not data_store.update_row('countries', key, {'GDP_BillionUSD': '1'})
+    assert not data_store.delete_row('countries', key)
+
+
+def test_other_processes_replay_the_change_log(data_dir):
+    other = _fresh('countries')
+    key = data_store.insert_row('countries', {'CountryName': 'Zambia'})
+    data_store.update_row('countries', '1', {'CountryName': 'DR Congo'})
+    data_store.delete_row('countries', '2')
+
+    other.refresh()
+    assert other.by_key[key]['CountryName'] == 'Zambia'
+    assert other.by_key['1']['CountryName'] == 'DR Congo'
+    assert '2' not in other.by_key
+    assert [row['CountryName'] for row in other.rows] == [row['CountryName'] for row in data_store.get_rows('countries')]
+
+
+def test_appends_from_another_process_are_applied_once(data_dir):
+    table = data_store.get_table('production_stats')
+    count = len(table.rows)
+    other = _fresh('production_stats')
+    with data_store.write_lock('production_stats'):
+        other.append({'StatID': '100', 'Year': '2024', 'CountryID': '1', 'MineralID': '1'})
+
+    for _ in range(3):
+        data_store.get_table('production_stats')
+    keys = [row['StatID'] for row in table.rows]
+    assert len(keys) == count + 1 and len(set(keys)) == len(keys)
+    assert data_store.get_related('production_stats', 'CountryID', 1)[-1]['StatID'] == '100'
+
+
+def test_compaction_folds_the_log_into_the_csv(data_dir):
+    data_store.update_row('countries', '1', {'CountryName': 'DR Congo'})
+    log_path = data_store.backend.log_path('countries')
+    with open(log_path) as log:
+        assert log.read()
+
+    data_store.compact_pending()
+    with open(log_path) as log:
+        assert log.read() == ''
+    assert _fresh('countries').by_key['1']['CountryName'] == 'DR Congo'
+
+
+def test_derived_values_follow_the_table(data_dir):
+    count = lambda: data_store.get_derived('countries', 'count', len)
+    before = count()
+    data_store.insert_row('countries', {'CountryName': 'Zambia'})
+    assert count() == before + 1
+
+
+def test_edits_keep_row_order_and_indexes(data_dir):
+    rows = data_store.get_rows('sites')
+    order = [row['SiteID'] for row in rows]
+    site = rows[1]
+    data_store.update_row('sites', site['SiteID'], {'SiteName': 'Renamed', 'CountryID': '99'})
+
+    assert [row['SiteID'] for row in data_store.get_rows('sites')] == order
+    assert data_store.get_rows('sites')[1]['SiteName'] == 'Renamed'
+    assert rows[1] is site  # a list a reader already holds is left alone
+    assert [row['SiteID'] for row in data_store.get_related('sites', 'CountryID', 99)] == [site['SiteID']]
+    assert site['SiteID'] not in [row['SiteID'] for row in data_store.get_related('sites', 'CountryID', site['CountryID'])]
+
+    data_store.delete_row('sites', site['SiteID'])
+    assert [row['SiteID'] for row in data_store.get_rows('sites')] == order[:1] + order[2:]
+    assert data_store.get_related('sites', 'CountryID', 99) == []
+
+
+def test_derived_values_naming_their_columns_survive_other_edits(data_dir):
+    builds = []
+
+    def names(rows):
+        builds.append(1)
+        return [row['Username'] for row in rows]
+
+    def get():
+        return data_store.get_derived('users', 'names', names, columns=('Username',))
+
+    get()
+    data_store.update_row('users', '1', {'PasswordHash': 'rehashed'})
+    assert get() == ['admin01', 'investor01', 'research01'] and len(builds) == 1
+    data_store.update_row('users', '1', {'Username': 'root'})
+    assert get()[0] == 'root' and len(builds) == 2
+    data_store.insert_row('users', {'Username': 'new'})
+    assert get()[-1] == 'new' and len(builds) == 3
@@ -0,0 +1,55 @@
+# tests/test_export.py
+"""Streaming table exports."""
+import csv
+import gzip
+import io
+import json
+
+import pytest
+
+from conftest import login
+from models import data_store, export_model
+
+
+def _text(name, **options):
+    chunks, mimetype, extension = export_model.stream_table(name, **options)
+    data = b''.join(chunks)
+    return (gzip.decompress(data) if options.get('compress') else data).decode('utf-8'), mimetype, extension
+
+
+def test_csv_export_matches_the_table(data_dir):
+    text, mimetype, extension = _text('countries')
+    assert (mimetype, extension) == ('text/csv', 'csv')
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert rows == [dict(row) for row in data_store.get_rows('countries')]
+
+
+def test_filtered_projected_ndjson_gzip(data_dir):
+    text, mimetype, extension = _text('production_stats', fmt='ndjson', columns=['StatID', 'Year'],
+                                      filters={'CountryID': '1'}, compress=True)
+    assert (mimetype, extension) == ('application/gzip', 'ndjson.gz')
+    assert [json.loads(line) for line in text.splitlines()] == [{'StatID': '1', 'Year': '2023'},
+                                                                {'StatID': '5', 'Year': '2024'}]
+
+
+def test_unknown_columns_and_formats_are_refused(data_dir):
+    with pytest.raises(ValueError):
+        export_model.stream_table('countries', columns=['Nope'])
+    with pytest.raises(ValueError):
+        export_model.stream_table('countries', fmt='xml')
+
+
+def test_export_route_filters_and_ignores_other_arguments(client):
+    login(client, 'admin01', 'hash123')
+    response = client.get('/export/production/csv?filter.CountryID=1&columns=StatID&_=1712&utm_source=mail')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'] == 'attachment; filename=production_stats.csv'
+    assert response.get_data(as_text=True).split() == ['StatID', '1', '5']
+
+
+@pytest.mark.parametrize('query', ['format=xml', 'columns=Nope', 'filter.Nope=1', 'gzip=maybe'])
+def test_bad_export_options_are_a_400(client, query):
+    login(client, 'admin01', 'hash123')
+    response = client.get('/export/minerals/csv?' + query)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
@@ -0,0 +1,36 @@
+# tests/test_http_cache.py
+"""ETag and Last-Modified of the cached API views."""
+import os
+from email.utils import parsedate_to_datetime
+
+from conftest import login
+from models import data_store, storage
+
+
+def test_last_modified_comes_from_the_stored_files(client, data_dir):
+    login(client, 'admin01', 'hash123')
+    response = client.get('/minerals/api/minerals')
+    mtime = int(os.stat(os.path.join(data_dir, 'minerals.csv')).st_mtime)
+    assert parsedate_to_datetime(response.headers['Last-Modified']).timestamp() == mtime
+
+    assert client.get('/minerals/api/minerals', headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    assert client.get('/minerals/api/minerals',
+                      headers={'If-Modified-Since': response.headers['Last-Modified']}).status_code == 304
+
+
+def test_versions_agree_across_processes(data_dir):
+    tag, modified = data_store.data_version(['minerals', 'countries'])
+    other = [data_store.Table(name).refresh() for name in ('minerals', 'countries')]
+    times = [table.source.modified(table.signature) for table in other]
+    assert modified == max(times)
+
+    os.utime(os.path.join(data_dir, 'minerals.csv'), (modified + 100, modified + 100))
+    new_tag, new_modified = data_store.data_version(['minerals', 'countries'])
+    assert new_tag != tag and new_modified == modified + 100
+
+
+def test_sqlite_versions_have_no_time(tmp_path):
+    backend = storage.SqliteBackend(str(tmp_path / 'data.sqlite3'))
+    backend.replace('roles', ['RoleID', 'RoleName'], [{'RoleID': '1', 'RoleName': 'Administrator'}])
+    assert backend.signature('roles') == 1
+    assert backend.modified(backend.signature('roles')) is None
@@ -0,0 +1,57 @@
+# tests/test_import.py
+"""Bulk imports: duplicate detection and job state."""
+import csv
+import io
+import os
+import time
+
+from werkzeug.datastructures import FileStorage
+
+from models import data_store, import_model
+from models.job_store import JobStore
+
+HEADER = 'StatID,Year,CountryID,MineralID,Production_tonnes,ExportValue_BillionUSD\n'
+
+
+def _import(tmp_path, text):
+    path = tmp_path / 'upload.csv'
+    path.write_text(HEADER + text)
+    reject_path = tmp_path / 'rejects.csv'
+    counts = import_model.import_file('production_stats', str(path), str(reject_path))
+    with open(reject_path, newline='') as file:
+        return counts, dict((row['line'], row['error']) for row in csv.DictReader(file))
+
+
+def test_duplicates_are_rejected(data_dir, tmp_path):
+    counts, rejects = _import(tmp_path, '\n'.join([
+        '1,2023,1,1,999,5.2',    # line 2: same id, same record -> update
+        '2,2030,1,1,5,1',        # line 3: id of a different record
+        ',2023,3,3,5,1',         # line 4: new id for an existing record
+        ',2031,1,1,5,1',         # line 5: new record
+        '50,2032,1,1,5,1',       # line 6: new record under a given id
+        '50,2033,1,1,5,1',       # line 7: same id twice in the file
+    ]) + '\n')
+
+    assert counts['rows_imported'] == 3 and counts['rows_rejected'] == 3
+    assert 'different record' in rejects['3']
+    assert rejects['4'] == 'duplicate of record 3'
+    assert 'appears twice' in rejects['7']
+    assert data_store.get_record('production_stats', '1')['Production_tonnes'] == '999'
+    assert data_store.get_record('production_stats', '2')['Year'] == '2023'
+    assert data_store.get_record('production_stats', '7')['Year'] == '2031'
+    assert data_store.get_record('production_stats', '50')['Year'] == '2032'
+
+
+def test_job_state_is_kept_next_to_the_rejects(data_dir):
+    upload = FileStorage(io.BytesIO((HEADER + ',2031,1,1,5,1\n').encode()), filename='stats.csv')
+    job_id = import_model.start_import('production_stats', upload)
+    for _ in range(500):
+        job = import_model.get_job(job_id)
+        if job['status'] in ('finished', 'failed'):
+            break
+        time.sleep(0.01)
+
+    assert job['status'] == 'finished' and job['progress']['rows_imported'] == 1
+    assert os.path.dirname(import_model._jobs.path(job_id)) == os.path.dirname(import_model.reject_file(job_id))
+    assert JobStore(import_model._jobs.directory).get(job_id) == job
+    assert import_model.get_job('not-a-job') is None
@@ -0,0 +1,82 @@
+# tests/test_instrumentation.py
+"""/admin/metrics exposition text and the Server-Timing header."""
+import re
+
+from conftest import login
+from models import data_store
+
+SAMPLE = re.compile(r'^(\w+)(\{.*\})? (\S+)$')
+
+
+def _samples(text):
+    """{(name, labels): value} of every sample line"""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith('#'):
+            continue
+        name, labels, value = SAMPLE.match(line).groups()
+        samples[(name, labels or '')] = float(value)
+    return samples
+
+
+def _metrics(client):
+    response = client.get('/admin/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    return response.get_data(as_text=True)
+
+
+def test_metrics_are_admin_only(client):
+    assert client.get('/admin/metrics').headers['Location'].endswith('/login')
+    login(client, 'research01', 'hash789')
+    response = client.get('/admin/metrics')
+    assert response.status_code == 302 and not response.headers['Location'].endswith('/metrics')
+
+
+def test_request_counter_and_latency_histogram(client):
+    login(client, 'admin01', 'hash123')
+    counted = ('http_requests_total', '{endpoint="country.countries",method="GET",status="200"}')
+    before = _samples(_metrics(client)).get(counted, 0)
+    for _ in range(3):
+        assert client.get('/countries/').status_code == 200
+    text = _metrics(client)
+    samples = _samples(text)
+
+    assert '# TYPE http_requests_total counter' in text
+    assert '# TYPE http_request_duration_seconds histogram' in text
+    assert samples[counted] == before + 3
+
+    labels = 'endpoint="country.countries",method="GET"'
+    buckets = [value for (name, sample_labels), value in samples.items()
+               if name == 'http_request_duration_seconds_bucket' and sample_labels.startswith('{' + labels)]
+    assert buckets == sorted(buckets)  # cumulative
+    count = samples[('http_request_duration_seconds_count', '{' + labels + '}')]
+    assert samples[('http_request_duration_seconds_bucket', '{' + labels + ',le="+Inf"}')] == count >= 3
+    assert samples[('http_request_duration_seconds_sum', '{' + labels + '}')] > 0
+
+
+def test_data_reads_are_counted(client):
+    login(client, 'admin01', 'hash123')
+    parsed = ('data_rows_parsed_total', '{table="countries"}')
+    before = _samples(_metrics(client)).get(parsed, 0)
+    data_store.invalidate('countries')
+    client.get('/countries/')
+    samples = _samples(_metrics(client))
+    assert samples[parsed] == before + len(data_store.get_rows('countries'))
+    assert samples[('cache_lookups_total', '{cache="table",name="countries",result="miss"}')] >= 1
+
+
+def test_server_timing_header(client):
+    login(client, 'admin01', 'hash123')
+    data_store.invalidate('countries')
+    header = client.get('/countries/').headers['Server-Timing']
+    parts = dict(part.split(';', 1) for part in re.split(r', (?=\w+;)', header))
+    assert set(parts) == {'total', 'data', 'tpl', 'cache'}
+    durations = dict((name, float(re.search(r'dur=([\d.]+)', parts[name]).group(1)))
+                     for name in ('total', 'data', 'tpl'))
+    assert durations['total'] >= durations['data'] + durations['tpl'] - 0.2  # rounded to 0.1 ms each
+    misses = int(re.search(r'(\d+) misses', parts['cache']).group(1))
+    assert misses >= 1  # the reload after invalidate()
+
+    warm = client.get('/countries/').headers['Server-Timing']
+    assert re.search(r'"\d+ hits, 0 misses"', warm)
@@ -0,0 +1,63 @@
+# tests/test_listing.py
+"""Cursor pagination over the sorted table indexes."""
+import pytest
+
+from conftest import login
+from models import data_store, listing_model
+
+
+def _walk(name, column, descending=False, ranges=None, limit=2):
+    keys, cursor = [], None
+    while True:
+        rows, cursor = listing_model.page(name, column, descending, ranges, limit, cursor)
+        keys += [row['StatID'] for row in rows]
+        if cursor is None:
+            return keys
+
+
+def test_pages_cover_every_row_once_in_order(data_dir):
+    by_tonnes = sorted(data_store.get_rows('production_stats'), key=lambda row: float(row['Production_tonnes']))
+    assert _walk('production_stats', 'Production_tonnes') == [row['StatID'] for row in by_tonnes]
+    assert _walk('production_stats', 'Production_tonnes', descending=True) == [row['StatID'] for row in by_tonnes][::-1]
+
+
+def test_ranges_and_edits_between_pages(data_dir):
+    assert _walk('production_stats', 'Year', ranges={'Year': (2024, None)}) == ['5', '6']
+
+    rows, cursor = listing_model.page('production_stats', 'StatID', limit=3)
+    data_store.delete_row('production_stats', '2')
+    data_store.insert_row('production_stats', {'Year': '2025', 'CountryID': '1', 'MineralID': '1'})
+    rows, cursor = listing_model.page('production_stats', 'StatID', limit=10, cursor=cursor)
+    assert [row['StatID'] for row in rows] == ['4', '5', '6', '7']
+
+
+def test_cursors_belong_to_their_ordering(data_dir):
+    rows, cursor = listing_model.page('production_stats', 'Year', limit=1)
+    with pytest.raises(ValueError):
+        listing_model.page('production_stats', 'StatID', cursor=cursor)
+    with pytest.raises(ValueError):
+        listing_model.page('production_stats', 'Year', cursor='garbage')
+
+
+def test_unknown_fields_are_refused_on_empty_pages_too(client):
+    login(client, 'research01', 'hash789')
+    assert client.get('/minerals/api/minerals?price_min=1e12&fields=id,name').get_json()['items'] == []
+    response = client.get('/minerals/api/minerals?price_min=1e12&fields=id,secret')
+    assert response.status_code == 400
+    assert 'secret' in response.get_json()['error']
+
+
+def test_minerals_page_limit_is_clamped(client, monkeypatch):
+    login(client, 'research01', 'hash789')
+    limits = []
+    page = listing_model.page
+
+    def recording_page(*args, **kwargs):
+        limits.append(kwargs['limit'])
+        return page(*args, **kwargs)
+
+    monkeypatch.setattr(listing_model, 'MAX_LIMIT', 2)
+    monkeypatch.setattr(listing_model, 'page', recording_page)
+    assert client.get('/minerals/?limit=10000000').status_code == 200
+    assert client.get('/minerals/?limit=-5').status_code == 200
+    assert limits == [2, 1]
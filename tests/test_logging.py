@@ -0,0 +1,26 @@
+# tests/test_logging.py
+"""Per-request log context."""
+import pytest
+
+import app_logging
+from conftest import login
+
+
+def test_context_is_cleared_after_each_request(client):
+    login(client, 'admin01', 'hash123')
+    client.get('/countries/health')
+    assert getattr(app_logging._local, 'context', None) is None
+
+
+def test_context_is_cleared_when_a_request_fails(client, monkeypatch):
+    from app import app
+
+    def broken():
+        raise RuntimeError('boom')
+
+    monkeypatch.setitem(app.view_functions, 'home.home', broken)
+    monkeypatch.setitem(app.config, 'PROPAGATE_EXCEPTIONS', True)
+    login(client, 'admin01', 'hash123')
+    with pytest.raises(RuntimeError):
+        client.get('/')
+    assert getattr(app_logging._local, 'context', None) is None
@@ -0,0 +1,41 @@
+# tests/test_metrics.py
+"""Country metrics kept in step with edits of the countries table."""
+from conftest import login
+from models import data_store
+from models.country_model import Country
+from models.metrics_model import country_metrics, RANKED
+
+
+def _expected_rank(name, country_id):
+    values = [metrics[name] for metrics in country_metrics.by_country.values()]
+    return sum(1 for value in values if value > country_metrics.by_country[country_id][name]) + 1
+
+
+def test_ranks_follow_edits(data_dir):
+    ids = [country.country_id for country in Country.get_all_countries()]
+    country_metrics.for_country(ids[0])
+    data_store.update_row('countries', str(ids[-1]), {'GDP_BillionUSD': '100000', 'MiningRevenue_BillionUSD': '1'})
+    data_store.update_row('countries', str(ids[0]), {'GDP_BillionUSD': '100000'})  # tie for first
+
+    for country_id in ids:
+        metrics = country_metrics.for_country(country_id)
+        for name in RANKED:
+            assert metrics[name + '_rank'] == _expected_rank(name, country_id)
+    assert country_metrics.for_country(ids[0])['gdp_rank'] == country_metrics.for_country(ids[-1])['gdp_rank'] == 1
+
+
+def test_contribution_follows_edits(data_dir):
+    data_store.update_row('countries', '1', {'GDP_BillionUSD': '50', 'MiningRevenue_BillionUSD': '10'})
+    assert Country.get_country_by_id(1).mining_contribution == 20
+    data_store.delete_row('countries', '1')
+    assert country_metrics.contribution(1) == 0
+    assert country_metrics.for_country(1) is None
+
+
+def test_profile_page_shows_the_ranks(client):
+    login(client, 'research01', 'hash789')
+    page = client.get('/countries/2').get_data(as_text=True)
+    assert 'Regional Rankings' in page
+    assert '#1</div>' in page and 'GDP of 4 countries' in page  # South Africa has the largest GDP
+    data_store.update_row('countries', '1', {'GDP_BillionUSD': '1000'})
+    assert '#2</div>' in client.get('/countries/2').get_data(as_text=True)
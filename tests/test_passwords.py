@@ -0,0 +1,79 @@
+# tests/test_passwords.py
+"""Password hashes: formats, verification and rehash decisions."""
+import threading
+
+import pytest
+
+from models import password_model
+from models.password_model import hash_password, is_hashed, verify_password
+
+
+def test_hash_and_verify():
+    stored = hash_password('s3cret')
+    assert stored.startswith('pbkdf2_sha256$1000$') and is_hashed(stored)
+    assert stored != hash_password('s3cret')  # salted
+    assert verify_password('s3cret', stored) == (True, False)
+    assert verify_password('wrong', stored) == (False, False)
+
+
+def test_scrypt_hashes_verify():
+    stored = hash_password('s3cret', scheme='scrypt', cost=2 ** 4)
+    assert stored.startswith('scrypt$16$8$1$')
+    assert verify_password('s3cret', stored)[0]
+    assert not verify_password('wrong', stored)[0]
+
+
+def test_weaker_or_other_hashes_need_a_rehash():
+    assert verify_password('s3cret', hash_password('s3cret', cost=500)) == (True, True)
+    assert verify_password('s3cret', hash_password('s3cret', scheme='scrypt', cost=2 ** 4)) == (True, True)
+    assert verify_password('s3cret', hash_password('s3cret', cost=5000)) == (True, False)
+
+
+def test_plaintext_values_always_need_a_rehash():
+    assert not is_hashed('hash123')
+    assert verify_password('hash123', 'hash123') == (True, True)
+    assert verify_password('other', 'hash123') == (False, True)
+    assert verify_password('', None) == (True, True)
+
+
+def test_unknown_scheme_is_refused():
+    with pytest.raises(ValueError):
+        hash_password('s3cret', scheme='md5')
+
+
+def test_busy_pool_turns_logins_away(monkeypatch):
+    class Full:
+        def acquire(self, blocking=True):
+            return False
+
+    monkeypatch.setattr(password_model, '_slots', Full())
+    with pytest.raises(password_model.PasswordPoolBusy):
+        password_model.run_bounded(hash_password, 's3cret')
+
+
+def test_slow_pool_turns_logins_away(monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(password_model, 'WAIT_TIMEOUT', 0.05)
+    try:
+        with pytest.raises(password_model.PasswordPoolBusy):
+            password_model.run_bounded(release.wait)
+    finally:
+        release.set()
+
+
+def test_slow_pool_makes_login_answer_busy(client, monkeypatch):
+    release = threading.Event()
+    verify = password_model.verify_password
+    monkeypatch.setattr(password_model, 'WAIT_TIMEOUT', 0.05)
+    monkeypatch.setattr(password_model, 'verify_password', lambda *args: release.wait() and verify(*args))
+    try:
+        response = client.post('/login', data={'username': 'admin01', 'password': 'hash123'})
+    finally:
+        release.set()
+    assert response.status_code == 503
+    assert b'try again' in response.data
+
+
+def test_dummy_hash_is_ready_from_import():
+    assert password_model._dummy_hash.done() or password_model._dummy_hash.running()
+    assert is_hashed(password_model.dummy_hash())
@@ -0,0 +1,88 @@
+# tests/test_production.py
+"""Columnar production queries against plain-Python sums over the rows."""
+from collections import defaultdict
+
+import pytest
+
+from conftest import login
+from models import data_store
+from models.production_model import ProductionStats, GROUP_COLUMNS
+
+COLUMN_OF = {'year': 'Year', 'country': 'CountryID', 'mineral': 'MineralID'}
+
+
+def _expected(group_by, keep=lambda row: True):
+    """Totals per group computed row by row"""
+    totals = defaultdict(lambda: [0.0, 0.0, 0])
+    for row in data_store.get_rows('production_stats'):
+        if keep(row):
+            total = totals[tuple(int(row[COLUMN_OF[name]]) for name in group_by)]
+            total[0] += float(row['Production_tonnes'])
+            total[1] += float(row['ExportValue_BillionUSD'])
+            total[2] += 1
+    return dict((key, (production, pytest.approx(export), records))
+                for key, (production, export, records) in totals.items())
+
+
+def _actual(summary, group_by):
+    return dict((tuple(item[GROUP_COLUMNS[name]] for name in group_by),
+                 (item['production_tonnes'], item['export_value_billion_usd'], item['records']))
+                for item in summary)
+
+
+@pytest.mark.parametrize('group_by', [(), ('year',), ('country',), ('mineral',),
+                                      ('year', 'country'), ('year', 'mineral'), ('country', 'mineral'),
+                                      ('year', 'country', 'mineral')])
+def test_totals_match_a_plain_sum(data_dir, group_by):
+    summary = ProductionStats.load().summarize(group_by)
+    assert _actual(summary, group_by) == _expected(group_by)
+
+
+def test_filters(data_dir):
+    def keep(row):
+        return row['Year'] == '2024' and row['CountryID'] in ('1', '2')
+
+    stats = ProductionStats.load()
+    summary = stats.summarize(('mineral',), year_from=2024, countries=[1, 2])
+    assert _actual(summary, ('mineral',)) == _expected(('mineral',), keep)
+
+    records = stats.records(year_to=2023, minerals=[2, 4])
+    assert [record['stat_id'] for record in records] == [2, 4]
+    assert records[0] == {'stat_id': 2, 'year': 2023, 'country_id': 2, 'mineral_id': 2,
+                          'production_tonnes': 120000.0, 'export_value_billion_usd': 8.4}
+
+
+def test_filters_matching_nothing(data_dir):
+    stats = ProductionStats.load()
+    assert stats.summarize(('year', 'country'), year_from=2030) == []
+    assert stats.summarize((), countries=[99]) == [
+        {'production_tonnes': 0.0, 'export_value_billion_usd': 0.0, 'records': 0}]
+    assert stats.records(year_from=2024, year_to=2023) == []
+
+
+def test_columns_follow_edits(data_dir):
+    data_store.update_row('production_stats', '1', {'Production_tonnes': '1'})
+    assert ProductionStats.load().summarize(('country',), countries=[1])[0]['production_tonnes'] == 110001
+
+
+def test_summary_endpoint(client):
+    login(client, 'research01', 'hash789')
+    response = client.get('/stats/api/production/summary?group_by=year,mineral&country=1')
+    assert response.status_code == 200
+    assert response.get_json() == [
+        {'year': 2023, 'mineral_id': 1, 'mineral_name': 'Cobalt', 'production_tonnes': 100000.0,
+         'export_value_billion_usd': 5.2, 'records': 1},
+        {'year': 2024, 'mineral_id': 1, 'mineral_name': 'Cobalt', 'production_tonnes': 110000.0,
+         'export_value_billion_usd': 6.0, 'records': 1},
+    ]
+    assert client.get('/stats/api/production/summary?group_by=planet').status_code == 400
+    assert client.get('/stats/api/production/summary?country=one').status_code == 400
+    assert client.get('/stats/api/production/summary?year_from=2030').get_json() == []
+
+
+def test_records_endpoint(client):
+    login(client, 'research01', 'hash789')
+    items = client.get('/stats/api/production/records?country=2&year_from=2024').get_json()
+    assert [(item['stat_id'], item['country_name']) for item in items] == [(6, 'South Africa')]
+    assert client.get('/stats/api/production/records?mineral=1,x').status_code == 400
+    assert client.get('/stats/api/production/records?country=99').get_json() == []
@@ -0,0 +1,39 @@
+# tests/test_schema.py
+"""Column names resolved through the table schemas instead of one header's spelling."""
+import csv
+import os
+
+from conftest import login
+from models import data_store, schema
+from models.production_model import ProductionStats
+from models.search_model import search_index
+
+
+def _rename_countries_header(data_dir, renames):
+    path = os.path.join(data_dir, 'countries.csv')
+    with open(path, newline='') as file:
+        rows = list(csv.reader(file))
+    rows[0] = [renames.get(column, column) for column in rows[0]]
+    with open(path, 'w', newline='') as file:
+        csv.writer(file, lineterminator='\n').writerows(rows)
+    data_store.invalidate('countries')
+
+
+def test_search_and_sorting_follow_a_drifted_header(client, data_dir):
+    _rename_countries_header(data_dir, {'CountryName': 'name', 'KeyProjects': 'projects', 'GDP_BillionUSD': 'gdp'})
+    assert schema.for_table('countries').columns['country_name'] == 'name'
+
+    hits = search_index.search('kolwezi', tables=['countries'])
+    assert hits and hits[0]['title'] == 'DRC (Congo)'
+
+    login(client, 'admin01', 'hash123')
+    items = client.get('/countries/api/countries?sort=-gdp&fields=name,gdp').get_json()['items']
+    assert [item['gdp'] for item in items] == sorted((item['gdp'] for item in items), reverse=True)
+
+
+def test_production_columns_use_the_schema_parsers(data_dir):
+    data_store.update_row('production_stats', '1', {'Production_tonnes': 'n/a', 'Year': '2021.0'})
+    stats = ProductionStats.load()
+    assert stats.production[0] == 0.0
+    assert stats.year[0] == 2021
+    assert len(stats) == len(schema.records('production_stats'))
@@ -0,0 +1,42 @@
+# tests/test_search.py
+"""Full-text search: prefixes, ranking and re-indexing edits."""
+from conftest import login
+from models import data_store
+from models.search_model import search_index
+
+
+def _hits(query, tables=None):
+    return [(hit['type'], hit['id']) for hit in search_index.search(query, tables)]
+
+
+def test_prefix_and_exact_matches(data_dir):
+    assert ('sites', '1') in _hits('kolw')
+    # The name counts more than the key projects text mentioning Kolwezi
+    assert _hits('kolwezi', ['sites', 'countries']) == [('sites', '1'), ('countries', '1')]
+    assert _hits('cobalt batteries', ['minerals']) == [('minerals', '1')]
+    assert _hits('') == []
+    assert _hits('nosuchword') == []
+
+
+def test_every_word_may_be_a_prefix(data_dir):
+    assert _hits('kolw mine', ['sites']) == [('sites', '1')]
+    assert _hits('cob batt', ['minerals']) == [('minerals', '1')]
+    assert _hits('cob lith') == []  # every word must match
+
+
+def test_edits_are_reindexed(data_dir):
+    assert _hits('kolw', ['sites']) == [('sites', '1')]
+    data_store.update_row('sites', '1', {'SiteName': 'Lualaba Mine'})
+    assert _hits('kolw', ['sites']) == []
+    assert _hits('lualaba', ['sites']) == [('sites', '1')]
+    data_store.delete_row('sites', '1')
+    assert _hits('lualaba') == []
+
+
+def test_search_route(client):
+    assert client.get('/search?q=lith').status_code == 302
+    login(client, 'research01', 'hash789')
+    response = client.get('/search?q=lith')
+    assert response.status_code == 200
+    assert ('minerals', '2') in [(hit['type'], hit['id']) for hit in response.get_json()['hits']]
+    assert client.get('/search?q=lith&type=planets').status_code == 400
@@ -0,0 +1,50 @@
+# tests/test_sites.py
+"""Spatial site index: boxes, nearest sites and map tiles."""
+import pytest
+
+from conftest import login
+from models import data_store
+from models.site_model import SiteIndex, build_tile
+
+
+def _ids(sites):
+    return sorted(site.site_id for site in sites)
+
+
+def test_bounding_boxes(data_dir):
+    index = SiteIndex.load()
+    assert _ids(index.in_bbox(10, -40, 50, 0)) == [1, 3, 4]  # southern Africa
+    assert _ids(index.in_bbox(10, -40, 50, 0, minerals={1, 3})) == [1, 3]
+    # west > east: the box crosses the antimeridian and covers Australia, not Africa
+    assert _ids(index.in_bbox(100, -40, -170, 0)) == [2]
+
+
+def test_nearest_sites(data_dir):
+    index = SiteIndex.load()
+    results = index.nearest(-10.7, 25.5, k=2)
+    assert [site.site_id for distance, site in results] == [1, 3]
+    assert results[0][0] < 5 < results[1][0]
+    assert index.nearest(-10.7, 25.5, k=0) == []
+
+
+def test_index_follows_edits(data_dir):
+    data_store.update_row('sites', '2', {'Latitude': '-11', 'Longitude': '26'})
+    assert _ids(SiteIndex.load().in_bbox(20, -15, 30, -5)) == [1, 2]
+
+
+def test_tiles_cluster_nearby_sites(data_dir):
+    world = build_tile(SiteIndex.load(), 0, 0, 0)
+    assert sum(feature['properties']['count'] for feature in world['features']) == 4
+    close = build_tile(SiteIndex.load(), 6, 36, 33)
+    assert [feature['properties']['id'] for feature in close['features']] == [1]
+    with pytest.raises(ValueError):
+        build_tile(SiteIndex.load(), 1, 2, 0)
+
+
+def test_map_page_does_not_inject_stored_markup(client):
+    data_store.update_row('countries', '1', {'KeyProjects': '<img src=x onerror=alert(1)>'})
+    data_store.update_row('sites', '1', {'SiteName': '<script>alert(1)</script>'})
+    login(client, 'research01', 'hash789')
+    page = client.get('/map/').get_data(as_text=True)
+    assert '<img src=x' not in page
+    assert 'innerHTML' not in page  # popups are built from text nodes
@@ -0,0 +1,230 @@
+# tests/test_storage.py
+"""CsvBackend tail reads and Table refreshes against files other processes append to."""
+import csv
+import os
+
+import pytest
+
+from models import storage
+from models.data_store import Table
+
+COLUMNS = ['StatID', 'Year', 'CountryID', 'MineralID', 'Production_tonnes', 'ExportValue_BillionUSD']
+
+
+def _row(stat_id):
+    return {'StatID': str(stat_id), 'Year': '2024', 'CountryID': '1', 'MineralID': '1',
+            'Production_tonnes': '10', 'ExportValue_BillionUSD': '1'}
+
+
+def _backend(tmp_path, rows=3):
+    with open(tmp_path / 'production_stats.csv', 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=COLUMNS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(_row(stat_id) for stat_id in range(1, rows + 1))
+    return storage.CsvBackend(str(tmp_path))
+
+
+def _append(backend, *stat_ids):
+    backend.write_many('production_stats', COLUMNS, 'StatID',
+                       [{'op': 'append', 'row': _row(stat_id)} for stat_id in stat_ids])
+
+
+def test_tail_read_stops_at_the_new_signature(tmp_path):
+    backend = _backend(tmp_path)
+    old = backend.load('production_stats')[3]
+    _append(backend, 4)
+    new = backend.signature('production_stats')
+    _append(backend, 5)  # lands after the change was detected
+
+    changes, signature = backend.changes_since('production_stats', old, new, COLUMNS)
+
+    assert [change['row']['StatID'] for change in changes] == ['4']
+    assert signature == new
+
+
+def test_half_written_line_is_left_for_the_next_read(tmp_path):
+    backend = _backend(tmp_path)
+    path = tmp_path / 'production_stats.csv'
+    old = backend.load('production_stats')[3]
+    with open(path, 'a') as file:
+        file.write('4,2024,1,1,10,1\n5,2024,1,')
+    changes, signature = backend.changes_since('production_stats', old, backend.signature('production_stats'), COLUMNS)
+    assert [change['row']['StatID'] for change in changes] == ['4']
+    assert signature[0][1] < path.stat().st_size
+
+    with open(path, 'a') as file:
+        file.write('1,10,1\n')
+    changes, signature = backend.changes_since('production_stats', signature, backend.signature('production_stats'), COLUMNS)
+    assert [change['row']['StatID'] for change in changes] == ['5']
+    assert signature == backend.signature('production_stats')
+
+
+def test_log_tail_stops_at_the_new_signature(tmp_path):
+    backend = _backend(tmp_path)
+    backend.write('production_stats', COLUMNS, 'StatID', {'op': 'delete', 'key': '1'})
+    old = backend.load('production_stats')[3]
+    backend.write('production_stats', COLUMNS, 'StatID', {'op': 'delete', 'key': '2'})
+    new = backend.signature('production_stats')
+    backend.write('production_stats', COLUMNS, 'StatID', {'op': 'delete', 'key': '3'})
+
+    changes, signature = backend.changes_since('production_stats', old, new, COLUMNS)
+
+    assert changes == [{'op': 'delete', 'key': '2'}]
+    assert signature == new
+
+
+def test_growth_after_an_in_place_edit_is_not_read_as_appends(tmp_path):
+    backend = _backend(tmp_path)
+    path = tmp_path / 'production_stats.csv'
+    table = Table('production_stats', backend).refresh()
+
+    text = path.read_text()
+    path.write_text(text.replace('2,2024,1,1,10,1', '2,2024,1,1,99999,1'))  # grows by 3 bytes
+    old, new = table.signature, backend.signature('production_stats')
+    assert new[0][1] > old[0][1]
+    assert backend.changes_since('production_stats', old, new, COLUMNS) is None
+
+    table.refresh()
+    assert table.by_key['2']['Production_tonnes'] == '99999'
+    assert [row['StatID'] for row in table.rows] == ['1', '2', '3']
+
+
+def test_row_inserted_mid_file_triggers_a_full_load(tmp_path):
+    backend = _backend(tmp_path)
+    path = tmp_path / 'production_stats.csv'
+    table = Table('production_stats', backend).refresh()
+
+    lines = path.read_text().splitlines(keepends=True)
+    lines.insert(2, '9,2023,2,2,5,1\n')
+    path.write_text(''.join(lines))
+    table.refresh()
+    assert [row['StatID'] for row in table.rows] == ['1', '9', '2', '3']
+
+
+def test_a_replaced_file_is_loaded_in_full(tmp_path):
+    backend = _backend(tmp_path)
+    table = Table('production_stats', backend).refresh()
+    other = storage.CsvBackend(str(tmp_path))
+    other.replace('production_stats', COLUMNS, [_row(stat_id) for stat_id in (1, 2, 3, 4)])
+
+    old, new = table.signature, backend.signature('production_stats')
+    assert old[0][2] != new[0][2]  # renamed into place
+    assert backend.changes_since('production_stats', old, new, COLUMNS) is None
+    table.refresh()
+    assert [row['StatID'] for row in table.rows] == ['1', '2', '3', '4']
+
+
+def test_truncated_and_regrown_log_is_loaded_in_full(tmp_path):
+    backend = _backend(tmp_path)
+    backend.write('production_stats', COLUMNS, 'StatID', {'op': 'delete', 'key': '1'})
+    table = Table('production_stats', backend).refresh()
+    with open(backend.log_path('production_stats'), 'w') as log:
+        log.write('{"op": "delete", "key": "3"}\n{"op": "delete", "key": "2"}\n')
+    table.refresh()
+    assert [row['StatID'] for row in table.rows] == ['1']
+
+
+class AppendAfterSignature(storage.CsvBackend):
+    """Another process appends right after the table's signature is taken"""
+
+    def __init__(self, data_dir):
+        super().__init__(data_dir)
+        self.pending = []
+
+    def signature(self, name):
+        signature = super().signature(name)
+        if self.pending:
+            _append(storage.CsvBackend(self.data_dir), self.pending.pop())
+        return signature
+
+
+def test_refresh_applies_a_racing_append_exactly_once(tmp_path):
+    _backend(tmp_path, rows=6)
+    backend = AppendAfterSignature(str(tmp_path))
+    table = Table('production_stats', backend).refresh()
+
+    _append(storage.CsvBackend(str(tmp_path)), 7)
+    backend.pending.append(8)
+    table.refresh()
+    table.refresh()
+    table.refresh()
+
+    assert [row['StatID'] for row in table.rows] == [str(stat_id) for stat_id in range(1, 9)]
+    assert sorted(table.by_key) == sorted(str(stat_id) for stat_id in range(1, 9))
+
+
+def test_load_keeps_a_final_line_without_newline(tmp_path):
+    backend = _backend(tmp_path)
+    with open(tmp_path / 'production_stats.csv', 'a') as file:
+        file.write('4,2024,1,1,10,1')  # hand-edited file
+    table = Table('production_stats', backend).refresh()
+    assert [row['StatID'] for row in table.rows] == ['1', '2', '3', '4']
+
+    _append(backend, 5)
+    table.refresh()
+    assert [row['StatID'] for row in table.rows] == ['1', '2', '3', '4', '5']
+
+
+class WriteAfterSignature(storage.CsvBackend):
+    """Another process writes a batch of new rows right after the signature is taken"""
+
+    def __init__(self, data_dir, writer):
+        super().__init__(data_dir)
+        self.writer = writer
+        self.pending = []
+
+    def signature(self, name):
+        signature = super().signature(name)
+        if self.pending:
+            self.writer.write_many([{'op': 'append', 'row': self.pending.pop()}])
+        return signature
+
+
+@pytest.mark.parametrize('name', sorted(storage.APPEND_ONLY))
+def test_appended_rows_of_every_append_only_table_are_read_once(data_dir, name):
+    writer = Table(name, storage.CsvBackend(data_dir)).refresh()
+    backend = WriteAfterSignature(data_dir, writer)
+    reader = Table(name, backend).refresh()
+    first = writer.max_key + 1
+
+    def row(key):
+        return dict((column, str(key) if column == writer.key_column else 'x') for column in writer.columns)
+
+    writer.write_many([{'op': 'append', 'row': row(first)}, {'op': 'append', 'row': row(first + 1)}])
+    backend.pending.append(row(first + 2))
+    for _ in range(3):
+        reader.refresh()
+
+    keys = [table_row[reader.key_column] for table_row in reader.rows]
+    assert len(keys) == len(set(keys))
+    assert keys == [table_row[writer.key_column] for table_row in writer.rows]
+    assert keys[-3:] == [str(first), str(first + 1), str(first + 2)]
+    assert not os.path.exists(backend.log_path(name))
+
+
+def test_rows_appended_after_our_own_writes_are_tail_read(tmp_path, monkeypatch):
+    backend = _backend(tmp_path)
+    table = Table('production_stats', backend).refresh()
+    table.write({'op': 'append', 'row': _row(4)})
+    table.write({'op': 'delete', 'key': '1'})
+    _append(storage.CsvBackend(str(tmp_path)), 5)
+
+    monkeypatch.setattr(table, 'load', lambda signature=None: pytest.fail('full load'))
+    table.refresh()
+    assert [row['StatID'] for row in table.rows] == ['2', '3', '4', '5']
+
+
+def test_hand_edits_of_a_data_table_are_picked_up(data_dir):
+    from models import data_store
+    assert data_store.get_record('minerals', '1')['MarketPriceUSD_per_tonne'] == '52000'
+    path = os.path.join(data_dir, 'minerals.csv')
+    with open(path) as file:
+        lines = file.readlines()
+    lines[1] = lines[1].replace('52000', '5200000')
+    lines.insert(2, '9,Nickel,Steel and battery cathodes,16000\n')
+    with open(path, 'w') as file:
+        file.writelines(lines)
+
+    assert data_store.get_record('minerals', '1')['MarketPriceUSD_per_tonne'] == '5200000'
+    assert data_store.get_record('minerals', '9')['MineralName'] == 'Nickel'
+    assert all(row['MineralID'].isdigit() for row in data_store.get_rows('minerals'))
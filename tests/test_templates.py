@@ -0,0 +1,40 @@
+# tests/test_templates.py
+"""Per-record fragment caching of the country cards."""
+from conftest import login
+from models import data_store
+
+
+def _count_fragment_renders(app, monkeypatch):
+    rendered = []
+    get_template = app.jinja_env.get_template
+
+    def counting(name, *args, **kwargs):
+        if name.startswith('fragments/'):
+            rendered.append(name)
+        return get_template(name, *args, **kwargs)
+
+    monkeypatch.setattr(app.jinja_env, 'get_template', counting)
+    return rendered
+
+
+def test_only_changed_records_are_re_rendered(client, monkeypatch):
+    login(client, 'admin01', 'hash123')
+    client.get('/admin/data')
+    rendered = _count_fragment_renders(client.application, monkeypatch)
+
+    assert client.get('/admin/data').status_code == 200
+    assert rendered == []
+
+    data_store.update_row('countries', '2', {'CountryName': 'Republic of South Africa'})
+    page = client.get('/admin/data').get_data(as_text=True)
+    assert rendered == ['fragments/country_card.html']
+    assert 'Republic of South Africa' in page and 'DRC (Congo)' in page
+
+
+def test_fragments_follow_template_edits_while_auto_reloading(client, monkeypatch):
+    login(client, 'admin01', 'hash123')
+    client.get('/admin/data')
+    rendered = _count_fragment_renders(client.application, monkeypatch)
+    monkeypatch.setattr(client.application.jinja_env, 'auto_reload', True)
+    client.get('/admin/data')
+    assert len(rendered) == 4
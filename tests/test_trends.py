@@ -0,0 +1,26 @@
+# tests/test_trends.py
+"""Production trends following edits of production_stats."""
+from models import data_store
+from models.trends_model import production_trends
+
+
+def _values(dimension, series_id):
+    return production_trends.trends(dimension, ids=[series_id])[0]['values']
+
+
+def test_an_edit_only_drops_the_analytics_of_its_series(data_dir):
+    assert _values('country', 1) == [100000, 110000]
+    _values('country', 2)
+    _values('mineral', 3)
+    data_store.update_row('production_stats', '5', {'Production_tonnes': '120000'})
+
+    assert ('country', 1) not in production_trends.analytics
+    assert ('mineral', 1) not in production_trends.analytics
+    assert ('country', 2) in production_trends.analytics and ('mineral', 3) in production_trends.analytics
+    assert _values('country', 1) == [100000, 120000]
+    assert production_trends.trends('country', ids=[1])[0]['yoy_percent'] == [None, 20.0]
+
+
+def test_a_deleted_row_leaves_its_series(data_dir):
+    data_store.delete_row('production_stats', '3')
+    assert production_trends.trends('country', ids=[3]) == []
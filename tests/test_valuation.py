@@ -0,0 +1,26 @@
+# tests/test_valuation.py
+"""Production valuation caching and unknown mineral ids."""
+from models import data_store
+from models.valuation_model import Valuation, run_scenarios
+
+
+def test_one_valuation_follows_mineral_price_changes(data_dir):
+    first = Valuation.load()
+    assert Valuation.load() is first
+
+    data_store.update_row('minerals', '1', {'MarketPriceUSD_per_tonne': '1'})
+    second = Valuation.load()
+    assert second is not first
+    assert second.value[0] == 100000  # 100000 tonnes of mineral 1 at the new price
+    keys = [key for key in data_store.get_table('production_stats').derived if 'valuation' in str(key)]
+    assert keys == ['valuation']
+
+
+def test_mineral_ids_below_one_are_unknown(data_dir):
+    data_store.update_row('production_stats', '1', {'MineralID': '-1'})
+    data_store.update_row('production_stats', '2', {'MineralID': '0'})
+    valuation = Valuation.load()
+    assert valuation.value[0] == 0 and valuation.value[1] == 0
+
+    result = run_scenarios([{'name': 'flat', 'shocks': {}}], group_by=())
+    assert result['base_total'] == valuation.value.sum()